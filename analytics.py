@@ -0,0 +1,275 @@
+'''
+Vectorized order-flow analytics over the book's quote and fill history.
+
+The history is two tables: top-of-book quotes (QUOTE_DTYPE, one row every time the best bid or ask price
+or size changes, as recorded by QuoteRecorder) and fills (ob_tree.fills.FILL_DTYPE). Either can be a
+structured array, a dict of columns or a pandas DataFrame; record_history produces both by replaying a
+batch.MESSAGE_DTYPE or journal event history through a LimitOrderBook.
+
+Every feature is computed with array operations over the whole history at once and aggregated into
+fixed time windows with np.bincount, so a day of L3 data costs one replay of the events plus a few passes
+over NumPy columns, with no Python loop per event:
+    order flow imbalance: the e_n of Cont, Kukanov & Stoikov (2014), summed per window
+    microprice: size-weighted mid, (bid * ask size + ask * bid size) / (bid size + ask size)
+    queue depletion: size leaving the best bid / ask queue, including the whole queue when the level is
+        exhausted, per unit of time
+    effective and realized spread: 2 d (p - m_t) and 2 d (p - m_t+horizon) per fill, where d is +1 for a
+        buyer-initiated trade and -1 for a seller-initiated one, inferred from the prevailing mid (quote rule)
+An empty side has a NaN price and a size of 0.
+'''
+import numpy as np
+import pandas as pd
+from .lob import LimitOrderBook
+from .journal import replay_records
+from .ob_tree.fills import FillBuffer, FILL_DTYPE
+from .ob_tree.order import Side
+
+QUOTE_DTYPE = np.dtype([
+    ('timestamp', np.float64),
+    ('bid_price', np.float64),
+    ('bid_size', np.float64),
+    ('ask_price', np.float64),
+    ('ask_size', np.float64),
+])
+
+
+class QuoteRecorder:
+
+    def __init__(self, book, attach: bool = True):
+        '''
+        book: LimitOrderBook
+        attach: bool
+            make the recorder the delta_sink of both sides; pass False to feed append from a
+            DeltaPublisher subscription instead
+            Rows are stamped with book.clock, the timestamp of the message being processed
+        '''
+        self.book = book
+        self._columns = ([], [], [], [], [])
+        self._top = (None, 0, None, 0)
+        if attach:
+            book.bid.delta_sink = self.append
+            book.ask.delta_sink = self.append
+
+    def __len__(self):
+        return len(self._columns[0])
+
+    def append(self, side, price, size, count):
+        '''
+        Level delta, the delta_sink signature; deltas behind the touch are ignored without looking at the book
+        O(1)
+        '''
+        bid, _, ask, _ = self._top
+        if side == Side.BID:
+            if bid is not None and price < bid:
+                return
+        elif ask is not None and price > ask:
+            return
+        top = self.book._top_of_book()
+        if top == self._top:
+            return
+        self._top = top
+        bid, bid_size, ask, ask_size = top
+        timestamps, bids, bid_sizes, asks, ask_sizes = self._columns
+        timestamps.append(self.book.clock)
+        bids.append(np.nan if bid is None else bid)
+        bid_sizes.append(bid_size)
+        asks.append(np.nan if ask is None else ask)
+        ask_sizes.append(ask_size)
+
+    def quotes(self):
+        '''
+        :return: np.ndarray | structured array with QUOTE_DTYPE, oldest first
+        '''
+        quotes = np.empty(len(self), dtype=QUOTE_DTYPE)
+        for name, column in zip(QUOTE_DTYPE.names, self._columns):
+            quotes[name] = column
+        fixed_point = self.book.fixed_point
+        if fixed_point is not None:
+            for name in ('bid_price', 'ask_price'):
+                quotes[name] = fixed_point.to_prices(quotes[name])
+            for name in ('bid_size', 'ask_size'):
+                quotes[name] = fixed_point.to_sizes(quotes[name])
+        return quotes
+
+
+def record_history(records, book_kwargs: dict = None, chunk: int = 1 << 16, fill_capacity: int = 1 << 20):
+    '''
+    records: np.ndarray | structured array with batch.MESSAGE_DTYPE or journal.JOURNAL_DTYPE, e.g. a journal
+        read with read_journal
+    book_kwargs: dict | None
+        LimitOrderBook arguments; fill_sink and delta_sink are taken over
+    chunk: int
+        number of records per process_records call
+    fill_capacity: int
+        fill buffer size; a chunk producing more fills than this raises ValueError
+        Replay the events on a fresh book, recording the quotes and the fills
+    :return: np.ndarray, np.ndarray | quotes (QUOTE_DTYPE) and fills (FILL_DTYPE)
+    '''
+    book = LimitOrderBook(**(book_kwargs or {}))
+    fills = FillBuffer(fill_capacity, book.fixed_point)
+    book.bid.fill_sink = fills.append
+    book.ask.fill_sink = fills.append
+    recorder = QuoteRecorder(book)
+    batches = []
+    for start in range(0, len(records), chunk):
+        replay_records(book, records[start:start + chunk])
+        if fills.overruns:
+            raise ValueError(f'more than {fills.capacity} fills in one chunk, use a smaller chunk')
+        batches.append(fills.drain())
+    return recorder.quotes(), np.concatenate(batches) if batches else np.zeros(0, dtype=FILL_DTYPE)
+
+
+def _quote_columns(quotes):
+    '''
+    :return: timestamps, bid prices, bid sizes, ask prices, ask sizes as float arrays;
+        an empty bid side is priced -inf and an empty ask side +inf so that comparisons stay ordered
+    '''
+    timestamps, bid, bid_size, ask, ask_size = [np.asarray(quotes[name], dtype=np.float64)
+                                                for name in QUOTE_DTYPE.names]
+    return (timestamps, np.where(np.isnan(bid), -np.inf, bid), bid_size,
+            np.where(np.isnan(ask), np.inf, ask), ask_size)
+
+
+def order_flow_imbalance(quotes):
+    '''
+    quotes: QUOTE_DTYPE table
+    :return: np.ndarray | e_n of every quote: bid size added at or above the previous best bid minus bid size
+        removed at or below it, minus the same on the ask side; 0 for the first quote
+    '''
+    _, bid, bid_size, ask, ask_size = _quote_columns(quotes)
+    flow = np.zeros(len(bid))
+    flow[1:] = ((bid[1:] >= bid[:-1]) * bid_size[1:] - (bid[1:] <= bid[:-1]) * bid_size[:-1]
+                - (ask[1:] <= ask[:-1]) * ask_size[1:] + (ask[1:] >= ask[:-1]) * ask_size[:-1])
+    return flow
+
+
+def mid_price(quotes):
+    '''
+    :return: np.ndarray | mid of every quote, NaN while a side is empty
+    '''
+    bid = np.asarray(quotes['bid_price'], dtype=np.float64)
+    ask = np.asarray(quotes['ask_price'], dtype=np.float64)
+    return (bid + ask) / 2
+
+
+def microprice(quotes):
+    '''
+    :return: np.ndarray | size-weighted mid of every quote, NaN while a side is empty
+    '''
+    bid, bid_size, ask, ask_size = [np.asarray(quotes[name], dtype=np.float64)
+                                    for name in ('bid_price', 'bid_size', 'ask_price', 'ask_size')]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (bid * ask_size + ask * bid_size) / (bid_size + ask_size)
+
+
+def queue_depletion(quotes):
+    '''
+    :return: np.ndarray, np.ndarray | size that left the best bid and best ask queue with every quote:
+        the decrease while the best price holds, the whole previous queue when the best price moves away
+        from the spread; 0 for the first quote
+    '''
+    _, bid, bid_size, ask, ask_size = _quote_columns(quotes)
+    bid_depletion = np.zeros(len(bid))
+    ask_depletion = np.zeros(len(ask))
+    bid_depletion[1:] = np.where(bid[1:] == bid[:-1], np.maximum(bid_size[:-1] - bid_size[1:], 0),
+                                 np.where(bid[1:] < bid[:-1], bid_size[:-1], 0))
+    ask_depletion[1:] = np.where(ask[1:] == ask[:-1], np.maximum(ask_size[:-1] - ask_size[1:], 0),
+                                 np.where(ask[1:] > ask[:-1], ask_size[:-1], 0))
+    return bid_depletion, ask_depletion
+
+
+def spreads(quotes, fills, horizon):
+    '''
+    quotes: QUOTE_DTYPE table
+    fills: FILL_DTYPE table, in timestamp order
+    horizon: int | float
+        time after the fill at which the realized spread reads the mid
+        Each fill is compared with the last quote strictly before its timestamp, i.e. the book as the
+        aggressor found it; fills without a two-sided quote before them get NaN
+    :return: np.ndarray, np.ndarray, np.ndarray | direction (+1 buy, -1 sell, 0 at the mid),
+        effective spread and realized spread of every fill
+    '''
+    quote_timestamps = np.asarray(quotes['timestamp'], dtype=np.float64)
+    mid = mid_price(quotes)
+    timestamps = np.asarray(fills['timestamp'], dtype=np.float64)
+    prices = np.asarray(fills['price'], dtype=np.float64)
+    before = np.searchsorted(quote_timestamps, timestamps, side='left') - 1
+    after = np.searchsorted(quote_timestamps, timestamps + horizon, side='right') - 1
+    mid_before = np.where(before >= 0, mid[np.maximum(before, 0)] if len(mid) else np.nan, np.nan)
+    mid_after = np.where(after >= 0, mid[np.maximum(after, 0)] if len(mid) else np.nan, np.nan)
+    direction = np.sign(prices - mid_before)
+    return direction, 2 * direction * (prices - mid_before), 2 * direction * (prices - mid_after)
+
+
+def window_index(timestamps, window, start):
+    '''
+    timestamps: array-like
+    window: int | float
+        window length
+    start: int | float
+        start of window 0, at or before the first timestamp
+    :return: np.ndarray | window number of every timestamp
+    '''
+    index = (np.asarray(timestamps, dtype=np.float64) - start) // window
+    if len(index) and index[0] < 0:
+        raise ValueError('timestamps before the start of the first window')
+    return index.astype(np.int64)
+
+
+def features(quotes, fills, window, horizon=None, start=None):
+    '''
+    quotes: QUOTE_DTYPE table
+    fills: FILL_DTYPE table
+    window: int | float
+        window length, in timestamp units
+    horizon: int | float | None
+        realized spread horizon, one window if None
+    start: int | float | None
+        start of the first window, the first timestamp rounded down to a multiple of window if None
+        Both tables must be in timestamp order
+    :return: pd.DataFrame | one row per window, indexed by window start:
+        ofi (sum of e_n), mid, microprice and spread (as of the end of the window), bid_depletion and
+        ask_depletion (size per unit of time), trades, volume, effective_spread and realized_spread
+        (size-weighted means)
+    '''
+    quote_timestamps = np.asarray(quotes['timestamp'], dtype=np.float64)
+    fill_timestamps = np.asarray(fills['timestamp'], dtype=np.float64)
+    if horizon is None:
+        horizon = window
+    if start is None:
+        firsts = [column[0] for column in (quote_timestamps, fill_timestamps) if len(column)]
+        start = np.floor(min(firsts) / window) * window if firsts else 0.0
+    quote_windows = window_index(quote_timestamps, window, start)
+    fill_windows = window_index(fill_timestamps, window, start)
+    count = max([windows[-1] + 1 for windows in (quote_windows, fill_windows) if len(windows)], default=0)
+
+    bid_depletion, ask_depletion = queue_depletion(quotes)
+    # last quote of every window, carried forward through windows without quotes
+    last = np.searchsorted(quote_windows, np.arange(count), side='right') - 1
+    has_quote = last >= 0
+    last = np.maximum(last, 0)
+
+    def as_of_end(values):
+        return np.where(has_quote, values[last] if len(values) else np.nan, np.nan)
+
+    mid = mid_price(quotes)
+    spread = np.asarray(quotes['ask_price'], dtype=np.float64) - np.asarray(quotes['bid_price'], dtype=np.float64)
+    sizes = np.asarray(fills['size'], dtype=np.float64)
+    _, effective, realized = spreads(quotes, fills, horizon)
+    valid = ~np.isnan(effective)
+    weighted_size = np.bincount(fill_windows[valid], sizes[valid], count)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        effective_spread = np.bincount(fill_windows[valid], (effective * sizes)[valid], count) / weighted_size
+        realized_spread = np.bincount(fill_windows[valid], (realized * sizes)[valid], count) / weighted_size
+    return pd.DataFrame({
+        'ofi': np.bincount(quote_windows, order_flow_imbalance(quotes), count),
+        'mid': as_of_end(mid),
+        'microprice': as_of_end(microprice(quotes)),
+        'spread': as_of_end(spread),
+        'bid_depletion': np.bincount(quote_windows, bid_depletion, count) / window,
+        'ask_depletion': np.bincount(quote_windows, ask_depletion, count) / window,
+        'trades': np.bincount(fill_windows, minlength=count),
+        'volume': np.bincount(fill_windows, sizes, count),
+        'effective_spread': effective_spread,
+        'realized_spread': realized_spread,
+    }, index=pd.Index(start + np.arange(count) * window, name='window_start'))
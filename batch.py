@@ -0,0 +1,40 @@
+'''
+Columnar message format for LimitOrderBook.process_batch / process_records.
+
+A message is one fixed-width record: action, side, order id, price, size and timestamp.
+Historical order flow can be kept as one structured NumPy array (MESSAGE_DTYPE) or as separate
+columns, and replayed through the book with a single Python call.
+'''
+from collections import namedtuple
+import numpy as np
+from .ob_tree.order import Side
+
+# action codes
+ADD = 0
+CANCEL = 1
+MODIFY = 2
+MARKET = 3
+
+# side codes
+BID = Side.BID
+ASK = Side.ASK
+
+MESSAGE_DTYPE = np.dtype([
+    ('action', np.uint8),
+    ('side', np.uint8),
+    ('id', np.int64),
+    ('price', np.float64),
+    ('size', np.float64),
+    ('timestamp', np.float64),
+])
+
+# messages: number of messages processed; rejected: messages the book refused
+BatchReport = namedtuple('BatchReport', ['messages', 'rejected', 'seconds', 'messages_per_second'])
+
+
+def make_records(count: int):
+    '''
+    count: int
+    :return: np.ndarray | zeroed structured array with MESSAGE_DTYPE
+    '''
+    return np.zeros(count, dtype=MESSAGE_DTYPE)
@@ -0,0 +1,55 @@
+'''
+Throughput of BookManager on a multi-symbol replay for an increasing number of shard processes.
+
+Run from the directory containing the package:
+    python -m fast_limit_orderbook.benchmarks.manager_scaling --symbols 2000 --messages 500 --workers 0 1 2 4
+'''
+import argparse
+import logging
+import time
+import numpy as np
+from ..batch import ADD, CANCEL, MARKET, make_records
+from ..manager import BookManager
+
+
+def symbol_flow(rng, base_id: int, messages: int):
+    '''
+    Adds around a fixed mid, some cancels of earlier adds and a few market orders
+    '''
+    records = make_records(messages)
+    roll = rng.random(messages)
+    records['action'] = np.where(roll < 0.7, ADD, np.where(roll < 0.95, CANCEL, MARKET))
+    records['side'] = rng.integers(0, 2, messages)
+    records['id'] = base_id + np.arange(messages)
+    cancels = records['action'] == CANCEL
+    records['id'][cancels] = base_id + rng.integers(0, messages, cancels.sum())
+    records['price'] = np.where(records['side'] == 0, rng.integers(990, 1000, messages),
+                                rng.integers(1001, 1011, messages))
+    records['size'] = rng.integers(1, 10, messages)
+    records['timestamp'] = np.arange(messages, dtype=np.float64)
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=2000)
+    parser.add_argument('--messages', type=int, default=500, help='messages per symbol')
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 1, 2, 4])
+    args = parser.parse_args()
+    # market orders that empty a side log a warning each
+    logging.disable(logging.WARNING)
+    rng = np.random.default_rng(0)
+    flow = {f'SYM{s:05d}': symbol_flow(rng, s * args.messages, args.messages) for s in range(args.symbols)}
+    total = args.symbols * args.messages
+    for workers in args.workers:
+        with BookManager(workers=workers) as manager:
+            start = time.perf_counter()
+            for symbol, records in flow.items():
+                manager.submit(symbol, records)
+            manager.collect()
+            elapsed = time.perf_counter() - start
+        print(f'workers={workers}: {total / elapsed:12,.0f} messages/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+'''
+Memory and throughput of the slotted Order / OrderLinkedlist against the previous __dict__ based
+classes, and of add/cancel churn with and without an OrderPool.
+
+Run from the directory containing the package:
+    python -m fast_limit_orderbook.benchmarks.order_memory --orders 200000
+'''
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+from ..lob import LimitOrderBook
+from ..ob_tree.order import Order
+from ..ob_tree.orderlinkedlist import OrderLinkedlist
+from ..ob_tree.pool import OrderPool
+
+
+class LegacyOrder:
+    '''
+    The Order class before __slots__ and enum side/type
+    '''
+
+    def __init__(self, price, id, order_type, timestamp, size, side):
+        self.id = id
+        self.timestamp = timestamp
+        self.side = side
+        self.size = size
+        self.order_type = order_type
+        if self.order_type == 'market':
+            self.price = None
+            self.volume = 0
+        else:
+            self.price = price
+            self.volume = self.size * self.price
+        self.prev = None
+        self.next = None
+
+
+class LegacyLevel:
+    '''
+    The OrderLinkedlist attributes before __slots__
+    '''
+
+    def __init__(self):
+        self.volume = 0
+        self.size = 0
+        self._head = None
+        self._tail = None
+
+
+def measure_memory(order_cls, level_cls, orders: int, levels: int):
+    '''
+    :return: int, float | bytes allocated for the objects, seconds to create them
+    '''
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    book_levels = [level_cls() for _ in range(levels)]
+    book_orders = [order_cls(10000 + i % levels, i, 'limit', 0.0, 1.5, 'bid') for i in range(orders)]
+    elapsed = time.perf_counter() - start
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del book_levels, book_orders
+    return allocated, elapsed
+
+
+def measure_churn(orders: int, pool: OrderPool = None):
+    '''
+    Add/cancel churn on a book that keeps ~1000 resting orders
+    :return: float | operations per second
+    '''
+    lob = LimitOrderBook(pool=pool)
+    rng = random.Random(1)
+    live = []
+    start = time.perf_counter()
+    for order_id in range(orders):
+        price = rng.randint(9900, 10100)
+        side = 'bid' if price < 10000 else 'ask'
+        if pool is None:
+            order = Order(price, order_id, 'limit', 0.0, 1, side)
+        else:
+            order = pool.order(price, order_id, 'limit', 0.0, 1, side)
+        lob.process_order(order)
+        live.append((order_id, side))
+        if len(live) > 1000:
+            cancelled_id, cancelled_side = live.pop(rng.randrange(len(live)))
+            lob.cancel_order(cancelled_id, cancelled_side)
+    return 2 * orders / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', type=int, default=200000)
+    parser.add_argument('--levels', type=int, default=1000)
+    args = parser.parse_args()
+
+    legacy_bytes, legacy_seconds = measure_memory(LegacyOrder, LegacyLevel, args.orders, args.levels)
+    slotted_bytes, slotted_seconds = measure_memory(Order, OrderLinkedlist, args.orders, args.levels)
+    print(f'{args.orders} orders on {args.levels} levels')
+    print(f'  __dict__ classes: {legacy_bytes / 2 ** 20:8.1f} MiB  {args.orders / legacy_seconds:12,.0f} orders/s')
+    print(f'  __slots__ classes: {slotted_bytes / 2 ** 20:7.1f} MiB  {args.orders / slotted_seconds:12,.0f} orders/s')
+    print('add/cancel churn')
+    print(f'  without pool: {measure_churn(args.orders):12,.0f} ops/s')
+    print(f'  with pool:    {measure_churn(args.orders, OrderPool()):12,.0f} ops/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+'''
+Price index backends on books of increasing depth: memory of the index and throughput of the
+operations that create and delete levels (an add at a new price and its cancel, a sweep of the touch
+and its refill), for the Red-Black tree, the bisect-based sorted array and the 'auto' backend.
+
+Run from the directory containing the package:
+    python -m fast_limit_orderbook.benchmarks.sparse_levels --levels 8 32 128 512 4096
+'''
+import argparse
+import gc
+import logging
+import random
+import time
+import tracemalloc
+from ..lob import LimitOrderBook
+from ..ob_tree.order import Order
+from ..ob_tree.tree import make_price_tree
+
+BACKENDS = ('rbtree', 'sorted', 'auto')
+MID = 10000
+TICK = 25
+
+
+def measure_index_memory(backend: str, levels: int):
+    '''
+    :return: int | bytes allocated by a price index holding the given number of levels
+    '''
+    gc.collect()
+    tracemalloc.start()
+    tree = make_price_tree(backend)
+    for i in range(levels):
+        tree[MID - TICK * (i + 1)] = 1
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tree
+    return allocated
+
+
+def build_book(backend: str, levels: int):
+    '''
+    Both sides with the given number of levels, TICK apart, two orders per level
+    '''
+    lob = LimitOrderBook(backend=backend)
+    order_id = 0
+    for i in range(levels):
+        for _ in range(2):
+            order_id += 1
+            lob.process_order(Order(MID - TICK * (i + 1), order_id, 'limit', 0.0, 5, 'bid'))
+            order_id += 1
+            lob.process_order(Order(MID + TICK * (i + 1), order_id, 'limit', 0.0, 5, 'ask'))
+    return lob, order_id
+
+
+def measure_level_churn(backend: str, levels: int, operations: int):
+    '''
+    Add an order at a price between two levels, creating a level, then cancel it
+    :return: float | operations per second
+    '''
+    lob, order_id = build_book(backend, levels)
+    rng = random.Random(1)
+    offsets = [TICK * rng.randrange(1, levels + 1) - TICK // 2 for _ in range(operations)]
+    start = time.perf_counter()
+    for offset in offsets:
+        order_id += 1
+        lob.process_order(Order(MID - offset, order_id, 'limit', 0.0, 1, 'bid'))
+        lob.cancel_order(order_id, 'bid')
+    return 2 * operations / (time.perf_counter() - start)
+
+
+def measure_sweeps(backend: str, levels: int, operations: int):
+    '''
+    Sweep the best ask level with a market order and put it back
+    :return: float | operations per second
+    '''
+    lob, order_id = build_book(backend, levels)
+    start = time.perf_counter()
+    for _ in range(operations):
+        price = lob.ask.min_price
+        size = lob.ask.limit_levels[price].size
+        order_id += 1
+        lob.process_order(Order(None, order_id, 'market', 0.0, size, 'bid'))
+        order_id += 1
+        lob.process_order(Order(price, order_id, 'limit', 0.0, size, 'ask'))
+    return 2 * operations / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--levels', type=int, nargs='+', default=[8, 32, 128, 512, 4096])
+    parser.add_argument('--operations', type=int, default=50000)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    print(f'{"levels":>8}{"backend":>9}{"index KiB":>12}{"add+cancel ops/s":>19}{"sweep+refill ops/s":>21}')
+    for levels in args.levels:
+        for backend in BACKENDS:
+            memory = measure_index_memory(backend, levels)
+            churn = measure_level_churn(backend, levels, args.operations)
+            sweeps = measure_sweeps(backend, levels, args.operations)
+            print(f'{levels:>8}{backend:>9}{memory / 1024:>12.1f}{churn:>19,.0f}{sweeps:>21,.0f}')
+
+
+if __name__ == '__main__':
+    main()
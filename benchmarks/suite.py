@@ -0,0 +1,285 @@
+'''
+Order book benchmark suite with regression tracking.
+
+Synthetic order flow generators (add-heavy, cancel-heavy, sweep-heavy, amend-heavy) draw prices from a geometric
+distance-to-touch distribution around a mid price and sizes from a log-normal, which is roughly
+what real books look like: most activity at the first few levels, a long tail behind them.
+Every public operation is timed individually with perf_counter_ns and reported as ops/sec and
+p50 / p99 / p99.9 latency; the same flow is then replayed through process_records in chunks, the
+way a journal replay or the feed handler drives the book, and reported per message. Results are written as JSON and can be compared against a saved
+baseline; any operation slower than the tolerance makes the run exit with status 1.
+
+Run from the directory containing the package:
+    python -m fast_limit_orderbook.benchmarks.suite --output results.json
+    python -m fast_limit_orderbook.benchmarks.suite --output results.json --baseline baseline.json
+'''
+import argparse
+import json
+import logging
+import platform
+import sys
+import time
+import numpy as np
+from ..lob import LimitOrderBook
+from ..batch import ADD, CANCEL, MODIFY, MARKET, make_records
+from ..ob_tree.order import Order, SIDES
+
+MID = 10000
+REPLAY_CHUNK = 256
+ACTIONS = {'add': ADD, 'cancel': CANCEL, 'reduce': MODIFY, 'increase': MODIFY, 'reprice': MODIFY, 'market': MARKET}
+
+# operation mix of each workload: add, cancel, amend, market;
+# amends are half size reductions, a quarter size increases and a quarter price changes
+WORKLOADS = {
+    'add_heavy': (0.80, 0.10, 0.05, 0.05),
+    'cancel_heavy': (0.45, 0.45, 0.08, 0.02),
+    'sweep_heavy': (0.55, 0.15, 0.05, 0.25),
+    'amend_heavy': (0.25, 0.10, 0.60, 0.05),
+}
+
+
+def generate_flow(workload: str, operations: int, prefill: int = 5000, seed: int = 0):
+    '''
+    workload: str
+        key of WORKLOADS
+    operations: int
+        number of timed operations
+    prefill: int
+        resting orders added before timing starts
+    :return: list, list | prefill adds and timed operations, as tuples:
+        ('add', id, side, price, size), ('cancel', id, side), ('reduce' | 'increase' | 'reprice', id, side, price, size),
+        ('market', id, side, size)
+    '''
+    rng = np.random.default_rng(seed)
+    add, cancel, amend, _ = WORKLOADS[workload]
+    # [id, side, price, size] of every order the generator believes is resting
+    live = []
+    positions = {}
+    next_id = 0
+
+    def draw_price(side):
+        distance = int(rng.geometric(0.25)) - 1
+        return MID - 1 - distance if side == 'bid' else MID + 1 + distance
+
+    def new_add():
+        nonlocal next_id
+        side = 'bid' if rng.random() < 0.5 else 'ask'
+        price = draw_price(side)
+        size = max(1, int(rng.lognormal(1.5, 0.8)))
+        next_id += 1
+        positions[next_id] = len(live)
+        live.append([next_id, side, price, size])
+        return ('add', next_id, side, price, size)
+
+    def take_live():
+        index = int(rng.integers(len(live)))
+        order_id, side = live[index][:2]
+        last = live.pop()
+        if index < len(live):
+            live[index] = last
+            positions[last[0]] = index
+        del positions[order_id]
+        return order_id, side
+
+    def new_amend():
+        entry = live[int(rng.integers(len(live)))]
+        order_id, side, price, size = entry
+        roll = rng.random()
+        if roll < 0.5:
+            kind, size = 'reduce', max(1, size // 2)
+        elif roll < 0.75:
+            kind, size = 'increase', size + max(1, int(rng.lognormal(1.0, 0.8)))
+        else:
+            kind, price = 'reprice', draw_price(side)
+        entry[2:] = price, size
+        return (kind, order_id, side, price, size)
+
+    prefill_flow = [new_add() for _ in range(prefill)]
+    flow = []
+    for roll in rng.random(operations):
+        if roll < add or len(live) < 100:
+            flow.append(new_add())
+        elif roll < add + cancel:
+            flow.append(('cancel',) + take_live())
+        elif roll < add + cancel + amend:
+            flow.append(new_amend())
+        else:
+            next_id += 1
+            side = 'bid' if rng.random() < 0.5 else 'ask'
+            flow.append(('market', next_id, side, max(1, int(rng.lognormal(3.0, 1.0)))))
+    return prefill_flow, flow
+
+
+def _apply(book, operation):
+    kind = operation[0]
+    if kind == 'add':
+        _, order_id, side, price, size = operation
+        book.process_order(Order(price, order_id, 'limit', 0.0, size, side))
+    elif kind == 'cancel':
+        _, order_id, side = operation
+        book.cancel_order(order_id, side)
+    elif kind == 'reduce' or kind == 'increase' or kind == 'reprice':
+        _, order_id, side, price, size = operation
+        book.update_order(order_id, side, new_size=size, new_price=price)
+    else:
+        _, order_id, side, size = operation
+        book.process_order(Order(None, order_id, 'market', 0.0, size, side))
+
+
+def _tracked(book, operation):
+    '''
+    Operations on orders that a sweep already filled are skipped, the generator can't know about fills
+    '''
+    kind = operation[0]
+    if kind in ('cancel', 'reduce', 'increase', 'reprice'):
+        tree = book.bid if operation[2] == 'bid' else book.ask
+        return operation[1] in tree.order_ids
+    if kind == 'market':
+        return len((book.ask if operation[2] == 'bid' else book.bid).limit_levels) > 0
+    return True
+
+
+def to_records(flow):
+    '''
+    :return: np.ndarray | the flow as batch.MESSAGE_DTYPE records
+    '''
+    records = make_records(len(flow))
+    for i, operation in enumerate(flow):
+        kind, order_id, side = operation[:3]
+        price = operation[3] if len(operation) == 5 else 0.0
+        size = operation[-1] if kind != 'cancel' else 0.0
+        records[i] = (ACTIONS[kind], SIDES[side], order_id, price, size, 0.0)
+    return records
+
+
+def run_replay(prefill_flow, flow, book_kwargs: dict = None):
+    '''
+    Replay prefill and flow through process_records; the timed chunks are reported per message
+    :return: dict | see summarize
+    '''
+    book = LimitOrderBook(**(book_kwargs or {}))
+    book.process_records(to_records(prefill_flow))
+    records = to_records(flow)
+    clock = time.perf_counter_ns
+    samples = []
+    for start in range(0, len(records), REPLAY_CHUNK):
+        chunk = records[start:start + REPLAY_CHUNK]
+        begin = clock()
+        book.process_records(chunk)
+        samples.extend([(clock() - begin) / len(chunk)] * len(chunk))
+    return summarize(samples)
+
+
+def run_workload(workload: str, operations: int, book_kwargs: dict = None, seed: int = 0):
+    '''
+    :return: dict | per operation: count, ops_per_sec, p50_ns, p99_ns, p999_ns
+    '''
+    prefill_flow, flow = generate_flow(workload, operations, seed=seed)
+    book = LimitOrderBook(**(book_kwargs or {}))
+    for operation in prefill_flow:
+        _apply(book, operation)
+    timings = {}
+    clock = time.perf_counter_ns
+    for operation in flow:
+        if not _tracked(book, operation):
+            continue
+        start = clock()
+        _apply(book, operation)
+        elapsed = clock() - start
+        timings.setdefault(operation[0], []).append(elapsed)
+    # queries, timed on the final book
+    for name, query in (('depth', lambda: book.depth(10)),
+                        ('best_price', lambda: (book.bid.max_price, book.ask.min_price))):
+        samples = []
+        for _ in range(max(100, operations // 100)):
+            start = clock()
+            query()
+            samples.append(clock() - start)
+        timings[name] = samples
+    results = {name: summarize(samples) for name, samples in timings.items()}
+    results['process_records'] = run_replay(prefill_flow, flow, book_kwargs)
+    return results
+
+
+def summarize(samples):
+    samples = np.asarray(samples, dtype=np.float64)
+    p50, p99, p999 = np.percentile(samples, [50, 99, 99.9])
+    return {
+        'count': int(len(samples)),
+        'ops_per_sec': float(len(samples) / (samples.sum() / 1e9)) if samples.sum() else float('inf'),
+        'p50_ns': float(p50),
+        'p99_ns': float(p99),
+        'p999_ns': float(p999),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float):
+    '''
+    results, baseline: dict | as written by run_suite
+    tolerance: float
+        allowed relative slowdown, e.g. 0.2 for 20%
+    :return: list | one message per regressed metric
+    '''
+    regressions = []
+    for workload, operations in baseline['workloads'].items():
+        for operation, expected in operations.items():
+            actual = results['workloads'].get(workload, {}).get(operation)
+            if actual is None:
+                continue
+            if actual['ops_per_sec'] < expected['ops_per_sec'] * (1 - tolerance):
+                regressions.append(f'{workload}/{operation}: {actual["ops_per_sec"]:,.0f} ops/s, '
+                                   f'baseline {expected["ops_per_sec"]:,.0f}')
+            if actual['p99_ns'] > expected['p99_ns'] * (1 + tolerance):
+                regressions.append(f'{workload}/{operation}: p99 {actual["p99_ns"]:,.0f} ns, '
+                                   f'baseline {expected["p99_ns"]:,.0f}')
+    return regressions
+
+
+def run_suite(operations: int, workloads=None, book_kwargs: dict = None):
+    '''
+    :return: dict | metadata and results of every workload
+    '''
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'operations': operations,
+        'book': book_kwargs or {},
+        'workloads': {workload: run_workload(workload, operations, book_kwargs)
+                      for workload in (workloads or WORKLOADS)},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--operations', type=int, default=100000)
+    parser.add_argument('--workload', action='append', choices=sorted(WORKLOADS))
+    parser.add_argument('--backend', default='auto')
+    parser.add_argument('--lazy-cancel', action='store_true', help='tombstone cancels, see LimitOrderBook')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='JSON results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args(argv)
+    logging.disable(logging.WARNING)
+    results = run_suite(args.operations, args.workload, {'backend': args.backend, 'lazy_cancel': args.lazy_cancel})
+    for workload, operations in results['workloads'].items():
+        print(workload)
+        for operation, stats in operations.items():
+            print(f'  {operation:<16}{stats["ops_per_sec"]:>14,.0f} ops/s  p50 {stats["p50_ns"]:>9,.0f} ns'
+                  f'  p99 {stats["p99_ns"]:>9,.0f} ns  p99.9 {stats["p999_ns"]:>9,.0f} ns')
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print('REGRESSIONS against', args.baseline)
+            for regression in regressions:
+                print('  ' + regression)
+            return 1
+        print('no regressions against', args.baseline)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,246 @@
+'''
+asyncio feed handler maintaining a LimitOrderBook from a websocket L3 stream.
+
+Wire format, one JSON object per websocket message; every book event carries a sequence number:
+    {"type": "add", "seq": 7, "id": 42, "side": "bid", "price": 100, "size": 3, "ts": 1617.2}
+    {"type": "cancel", "seq": 8, "id": 42, "side": "bid"}
+    {"type": "modify", "seq": 9, "id": 42, "side": "bid", "price": 101, "size": 2}
+    {"type": "trade", "seq": 10, "id": 43, "side": "ask", "size": 5}       (aggressor side)
+    {"type": "snapshot", "seq": 10, "bid": {"id": [...], "price": [...], "size": [...], "timestamp": [...]}, "ask": {...}}
+        (orders of a price in time priority, oldest first; snapshot_message sends the prices in ascending
+        order, a snapshot in any other price order is stable-sorted by price when loaded)
+    {"type": "heartbeat", "seq": 10}                                      (last sequence number sent)
+The handler asks for a snapshot with {"type": "snapshot_request"}.
+
+A reader task pushes raw frames into a bounded queue (so a slow book pushes back on the socket) and
+the apply loop drains whatever has piled up, up to batch_size frames, decodes them and hands them to
+LimitOrderBook.process_batch as one micro-batch. A sequence gap, including one only revealed by a
+heartbeat, drops the book's incremental state and resyncs it from a snapshot.
+'''
+import asyncio
+import time
+from collections import deque
+import numpy as np
+import websockets
+from .batch import ADD, CANCEL, MODIFY, MARKET
+from .ob_tree.order import Side, SIDES
+
+try:
+    from yapic import json
+except ImportError:
+    import json
+
+ACTIONS = {'add': ADD, 'cancel': CANCEL, 'modify': MODIFY, 'trade': MARKET}
+
+
+def load_snapshot(book, message: dict):
+    '''
+    book: LimitOrderBook
+    message: dict | decoded snapshot message
+        Replace the content of the book with the snapshot; the orders of a side are stable-sorted by price
+        first unless the prices already ascend, so each level keeps the time priority of the message
+    '''
+    fixed_point = book.fixed_point
+    for name, side, tree in (('bid', Side.BID, book.bid), ('ask', Side.ASK, book.ask)):
+        columns = message[name]
+        ids, prices, sizes, timestamps = (np.asarray(columns[column])
+                                          for column in ('id', 'price', 'size', 'timestamp'))
+        if (np.diff(prices) < 0).any():
+            order = np.argsort(prices, kind='stable')
+            ids, prices, sizes, timestamps = ids[order], prices[order], sizes[order], timestamps[order]
+        if fixed_point is not None:
+            prices, sizes = fixed_point.prices(prices), fixed_point.sizes(sizes)
+        tree.load_columns(side, ids, prices, sizes, timestamps)
+
+
+def snapshot_message(book, seq: int):
+    '''
+    book: LimitOrderBook
+    seq: int
+        sequence number of the last event applied to the book
+    :return: dict | snapshot message, see the module docstring
+    '''
+    message = {'type': 'snapshot', 'seq': seq}
+    fixed_point = book.fixed_point
+    for name, tree in (('bid', book.bid), ('ask', book.ask)):
+        columns = tree.to_columns()
+        if fixed_point is not None:
+            columns['price'] = fixed_point.to_prices(columns['price'])
+            columns['size'] = fixed_point.to_sizes(columns['size'])
+        # hidden iceberg reserve is not published
+        message[name] = {column: columns[column].tolist() for column in ('id', 'price', 'size', 'timestamp')}
+    return message
+
+
+def apply_events(book, events):
+    '''
+    book: LimitOrderBook
+    events: list | decoded add / cancel / modify / trade messages
+        Apply the events as one batch
+    :return: BatchReport
+    '''
+    actions, sides, prices, sizes, ids, timestamps = [], [], [], [], [], []
+    for event in events:
+        actions.append(ACTIONS[event['type']])
+        sides.append(SIDES[event['side']])
+        prices.append(event.get('price', 0))
+        sizes.append(event.get('size', 0))
+        ids.append(event['id'])
+        timestamps.append(event.get('ts', 0.0))
+    return book.process_batch(actions, sides, prices, sizes, ids, timestamps)
+
+
+class FeedHandler:
+
+    def __init__(self, book, uri: str, batch_size: int = 512, queue_size: int = 4096, latency_window: int = 100000):
+        '''
+        book: LimitOrderBook
+        uri: str
+            websocket endpoint
+        batch_size: int
+            most frames coalesced into a single process_batch call
+        queue_size: int
+            frames buffered between the socket and the book before the reader stops reading
+        latency_window: int
+            number of most recent end-to-end latencies kept for stats()
+        self.expected_seq: int | None
+            next sequence number to apply, None while waiting for a snapshot
+        '''
+        self.book = book
+        self.uri = uri
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.expected_seq = None
+        self.messages = 0
+        self.batches = 0
+        self.gaps = 0
+        self.snapshots = 0
+        self.max_queue_depth = 0
+        # seconds between the sender's "ts" and the event being applied to the book
+        self.latencies = deque(maxlen=latency_window)
+        self._websocket = None
+        self._queue = None
+        self._snapshot_pending = False
+
+    async def run(self, until_seq: int = None):
+        '''
+        until_seq: int | None
+            return once every event up to this sequence number is in the book;
+            otherwise run until the server closes the connection
+        '''
+        self._queue = asyncio.Queue(self.queue_size)
+        async with websockets.connect(self.uri) as websocket:
+            self._websocket = websocket
+            await self._request_snapshot()
+            reader = asyncio.ensure_future(self._read(websocket))
+            try:
+                await self._apply_loop(until_seq)
+            finally:
+                reader.cancel()
+
+    async def _read(self, websocket):
+        try:
+            async for frame in websocket:
+                await self._queue.put(frame)
+        except websockets.ConnectionClosed:
+            pass
+        await self._queue.put(None)
+
+    async def _request_snapshot(self):
+        if not self._snapshot_pending:
+            self._snapshot_pending = True
+            self.expected_seq = None
+            await self._websocket.send(json.dumps({'type': 'snapshot_request'}))
+
+    async def _apply_loop(self, until_seq):
+        queue = self._queue
+        while True:
+            frames = [await queue.get()]
+            while len(frames) < self.batch_size and not queue.empty():
+                frames.append(queue.get_nowait())
+            self.max_queue_depth = max(self.max_queue_depth, len(frames) + queue.qsize())
+            closed = frames[-1] is None
+            if closed:
+                frames.pop()
+            await self._apply_frames(frames)
+            if closed:
+                return
+            if until_seq is not None and self.expected_seq is not None and self.expected_seq > until_seq:
+                return
+
+    async def _apply_frames(self, frames):
+        '''
+        Decode the frames and apply the in-sequence book events as one batch
+        '''
+        pending = []
+        for frame in frames:
+            message = json.loads(frame)
+            kind = message['type']
+            seq = message['seq']
+            if kind == 'snapshot':
+                self._flush(pending)
+                load_snapshot(self.book, message)
+                self.expected_seq = seq + 1
+                self._snapshot_pending = False
+                self.snapshots += 1
+            elif self.expected_seq is None:
+                # waiting for a snapshot, it will cover this event
+                continue
+            elif kind == 'heartbeat':
+                if seq >= self.expected_seq:
+                    self.gaps += 1
+                    self._flush(pending)
+                    await self._request_snapshot()
+            elif seq < self.expected_seq:
+                continue
+            elif seq > self.expected_seq:
+                self.gaps += 1
+                self._flush(pending)
+                await self._request_snapshot()
+            else:
+                pending.append(message)
+                self.expected_seq += 1
+        self._flush(pending)
+
+    def _flush(self, events):
+        if not events:
+            return
+        apply_events(self.book, events)
+        now = time.time()
+        self.latencies.extend(now - event['ts'] for event in events if 'ts' in event)
+        self.messages += len(events)
+        self.batches += 1
+        events.clear()
+
+    def stats(self):
+        '''
+        :return: dict | counters plus p50 / p99 end-to-end latency in microseconds
+        '''
+        latencies = np.fromiter(self.latencies, dtype=np.float64, count=len(self.latencies)) * 1e6
+        p50, p99 = np.percentile(latencies, [50, 99]) if len(latencies) else (np.nan, np.nan)
+        return {
+            'messages': self.messages,
+            'batches': self.batches,
+            'messages_per_batch': self.messages / self.batches if self.batches else 0.0,
+            'gaps': self.gaps,
+            'snapshots': self.snapshots,
+            'max_queue_depth': self.max_queue_depth,
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'latency_p50_us': float(p50),
+            'latency_p99_us': float(p99),
+        }
+
+
+def run(book, uri: str, **kwargs):
+    '''
+    Run a FeedHandler to completion, on uvloop when it is installed
+    :return: FeedHandler
+    '''
+    handler = FeedHandler(book, uri, **kwargs)
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(handler.run())
+    else:
+        uvloop.run(handler.run())
+    return handler
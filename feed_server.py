@@ -0,0 +1,90 @@
+'''
+Local websocket stand-in for an L3 market-data feed, speaking the protocol described in feed.py.
+
+The server plays a script of add / cancel / modify / trade events, numbering them 1..N and applying
+each one to its own reference LimitOrderBook before sending it, so it can answer snapshot requests
+and tests can compare a FeedHandler's book against the reference. The stream starts after the
+client's first message (its initial snapshot request) has been answered. Sequence numbers listed in
+`drop` are applied but never sent, to exercise gap detection. Once the script is exhausted the
+server keeps sending heartbeats until the client disconnects.
+'''
+import asyncio
+import time
+import websockets
+from .lob import LimitOrderBook
+from .feed import apply_events, snapshot_message, json
+
+
+class StandInFeedServer:
+
+    def __init__(self, events, drop=(), heartbeat_interval: float = 0.05, yield_every: int = 64):
+        '''
+        events: list | add / cancel / modify / trade messages without seq
+        drop: iterable | sequence numbers that are applied to the reference book but not sent
+        heartbeat_interval: float
+            seconds between heartbeats once every event has been sent
+        yield_every: int
+            number of events sent before letting the event loop serve snapshot requests
+        '''
+        self.events = events
+        self.drop = set(drop)
+        self.heartbeat_interval = heartbeat_interval
+        self.yield_every = yield_every
+        self.book = LimitOrderBook()
+        self.seq = 0
+        self.port = None
+        self._server = None
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0):
+        self._server = await websockets.serve(self._handler, host, port)
+        self.port = next(iter(self._server.sockets)).getsockname()[1]
+        return self
+
+    @property
+    def uri(self):
+        return f'ws://127.0.0.1:{self.port}'
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def _handler(self, websocket, *args):
+        # a client opens with a snapshot request, the stream starts right after the snapshot
+        if json.loads(await websocket.recv())['type'] == 'snapshot_request':
+            await websocket.send(json.dumps(snapshot_message(self.book, self.seq)))
+        requests = []
+
+        async def listen():
+            async for frame in websocket:
+                if json.loads(frame)['type'] == 'snapshot_request':
+                    requests.append(True)
+
+        listener = asyncio.ensure_future(listen())
+        try:
+            for event in self.events:
+                if requests:
+                    requests.clear()
+                    await websocket.send(json.dumps(snapshot_message(self.book, self.seq)))
+                self.seq += 1
+                message = dict(event, seq=self.seq, ts=time.time())
+                apply_events(self.book, [message])
+                if self.seq not in self.drop:
+                    await websocket.send(json.dumps(message))
+                if self.seq % self.yield_every == 0:
+                    await asyncio.sleep(0)
+            while True:
+                if requests:
+                    requests.clear()
+                    await websocket.send(json.dumps(snapshot_message(self.book, self.seq)))
+                await websocket.send(json.dumps({'type': 'heartbeat', 'seq': self.seq}))
+                await asyncio.sleep(self.heartbeat_interval)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            listener.cancel()
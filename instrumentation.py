@@ -0,0 +1,200 @@
+'''
+Switchable latency instrumentation for LimitOrderBook.
+
+Nothing here runs unless it is switched on: Instrumentation installs timing wrappers as instance
+attributes on the book and on both of its trees, shadowing process_order, update_order, remove_order
+and market_order, and uninstall() deletes them again, so a book that isn't instrumented executes
+exactly the same code as before. Each wrapper records a perf_counter_ns delta into a preallocated
+log-linear histogram (the HDR histogram layout: one bucket per value below 2 ** sub_bucket_bits,
+then 2 ** (sub_bucket_bits - 1) linear buckets per power of two), so recording is a couple of integer
+operations and a list increment with bounded relative error. Sweeps also record how many price
+levels they touched, counted from the fills they emit.
+'''
+import time
+import numpy as np
+
+
+class LatencyHistogram:
+
+    def __init__(self, sub_bucket_bits: int = 6, max_bits: int = 40):
+        '''
+        sub_bucket_bits: int
+            values below 2 ** sub_bucket_bits are counted exactly, larger values with a relative
+            error below 2 ** -(sub_bucket_bits - 1)
+        max_bits: int
+            values of 2 ** (sub_bucket_bits + max_bits) and more land in the last bucket;
+            the default covers about 18 hours in nanoseconds
+        '''
+        self.sub_bucket_bits = sub_bucket_bits
+        self._linear = 1 << sub_bucket_bits
+        self._half = self._linear >> 1
+        self._last = self._linear + max_bits * self._half - 1
+        self.counts = [0] * (self._last + 1)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def record(self, value: int):
+        '''
+        value: int | non-negative
+        O(1)
+        '''
+        if value < self._linear:
+            index = value
+        else:
+            shift = value.bit_length() - self.sub_bucket_bits
+            index = self._linear + (shift - 1) * self._half + (value >> shift) - self._half
+            if index > self._last:
+                index = self._last
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        if self.min is None or value < self.min:
+            self.min = value
+
+    def upper_bound(self, index: int):
+        '''
+        :return: int | highest value counted in the bucket
+        '''
+        if index < self._linear:
+            return index
+        shift, offset = divmod(index - self._linear, self._half)
+        shift += 1
+        return ((self._half + offset + 1) << shift) - 1
+
+    def percentile(self, q: float):
+        '''
+        q: float | in [0, 100]
+        :return: int | upper bound of the bucket holding the q-th percentile, capped by the largest value seen
+        '''
+        if self.count == 0:
+            return 0
+        cumulative = np.cumsum(self.counts)
+        index = int(np.searchsorted(cumulative, max(1, int(np.ceil(q / 100 * self.count)))))
+        return min(self.upper_bound(index), self.max)
+
+    def reset(self):
+        self.counts = [0] * (self._last + 1)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def export(self, buckets: bool = False):
+        '''
+        buckets: bool
+            also return the non-empty buckets as (upper bound, count) pairs
+        :return: dict | count, min, max, mean, p50, p90, p99, p999
+        '''
+        summary = {
+            'count': self.count,
+            'min': self.min or 0,
+            'max': self.max,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'p999': self.percentile(99.9),
+        }
+        if buckets:
+            summary['buckets'] = [(self.upper_bound(i), c) for i, c in enumerate(self.counts) if c]
+        return summary
+
+
+class Instrumentation:
+    '''
+    Latency histograms of one LimitOrderBook; use LimitOrderBook.enable_instrumentation
+    '''
+    BOOK_METHODS = ('process_order', 'update_order')
+    TREE_METHODS = ('remove_order', 'market_order')
+
+    def __init__(self, book, sub_bucket_bits: int = 6):
+        '''
+        book: LimitOrderBook
+        self.histograms: dict
+            key: operation name, value: LatencyHistogram of nanoseconds per call;
+            'sweep_levels' counts price levels touched per market_order call instead
+        '''
+        self.book = book
+        self.histograms = {name: LatencyHistogram(sub_bucket_bits) for name in self.BOOK_METHODS + self.TREE_METHODS}
+        self.histograms['sweep_levels'] = LatencyHistogram(sub_bucket_bits)
+        self.installed = False
+
+    def install(self):
+        if self.installed:
+            return
+        for name in self.BOOK_METHODS:
+            setattr(self.book, name, self._timed(getattr(self.book, name), self.histograms[name]))
+        for tree in (self.book.bid, self.book.ask):
+            tree.remove_order = self._timed(tree.remove_order, self.histograms['remove_order'])
+            tree.market_order = self._timed_sweep(tree)
+        self.installed = True
+
+    def uninstall(self):
+        if not self.installed:
+            return
+        for name in self.BOOK_METHODS:
+            delattr(self.book, name)
+        for tree in (self.book.bid, self.book.ask):
+            for name in self.TREE_METHODS:
+                delattr(tree, name)
+        self.installed = False
+
+    @staticmethod
+    def _timed(method, histogram):
+        clock = time.perf_counter_ns
+        record = histogram.record
+
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                record(clock() - start)
+        return timed
+
+    def _timed_sweep(self, tree):
+        '''
+        Times market_order and counts the distinct prices of the fills it emits, chaining the
+        tree's own fill_sink for the duration of the call
+        '''
+        method = tree.market_order
+        clock = time.perf_counter_ns
+        record = self.histograms['market_order'].record
+        record_levels = self.histograms['sweep_levels'].record
+
+        def market_order(order, limit_price=None):
+            sink = tree.fill_sink
+            levels = [None, 0]
+
+            def counting_sink(maker_id, taker_id, price, size, timestamp):
+                if price != levels[0]:
+                    levels[0] = price
+                    levels[1] += 1
+                if sink is not None:
+                    sink(maker_id, taker_id, price, size, timestamp)
+
+            tree.fill_sink = counting_sink
+            start = clock()
+            try:
+                return method(order, limit_price)
+            finally:
+                record(clock() - start)
+                tree.fill_sink = sink
+                record_levels(levels[1])
+        return market_order
+
+    def reset(self):
+        for histogram in self.histograms.values():
+            histogram.reset()
+
+    def export(self, buckets: bool = False):
+        '''
+        buckets: bool
+            include the non-empty histogram buckets, see LatencyHistogram.export
+        :return: dict | operation name -> summary; latencies are in nanoseconds, sweep_levels in levels
+        '''
+        return {name: histogram.export(buckets) for name, histogram in self.histograms.items()}
@@ -0,0 +1,188 @@
+'''
+Binary event journal for LimitOrderBook.
+
+The file is a 16 byte header (magic, version, record size) followed by fixed-width records, one per
+add / cancel / modify / market event. A record starts with the batch.MESSAGE_DTYPE fields and carries
+the order attributes the batch format has no column for (time in force, post-only, expiry, iceberg peak,
+owner, stop price), so that replay rebuilds the same book: refused fill-or-kill and post-only orders are
+refused again, IOC remainders are dropped again, GTT orders expire again and stops wait for their trigger.
+Replaying a journal is a numpy.memmap of the file: runs of plain records are handed to
+LimitOrderBook.process_records without being parsed or copied, the others go through process_order.
+Version 1 journals (batch.MESSAGE_DTYPE records only) are still read.
+'''
+import math
+import os
+import struct
+import numpy as np
+from .batch import ADD, CANCEL, MODIFY, MARKET, MESSAGE_DTYPE
+from .ob_tree.order import Order, OrderType, PostOnly, Side, TimeInForce
+
+MAGIC = b'LOBJRNL\x00'
+VERSION = 2
+HEADER = struct.Struct('=8sII')
+RECORD = struct.Struct('=BBqdddBBddqd')
+
+# no expiry / stop price is NaN, no owner is -1
+JOURNAL_DTYPE = np.dtype(MESSAGE_DTYPE.descr + [
+    ('time_in_force', np.uint8),
+    ('post_only', np.uint8),
+    ('expire_at', np.float64),
+    ('peak', np.float64),
+    ('owner', np.int64),
+    ('stop_price', np.float64),
+])
+
+assert RECORD.size == JOURNAL_DTYPE.itemsize
+
+# record layout of each readable version
+_DTYPES = {1: MESSAGE_DTYPE, VERSION: JOURNAL_DTYPE}
+
+
+class JournalWriter:
+
+    def __init__(self, path, buffer_size: int = 1 << 20):
+        '''
+        path: str
+            journal file; appended to if it already exists
+        buffer_size: int
+            bytes buffered before hitting the file system
+        '''
+        self.path = path
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if exists and _check_header(path) != VERSION:
+            raise ValueError(f'{path} is a version 1 journal, it cannot be appended to')
+        self._file = open(path, 'ab', buffering=buffer_size)
+        if not exists:
+            self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+        self._pack = RECORD.pack
+
+    def append(self, action: int, side: int, order_id: int, price, size, timestamp, time_in_force: int = 0,
+               post_only: int = 0, expire_at=None, peak=0, owner: int = None, stop_price=None):
+        '''
+        Write one event
+        '''
+        self._file.write(self._pack(action, side, order_id, price or 0.0, size, timestamp, time_in_force,
+                                    post_only, math.nan if expire_at is None else expire_at, peak,
+                                    -1 if owner is None else owner, math.nan if stop_price is None else stop_price))
+
+    def order(self, order, price, size, peak, stop_price):
+        '''
+        order: Order Instance
+            an incoming add or market order, before the book has touched it
+        price, size, peak, stop_price:
+            the order's prices and sizes in the units of the API
+        '''
+        self.append(ADD if order.order_type is OrderType.LIMIT else MARKET, order.side, order.id, price, size,
+                    order.timestamp, order.time_in_force, order.post_only, order.expire_at, peak, order.owner,
+                    stop_price)
+
+    def cancel(self, order_id: int, side: int, timestamp):
+        '''
+        timestamp: int | float
+            the book's clock, so that replay sees the same event times as the book did
+        '''
+        self.append(CANCEL, side, order_id, 0.0, 0.0, timestamp)
+
+    def modify(self, order_id: int, side: int, price, size, timestamp):
+        self.append(MODIFY, side, order_id, price, size, timestamp)
+
+    def extend(self, records):
+        '''
+        records: np.ndarray | structured array with batch.MESSAGE_DTYPE
+            Write a whole batch of plain messages at once
+        '''
+        wide = np.zeros(len(records), dtype=JOURNAL_DTYPE)
+        for name in MESSAGE_DTYPE.names:
+            wide[name] = records[name]
+        wide['expire_at'] = np.nan
+        wide['owner'] = -1
+        wide['stop_price'] = np.nan
+        self._file.write(wide.tobytes())
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _check_header(path):
+    '''
+    :return: int | the journal's version; ValueError if the file is not a journal this module can read
+    '''
+    with open(path, 'rb') as f:
+        magic, version, record_size = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC or version not in _DTYPES or record_size != _DTYPES[version].itemsize:
+        raise ValueError(f'{path} is not a version 1 or {VERSION} order book journal')
+    return version
+
+
+def read_journal(path):
+    '''
+    path: str
+    :return: np.memmap | read-only structured array mapped onto the file, with JOURNAL_DTYPE
+        (batch.MESSAGE_DTYPE for a version 1 journal)
+    '''
+    dtype = _DTYPES[_check_header(path)]
+    count = (os.path.getsize(path) - HEADER.size) // dtype.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', offset=HEADER.size, shape=(count,))
+
+
+def _order(record):
+    '''
+    :return: Order Instance | the add or market order a journal record describes
+    '''
+    action, side, order_id, price, size, timestamp, time_in_force, post_only, expire_at, peak, owner, \
+        stop_price = record.tolist()
+    return Order(price, order_id, OrderType.LIMIT if action == ADD else OrderType.MARKET, timestamp, size,
+                 Side(side), peak, TimeInForce(time_in_force), None if math.isnan(expire_at) else expire_at,
+                 PostOnly(post_only), None if owner < 0 else owner, None if math.isnan(stop_price) else stop_price)
+
+
+def replay_records(book, records):
+    '''
+    book: LimitOrderBook
+    records: np.ndarray | structured array with JOURNAL_DTYPE, or batch.MESSAGE_DTYPE
+        Apply the records in order: runs of plain messages go through process_records in one call each,
+        orders with a time in force, post-only flag, peak, owner or stop price through process_order
+    :return: int | number of records the book refused
+    '''
+    if records.dtype.names != JOURNAL_DTYPE.names:
+        return book.process_records(records).rejected
+    special = np.flatnonzero((records['time_in_force'] != 0) | (records['post_only'] != 0) |
+                             (records['peak'] != 0) | (records['owner'] >= 0) | ~np.isnan(records['stop_price']))
+    rejected = start = 0
+    for index in special.tolist() + [len(records)]:
+        if index > start:
+            rejected += book.process_records(records[start:index]).rejected
+        if index < len(records):
+            try:
+                book.process_order(_order(records[index]))
+            except ValueError:
+                rejected += 1
+        start = index + 1
+    return rejected
+
+
+def replay_journal(book, path, chunk_size: int = 1 << 16):
+    '''
+    book: LimitOrderBook
+    path: str
+    chunk_size: int
+        records replayed at a time, bounds the memory used by the list conversion
+        Rebuild the book from a journal
+    :return: int, int | number of records replayed, number rejected by the book
+    '''
+    records = read_journal(path)
+    rejected = 0
+    for start in range(0, len(records), chunk_size):
+        rejected += replay_records(book, records[start:start + chunk_size])
+    return len(records), rejected
@@ -82,48 +82,692 @@ in O(1) time when a limit is deleted (which is why each Limit has a Limit
 *parent) so that GetBestBid/Offer can remain O(1)."
 '''
 
+import time
+from collections import namedtuple
+import numpy as np
 from .ob_tree.tree import LOBTree
-from .ob_tree.order import Order
+from .ob_tree.order import Order, OrderType, PostOnly, Side, SIDES, SELF_TRADE_PREVENTION, TimeInForce
+from .ob_tree.timer_wheel import TimerWheel
+from .ob_tree.stops import StopIndex
+from .ob_tree.fixed_point import FixedPoint
+from .batch import ADD, CANCEL, MODIFY, MARKET, MESSAGE_DTYPE, BatchReport
+from .instrumentation import Instrumentation
+
+CHECKPOINT_VERSION = 4
+# checkpoint columns added after version 1: peak / reserve (2), expire_at (3), owner (4)
+OPTIONAL_COLUMNS = ('peak', 'reserve', 'expire_at', 'owner')
+
+# per side arrays of equal length, best level first
+Depth = namedtuple('Depth', ['bid_prices', 'bid_sizes', 'bid_counts', 'ask_prices', 'ask_sizes', 'ask_counts'])
+
 
 class LimitOrderBook:
-    def __init__(self):
-        self.bid = LOBTree()
-        self.ask = LOBTree()
-        self.best_bid = None
-        self.best_ask = None
+    def __init__(self, backend: str = 'auto', tick_size=1, window: int = 4096, fill_sink=None, pool=None,
+                 level_stats: bool = False, queue_positions: bool = False, journal=None, instrumentation: bool = False,
+                 timer_resolution=0.001, delta_sink=None, self_trade_prevention=None, lazy_cancel: bool = False,
+                 lot_size=None):
+        '''
+        backend: str
+            price level index used by both sides of the book;
+            'auto' for a sorted array of prices that turns into a bintrees.FastRBTree when the side gets deep,
+            'sorted' or 'rbtree' for either one all the time, 'ladder' for a dense tick ladder (tick-quantized
+            instruments only)
+        tick_size: int | float
+            minimum price increment, used by the ladder backend, level_stats, post-only repricing and lot_size
+        window: int
+            number of ticks the ladder preallocates around the touch
+        fill_sink: callable | None
+            called as fill_sink(maker_id, taker_id, price, size, timestamp) for every match on either side,
+            e.g. the append method of an ob_tree.fills.FillBuffer
+        pool: OrderPool | None
+            free-list shared by both sides; cancelled and filled orders and emptied levels are recycled through it
+        level_stats: bool
+            maintain segment trees for O(log M) range_volume / level_with_most_orders queries;
+            prices must then be multiples of tick_size
+        queue_positions: bool
+            index every level's queue so that queue_position is O(log n) on deep levels
+        journal: JournalWriter | None
+            every add / cancel / modify / market event is appended to it before being applied
+        instrumentation: bool
+            start with latency instrumentation enabled, see enable_instrumentation
+        timer_resolution: int | float
+            granularity of good-till-time expiry, in Order.timestamp units
+        delta_sink: callable | None
+            called as delta_sink(side, price, size, number of orders) every time a price level of either
+            side changes, e.g. the append method of an ob_tree.deltas.DeltaPublisher
+        self_trade_prevention: None | str | SelfTradePrevention
+            None (orders of the same owner trade with each other), 'cancel_newest', 'cancel_oldest',
+            'cancel_both' or 'decrement', or the SelfTradePrevention member; applied inside the matching loop
+            whenever an incoming order with an owner meets a resting order of the same owner;
+            fill-or-kill checks still count the owner's resting orders as liquidity
+        lazy_cancel: bool
+            cancels only tombstone the order and fix its level's size and order count, O(1); the matching loop
+            skips tombstones and levels are compacted as they go, see LOBTree.cancel_order and compact.
+            Cancel-heavy flow gains the most; a cancelled order is never returned
+        lot_size: int | float | None
+            minimum size increment; when given the book runs on fixed-point integers, see ob_tree.fixed_point:
+            prices are stored as ticks and sizes as lots, so matching and level aggregates are exact integer
+            arithmetic. The methods of the book take and return prices and sizes in the caller's units and
+            refuse (ValueError) prices off the tick grid or sizes that aren't whole lots; orders handed to
+            process_order are converted in place. Everything below the book (LOBTree, resting Order instances,
+            fill_sink and delta_sink arguments, last_trade_price) is in ticks and lots, FillBuffer and
+            DeltaPublisher convert back when given the book's fixed_point
+        self.clock: int | float | None
+            timestamp of the message being or last processed, None before the first one
+        self.last_trade_price: int | float | None
+            price of the last match, None before the first one
+        self.bid_stops, self.ask_stops: StopIndex
+            pending stop and stop-limit orders of each side, see process_order
+        self.fixed_point: FixedPoint | None
+            tick and lot conversion when lot_size is given
+        '''
+        self.fixed_point = None
+        if lot_size is not None:
+            self.fixed_point = FixedPoint(tick_size, lot_size)
+            # one tick is 1 inside the book
+            tick_size = 1
+        self.bid = LOBTree(backend, tick_size, window, level_stats, queue_positions, lazy_cancel)
+        self.ask = LOBTree(backend, tick_size, window, level_stats, queue_positions, lazy_cancel)
+        if self.fixed_point is not None:
+            self.bid.dtype = self.ask.dtype = np.int64
+        self.bid.fill_sink = fill_sink
+        self.ask.fill_sink = fill_sink
+        self.pool = pool
+        self.bid.pool = pool
+        self.ask.pool = pool
+        self.bid.side = Side.BID
+        self.ask.side = Side.ASK
+        self.bid.delta_sink = delta_sink
+        self.ask.delta_sink = delta_sink
+        self.bid.self_trade_prevention = self.ask.self_trade_prevention = SELF_TRADE_PREVENTION[self_trade_prevention]
+        self.journal = journal
+        self.timers = TimerWheel(timer_resolution)
+        self.clock = None
+        self.last_trade_price = None
+        self.bid_stops = StopIndex(Side.BID)
+        self.ask_stops = StopIndex(Side.ASK)
+        self._triggering = False
+        self.instrumentation = None
+        if instrumentation:
+            self.enable_instrumentation()
+
+    @property
+    def best_bid(self):
+        '''
+        Highest bid price, None if the bid side is empty; kept up to date by every level insertion and removal
+        O(1)
+        '''
+        if self.fixed_point is not None:
+            return self.fixed_point.to_price(self.bid.max_price)
+        return self.bid.max_price
+
+    @property
+    def best_ask(self):
+        '''
+        Lowest ask price, None if the ask side is empty
+        O(1)
+        '''
+        if self.fixed_point is not None:
+            return self.fixed_point.to_price(self.ask.min_price)
+        return self.ask.min_price
+
+    def top_of_book(self):
+        '''
+        :return: (bid price, bid size, ask price, ask size) | price None and size 0 for an empty side
+            O(1)
+        '''
+        top = self._top_of_book()
+        fixed_point = self.fixed_point
+        if fixed_point is None:
+            return top
+        bid, bid_size, ask, ask_size = top
+        return (fixed_point.to_price(bid), fixed_point.to_size(bid_size),
+                fixed_point.to_price(ask), fixed_point.to_size(ask_size))
+
+    def _top_of_book(self):
+        '''
+        top_of_book in ticks and lots
+        '''
+        bid, ask = self.bid.max_price, self.ask.min_price
+        return (bid, 0 if bid is None else self.bid.limit_levels[bid].size,
+                ask, 0 if ask is None else self.ask.limit_levels[ask].size)
+
+    def enable_instrumentation(self, sub_bucket_bits: int = 6):
+        '''
+        sub_bucket_bits: int
+            histogram precision, see instrumentation.LatencyHistogram
+            Start recording per-call latencies of process_order, update_order, remove_order and
+            market_order, and the number of levels touched per sweep; the histograms are kept
+            across disable / enable
+        :return: Instrumentation | its export() method returns the histograms
+        '''
+        if self.instrumentation is None:
+            self.instrumentation = Instrumentation(self, sub_bucket_bits)
+        self.instrumentation.install()
+        return self.instrumentation
+
+    def disable_instrumentation(self):
+        '''
+        Remove the timing wrappers, the book runs uninstrumented code again
+        '''
+        if self.instrumentation is not None:
+            self.instrumentation.uninstall()
 
     def process_order(self, order: Order):
         '''
         Take in either a limit or market order; 
-        if limit order's side is bid, add it to the bid book, else add it to the ask book;
-        if market order's side is 'bid', match it against the ask book, else match it against the bid book
+        if limit order's side is bid, match it against the ask book up to its limit price and add the remainder to the bid book, 
+        else match it against the bid book and add the remainder to the ask book;
+        if market order's side is 'bid', match it against the ask book, else match it against the bid book;
+        an order with a stop_price waits in the stop index of its side instead, until a trade reaches the stop
+        price, see trigger_stops; with a lot_size the order is converted to ticks and lots in place first
         '''
-        if order.order_type == 'limit':
-            if order.is_bid():
-                if order.id not in self.bid.order_ids:
-                    self.bid.insert_order(order)
-                else:
-                    raise ValueError('Order already in the list, please use "update" order')
+        if self.fixed_point is not None:
+            self.fixed_point.order(order)
+        self._process_order(order)
+
+    def _process_order(self, order: Order):
+        '''
+        process_order for an order already in ticks and lots
+        '''
+        self.clock = order.timestamp
+        if self.timers.count:
+            self.expire_orders(order.timestamp)
+        # released stops were journaled when they arrived
+        if self.journal is not None and not self._triggering:
+            self._journal_order(order)
+        if order.stop_price is not None:
+            self._add_stop(order)
+        elif order.order_type is OrderType.LIMIT:
+            self._process_limit_order(order)
+        elif order.order_type is OrderType.MARKET:
+            self._process_market_order(order)
+        if self.bid_stops.order_ids or self.ask_stops.order_ids:
+            self.trigger_stops()
+
+    def _journal_order(self, order: Order):
+        '''
+        Journal an incoming add or market order, with its time in force, post-only flag, peak, owner and stop
+        price, in the units of the API; refused orders are journaled too, replay refuses them the same way
+        '''
+        fixed_point = self.fixed_point
+        if fixed_point is None:
+            self.journal.order(order, order.price, order.size, order.peak, order.stop_price)
+        else:
+            self.journal.order(order, fixed_point.to_price(order.price), fixed_point.to_size(order.size),
+                               fixed_point.to_size(order.peak), fixed_point.to_price(order.stop_price))
+
+    def _process_limit_order(self, order: Order):
+        '''
+        order: Order Instance
+            Match the marketable part of a limit order against the opposite book, rest the remainder;
+            IOC orders drop the remainder, FOK orders are only matched if they can be filled in full,
+            post-only orders never match and GTT orders are scheduled for expiry once they rest.
+            Refused orders raise ValueError before the book is touched
+        '''
+        if order.is_bid():
+            book, opposite = self.bid, self.ask
+            best = opposite.min_price
+            crosses = best is not None and order.price >= best
+        else:
+            book, opposite = self.ask, self.bid
+            best = opposite.max_price
+            crosses = best is not None and order.price <= best
+        if order.id in book.order_ids:
+            raise ValueError('Order already in the list, please use "update" order')
+        book.check_price(order.price)
+        time_in_force = order.time_in_force
+        if time_in_force is TimeInForce.GTT and order.expire_at <= order.timestamp:
+            raise ValueError('good-till-time order expired on arrival')
+        if crosses:
+            if order.post_only is PostOnly.REJECT:
+                raise ValueError('post-only order would cross the book')
+            if order.post_only is PostOnly.REPRICE:
+                order.price = best - book.tick_size if order.is_bid() else best + book.tick_size
+            elif time_in_force is TimeInForce.FOK and not opposite.fillable(order, order.price):
+                raise ValueError('fill-or-kill order cannot be filled in full')
             else:
-                if order.id not in self.ask.order_ids:
-                    self.ask.insert_order(order)
+                opposite.market_order(order, order.price)
+                if opposite.last_price is not None:
+                    self.last_trade_price = opposite.last_price
+        elif time_in_force is TimeInForce.FOK:
+            raise ValueError('fill-or-kill order cannot be filled in full')
+        # a FOK order that got here is filled, IOC and FOK remainders are never rested
+        if order.size > 0 and time_in_force is not TimeInForce.IOC and time_in_force is not TimeInForce.FOK:
+            book.insert_order(order)
+            if time_in_force is TimeInForce.GTT:
+                self._schedule_expiry(order)
+
+    def _process_market_order(self, order: Order):
+        '''
+        order: Order Instance
+            Match a market order against the opposite book; a FOK market order is refused with
+            ValueError unless the opposite book can fill it in full
+        '''
+        opposite = self.ask if order.is_bid() else self.bid
+        if order.time_in_force is TimeInForce.FOK and not opposite.fillable(order):
+            raise ValueError('fill-or-kill order cannot be filled in full')
+        opposite.market_order(order)
+        if opposite.last_price is not None:
+            self.last_trade_price = opposite.last_price
+
+    def _add_stop(self, order: Order):
+        if order.id in self.bid.order_ids or order.id in self.ask.order_ids:
+            raise ValueError('Order already in the list, please use "update" order')
+        if order.is_bid():
+            self.bid_stops.add(order)
+        else:
+            self.ask_stops.add(order)
+
+    def trigger_stops(self):
+        '''
+        Release every pending stop the last trade price has reached, in one range query per side, and run
+        the released orders through process_order as the market or limit orders they describe, stamped with
+        the book's clock; repeats while the released orders trade through further stops.
+        Released orders that the book refuses (e.g. a stop market order meeting an empty side) are dropped.
+        process_order and process_batch call it after every message while stops are pending
+        O(log S) per triggered stop price, pending stops out of range are never visited
+        :return: int | number of stops released
+        '''
+        if self._triggering or self.last_trade_price is None:
+            return 0
+        self._triggering = True
+        released = 0
+        try:
+            while True:
+                last_price = self.last_trade_price
+                orders = self.bid_stops.triggered(last_price) + self.ask_stops.triggered(last_price)
+                if not orders:
+                    break
+                released += len(orders)
+                for order in orders:
+                    order.stop_price = None
+                    if self.clock is not None:
+                        order.timestamp = self.clock
+                    try:
+                        self._process_order(order)
+                    except ValueError:
+                        pass
+        finally:
+            self._triggering = False
+        return released
+
+    def _schedule_expiry(self, order: Order):
+        timers = self.timers
+        if timers.current is None:
+            timers.advance(order.timestamp)
+        if not timers.schedule(order.expire_at, order):
+            # the clock is already past expire_at (timestamps arriving out of order)
+            (self.bid if order.side is Side.BID else self.ask).cancel_order(order.id)
+
+    def expire_orders(self, now):
+        '''
+        now: int | float
+            timestamp in the same unit as Order.timestamp
+            Cancel every good-till-time order whose expire_at is at or before now; process_order and
+            process_batch call it with the timestamp of every incoming message while GTT orders rest.
+            Cancelled and filled orders stay in the timer wheel and are skipped when they come due;
+            expiries are not journaled, replay expires the orders from their journaled expire_at
+            O(1) per expired order
+        :return: int | number of orders expired
+        '''
+        expired = 0
+        for order in self.timers.advance(now):
+            book = self.bid if order.side is Side.BID else self.ask
+            if book.order_ids.get(order.id) is order and order.expire_at is not None and order.expire_at <= now:
+                book.cancel_order(order.id)
+                expired += 1
+        return expired
+
+    def cancel_order(self, order_id: int, side):
+        '''
+        order_id: int
+        side: str | Side
+            Remove a resting order, or a pending stop order, from the given side of the book
+        :return: Order Instance | the cancelled order, None if the book recycles orders through a pool or
+            cancels lazily
+        '''
+        if self.journal is not None:
+            self.journal.cancel(order_id, SIDES[side], self.clock or 0.0)
+        stops = self.bid_stops if SIDES[side] is Side.BID else self.ask_stops
+        if order_id in stops.order_ids:
+            return stops.cancel(order_id)
+        if SIDES[side] is Side.BID:
+            return self.bid.cancel_order(order_id)
+        return self.ask.cancel_order(order_id)
+
+    def compact(self):
+        '''
+        Reclaim the tombstones lazy cancels left on both sides, e.g. between bursts of flow;
+        a no-op without lazy_cancel
+        :return: int | number of tombstones reclaimed
+        '''
+        return self.bid.compact() + self.ask.compact()
+
+    def process_batch(self, action, side, price, size, order_id, timestamp):
+        '''
+        action, side, price, size, order_id, timestamp: array-like columns of equal length
+            action codes are defined in batch.py (ADD, CANCEL, MODIFY, MARKET), side codes are Side values;
+            price is ignored for CANCEL and MARKET, for MODIFY a price equal to the resting price only changes the size
+            Apply the messages in order. Columns are converted to Python lists once up front and the
+            dispatch is done on integer codes, so there is no per-message attribute or string lookup;
+            market orders reuse a single scratch Order instead of allocating one per message.
+            Messages that the book refuses (duplicate ids, unknown ids, market orders against an empty side)
+            are skipped and counted as rejected. Pending stops are triggered after the message that reaches them.
+            With a lot_size the price and size columns are converted to int64 ticks and lots in one go, and the
+            whole batch is refused with ValueError before the book is touched if a price is off the tick grid
+            (NaN prices count as 0) or a size isn't a whole number of lots
+        :return: BatchReport
+        '''
+        start = time.perf_counter()
+        if self.fixed_point is not None:
+            ticks, lots = self.fixed_point.prices(price), self.fixed_point.sizes(size)
+        rejected = 0
+        books = (self.bid, self.ask)
+        sides = (Side.BID, Side.ASK)
+        pool = self.pool
+        timers = self.timers
+        stop_indexes = (self.bid_stops, self.ask_stops)
+        stops = (self.bid_stops.order_ids, self.ask_stops.order_ids)
+        taker = Order(price=None, id=0, order_type=OrderType.MARKET, timestamp=0, size=0, side=Side.BID)
+        if self.journal is not None:
+            # released stops and expiries are not journaled, replay reproduces them
+            records = np.empty(len(action), dtype=MESSAGE_DTYPE)
+            for name, column in zip(MESSAGE_DTYPE.names, (action, side, order_id, price, size, timestamp)):
+                records[name] = column
+            self.journal.extend(records)
+        if self.fixed_point is not None:
+            price, size = ticks, lots
+        columns = [np.asarray(column).tolist() for column in (action, side, price, size, order_id, timestamp)]
+        for act, sd, px, sz, oid, ts in zip(*columns):
+            self.clock = ts
+            if timers.count:
+                self.expire_orders(ts)
+            if act == ADD:
+                if pool is None:
+                    order = Order(px, oid, OrderType.LIMIT, ts, sz, sides[sd])
+                else:
+                    order = pool.order(px, oid, OrderType.LIMIT, ts, sz, sides[sd])
+                try:
+                    self._process_limit_order(order)
+                except ValueError:
+                    rejected += 1
+                    if pool is not None:
+                        pool.release_order(order)
+                    continue
+                if pool is not None and order.size == 0:
+                    pool.release_order(order)
+            elif act == CANCEL:
+                book = books[sd]
+                if oid in book.order_ids:
+                    book.cancel_order(oid)
+                elif oid in stops[sd]:
+                    stop_indexes[sd].cancel(oid)
+                else:
+                    rejected += 1
+            elif act == MODIFY:
+                book = books[sd]
+                resting = book.order_ids.get(oid)
+                if resting is None:
+                    rejected += 1
+                elif resting.price == px:
+                    book.update_existing_order_size(oid, sz)
                 else:
-                    raise ValueError('Order already in the list, please use "update" order')
-        elif order.order_type == 'market':
-            if order.is_bid():
-                self.ask.market_order(order)
+                    try:
+                        self._move_order(sides[sd], oid, px, sz)
+                    except ValueError:
+                        rejected += 1
+                        continue
+            elif act == MARKET:
+                taker.id = oid
+                taker.side = sides[sd]
+                taker.size = sz
+                taker.timestamp = ts
+                try:
+                    self._process_market_order(taker)
+                except ValueError:
+                    rejected += 1
+                    continue
             else:
-                self.bid.market_order(order)
- 
-    
+                rejected += 1
+                continue
+            if stops[0] or stops[1]:
+                self.trigger_stops()
+        seconds = time.perf_counter() - start
+        messages = len(columns[0])
+        return BatchReport(messages, rejected, seconds, messages / seconds if seconds > 0 else float('inf'))
+
+    def process_records(self, records):
+        '''
+        records: np.ndarray | structured array with batch.MESSAGE_DTYPE
+            Same as process_batch, taking a single structured array instead of separate columns
+        :return: BatchReport
+        '''
+        return self.process_batch(records['action'], records['side'], records['price'],
+                                  records['size'], records['id'], records['timestamp'])
+
+    def depth(self, n: int):
+        '''
+        n: int
+            Top n levels of both sides, walking each side from the touch only as far as needed
+        :return: Depth | prices, sizes and order counts as NumPy arrays, best level first
+        '''
+        return self._depth(*self.bid.top_levels(n, reverse=True), *self.ask.top_levels(n))
+
+    def snapshot(self):
+        '''
+        Full aggregated (L2) view of both sides
+        :return: Depth
+        '''
+        return self._depth(*self.bid.top_levels(reverse=True), *self.ask.top_levels())
+
+    def _depth(self, bid_prices, bid_sizes, bid_counts, ask_prices, ask_sizes, ask_counts):
+        fixed_point = self.fixed_point
+        if fixed_point is None:
+            return Depth(bid_prices, bid_sizes, bid_counts, ask_prices, ask_sizes, ask_counts)
+        return Depth(fixed_point.to_prices(bid_prices), fixed_point.to_sizes(bid_sizes), bid_counts,
+                     fixed_point.to_prices(ask_prices), fixed_point.to_sizes(ask_sizes), ask_counts)
+
+    def range_volume(self, low_price, high_price):
+        '''
+        low_price, high_price: int | float
+            How much volume is there between prices A and B, both sides of the book included
+        :return: (size, notional, number of orders)
+        '''
+        fixed_point = self.fixed_point
+        if fixed_point is not None:
+            low_price, high_price = fixed_point.price_range(low_price, high_price)
+        bid = self.bid.range_volume(low_price, high_price)
+        ask = self.ask.range_volume(low_price, high_price)
+        if fixed_point is not None:
+            return (fixed_point.to_size(bid[0] + ask[0]), fixed_point.to_notional(bid[1] + ask[1]),
+                    bid[2] + ask[2])
+        return bid[0] + ask[0], bid[1] + ask[1], bid[2] + ask[2]
+
+    def queue_position(self, order_id: int):
+        '''
+        order_id: int
+        :return: int, int | number of orders and total size ahead of the order at its price level
+        '''
+        book = self.bid if order_id in self.bid.order_ids else self.ask
+        count, size = book.queue_position(order_id)
+        if self.fixed_point is not None:
+            size = self.fixed_point.to_size(size)
+        return count, size
+
+    def save_checkpoint(self, path):
+        '''
+        path: str
+            Write every resting order of both sides to an uncompressed .npz file, one array per column,
+            levels in price order and orders in FIFO order within a level
+            Pending stop orders are not part of the checkpoint. Prices and sizes are written in the units of
+            the API, so a checkpoint loads into a book with or without a lot_size
+        '''
+        columns = {'version': np.array(CHECKPOINT_VERSION)}
+        fixed_point = self.fixed_point
+        for name, book in (('bid', self.bid), ('ask', self.ask)):
+            book_columns = book.to_columns()
+            if fixed_point is not None:
+                book_columns['price'] = fixed_point.to_prices(book_columns['price'])
+                for column in ('size', 'peak', 'reserve'):
+                    book_columns[column] = fixed_point.to_sizes(book_columns[column])
+            for column, values in book_columns.items():
+                columns[f'{name}_{column}'] = values
+        with open(path, 'wb') as f:
+            np.savez(f, **columns)
+
+    def load_checkpoint(self, path):
+        '''
+        path: str
+            Replace the content of the book with a checkpoint written by save_checkpoint;
+            the book keeps its own configuration (backend, level stats, queue positions, sinks);
+            good-till-time orders are rescheduled on a fresh timer wheel
+        '''
+        with np.load(path) as columns:
+            version = int(columns['version'])
+            if not 1 <= version <= CHECKPOINT_VERSION:
+                raise ValueError(f'{path} is not a version {CHECKPOINT_VERSION} checkpoint')
+            expire_ats = []
+            fixed_point = self.fixed_point
+            for name, side, book in (('bid', Side.BID, self.bid), ('ask', Side.ASK, self.ask)):
+                optional = {column: columns[f'{name}_{column}'] for column in OPTIONAL_COLUMNS
+                            if f'{name}_{column}' in columns.files}
+                prices, sizes = columns[f'{name}_price'], columns[f'{name}_size']
+                if fixed_point is not None:
+                    prices, sizes = fixed_point.prices(prices), fixed_point.sizes(sizes)
+                    for column in ('peak', 'reserve'):
+                        if column in optional:
+                            optional[column] = fixed_point.sizes(optional[column])
+                book.load_columns(side, columns[f'{name}_id'], prices, sizes, columns[f'{name}_timestamp'],
+                                  optional.get('peak'), optional.get('reserve'), optional.get('expire_at'),
+                                  optional.get('owner'))
+                if 'expire_at' in optional:
+                    expire_ats.append(optional['expire_at'])
+        self.timers = TimerWheel(self.timers.resolution)
+        expire_ats = np.concatenate(expire_ats) if expire_ats else np.zeros(0)
+        if not np.isnan(expire_ats).all():
+            self.timers.advance(np.nanmin(expire_ats) - self.timers.resolution)
+            for book in (self.bid, self.ask):
+                for order in book.order_ids.values():
+                    if order.expire_at is not None:
+                        self.timers.schedule(order.expire_at, order)
+
+    def cancel_all(self, owner: int):
+        '''
+        owner: int
+            Cancel every resting order of the owner on both sides, e.g. when its session drops;
+            goes through the owner index and updates every touched level once
+        :return: int | number of orders cancelled
+        '''
+        cancelled = 0
+        for side, book in ((Side.BID, self.bid), (Side.ASK, self.ask)):
+            cancelled += self._cancel_owned(side, book, list(book.owners.get(owner, ())))
+        return cancelled
+
+    def cancel_side_range(self, owner: int, side, low_price, high_price):
+        '''
+        owner: int
+        side: str | Side
+        low_price, high_price: int | float
+            Cancel the owner's resting orders on one side priced between the two prices, both included
+            O(orders of the owner on that side)
+        :return: int | number of orders cancelled
+        '''
+        side = SIDES[side]
+        book = self.bid if side is Side.BID else self.ask
+        if self.fixed_point is not None:
+            low_price, high_price = self.fixed_point.price_range(low_price, high_price)
+        order_ids = [order_id for order_id, order in book.owners.get(owner, {}).items()
+                     if low_price <= order.price <= high_price]
+        return self._cancel_owned(side, book, order_ids)
+
+    def _cancel_owned(self, side, book, order_ids):
+        if self.journal is not None:
+            for order_id in order_ids:
+                self.journal.cancel(order_id, side, self.clock or 0.0)
+        book.replace_orders(order_ids)
+        return len(order_ids)
+
+    def mass_quote(self, owner: int, bids=None, asks=None, timestamp=0.0):
+        '''
+        owner: int
+        bids, asks: list | None
+            (order_id, price, size) quotes that replace every resting order of the owner on that side;
+            None leaves the side as it is, an empty list pulls the owner's quotes from it
+        timestamp: int | float
+            Atomic: the whole mass quote is refused with ValueError before the book is touched if an id is
+            repeated or already resting (other than on an order being replaced), a size isn't positive, or a
+            quote would cross the owner's other quotes or anyone else's. Otherwise each side is replaced with
+            LOBTree.replace_orders, one price tree update per touched level
+        :return: int, int | number of orders cancelled, number of orders added
+        '''
+        fixed_point = self.fixed_point
+        if fixed_point is not None:
+            bids, asks = [None if quotes is None else
+                          [(order_id, fixed_point.price(price), fixed_point.size(size))
+                           for order_id, price, size in quotes]
+                          for quotes in (bids, asks)]
+        sides = []
+        for side, book, quotes in ((Side.BID, self.bid, bids), (Side.ASK, self.ask, asks)):
+            replaced = {} if quotes is None else book.owners.get(owner, {})
+            sides.append((side, book, quotes or (), replaced))
+        seen = set()
+        for side, book, quotes, replaced in sides:
+            for order_id, price, size in quotes:
+                if order_id in seen or (order_id in book.order_ids and order_id not in replaced):
+                    raise ValueError(f'order id {order_id} is already in use')
+                if not size > 0:
+                    raise ValueError(f'quote {order_id} has no size')
+                book.check_price(price)
+                seen.add(order_id)
+        (_, bid_book, bid_quotes, bid_replaced), (_, ask_book, ask_quotes, ask_replaced) = sides
+        bid_prices = [price for _, price, _ in bid_quotes]
+        ask_prices = [price for _, price, _ in ask_quotes]
+        best_bid = _best_remaining(bid_book, bid_replaced, from_high=True)
+        best_ask = _best_remaining(ask_book, ask_replaced, from_high=False)
+        highest_bid = max(bid_prices + ([] if best_bid is None else [best_bid]), default=None)
+        lowest_ask = min(ask_prices + ([] if best_ask is None else [best_ask]), default=None)
+        if (bid_prices and lowest_ask is not None and max(bid_prices) >= lowest_ask) or \
+                (ask_prices and highest_bid is not None and min(ask_prices) <= highest_bid):
+            raise ValueError('mass quote would cross the book')
+
+        self.clock = timestamp
+        cancelled = added = 0
+        pool = self.pool
+        replacements = []
+        for side, book, quotes, replaced in sides:
+            if pool is None:
+                orders = [Order(price, order_id, OrderType.LIMIT, timestamp, size, side, owner=owner)
+                          for order_id, price, size in quotes]
+            else:
+                orders = [pool.order(price, order_id, OrderType.LIMIT, timestamp, size, side, owner=owner)
+                          for order_id, price, size in quotes]
+            replacements.append((side, book, list(replaced), orders))
+        if self.journal is not None:
+            # every cancel first: replayed one by one, a new quote must not meet an old one of the other side
+            for side, _, order_ids, _ in replacements:
+                for order_id in order_ids:
+                    self.journal.cancel(order_id, side, self.clock or 0.0)
+            for _, _, _, orders in replacements:
+                for order in orders:
+                    self._journal_order(order)
+        for side, book, order_ids, orders in replacements:
+            book.replace_orders(order_ids, orders)
+            cancelled += len(order_ids)
+            added += len(orders)
+        return cancelled, added
+
     def update_order(self, order_id: int, side: str, new_size: int = None, new_price: int = None, change_size: bool = True, change_price: bool = True):
         '''
         new_size: int | needed only if change_size is True
         change_size: bool | if False, this function serves to change the price
-            Given the order id and side, call the update_existing_order in that book;
+            Given the order id and side, amend the order in that book;
             if change_size is True, change the size; if change_price is True, change the price;
             if both, change both;
             if new_size is provided but change_size is False, it will simply be ignored; same applies to new_price
+            A size decrease at the same price keeps the order's queue priority, a size increase or a new price
+            loses it; the order is amended in place, it never leaves order_ids unless the new price crosses
+            the opposite touch, see _move_order
         '''
         if change_size and new_size is None:
             raise TypeError('If change_size is True, new_size needs to be specified')
@@ -131,24 +775,75 @@ class LimitOrderBook:
             raise TypeError('If change_price is True, new_price needs to be specified')
         if not change_size and not change_price:
             return
-
-        if side == 'bid':
+        side = SIDES[side]
+        book = self.bid if side is Side.BID else self.ask
+        fixed_point = self.fixed_point
+        if fixed_point is not None:
             if change_price:
-                # take the order away from the list => change its price to the new_price => (if change_size is true, change price accordingly)
-                # => insert back into a new level
-                removed_order = self.bid.remove_order(order_id)
-                removed_order.price = new_price
-                if change_size:
-                    removed_order.size = new_size
-                self.bid.insert_order(removed_order)
-            elif change_size:
-                self.bid.update_existing_order_size(order_id, new_size)
+                new_price = fixed_point.price(new_price)
+            if change_size:
+                new_size = fixed_point.size(new_size)
+        if self.journal is not None:
+            resting = book.order_ids[order_id]
+            price = new_price if change_price else resting.price
+            size = new_size if change_size else resting.size
+            if fixed_point is not None:
+                price, size = fixed_point.to_price(price), fixed_point.to_size(size)
+            self.journal.modify(order_id, side, price, size, self.clock or 0.0)
+        if change_price:
+            # amending to the current price only applies the size
+            self._move_order(side, order_id, new_price, new_size if change_size else None)
+            if self.bid_stops.order_ids or self.ask_stops.order_ids:
+                self.trigger_stops()
         else:
-            if change_price:
-                removed_order = self.ask.remove_order(order_id)
-                removed_order.price = new_price
-                if change_size:
-                    removed_order.size = new_size
-                self.ask.insert_order(removed_order)
-            elif change_size:
-                self.ask.update_existing_order_size(order_id, new_size)
\ No newline at end of file
+            book.update_existing_order_size(order_id, new_size)
+
+    def _move_order(self, side, order_id: int, new_price, new_size: int = None):
+        '''
+        side: Side
+            Price amend, see LOBTree.move_order. An amend through the opposite touch loses its priority anyway:
+            the order leaves its side and goes through _process_limit_order like a new limit order, matching
+            what it crosses and resting the remainder, so the book never ends up crossed; a post-only order
+            is repriced the same way, or refused with ValueError before the book is touched
+        '''
+        if side is Side.BID:
+            book, opposite = self.bid, self.ask
+        else:
+            book, opposite = self.ask, self.bid
+        order = book.order_ids[order_id]
+        best = opposite.min_price if side is Side.BID else opposite.max_price
+        if new_price == order.price or (new_size is not None and new_size <= 0) or best is None or \
+                (new_price < best if side is Side.BID else new_price > best):
+            book.move_order(order_id, new_price, new_size)
+            return
+        if order.post_only is PostOnly.REJECT:
+            raise ValueError('post-only order would cross the book')
+        book.check_price(new_price)
+        book.remove_order(order_id)
+        # an iceberg shows its whole size again, insert_order splits off the reserve of what rests
+        order.size = (order.size if new_size is None else new_size) + order.reserve
+        order.reserve = 0
+        order.price = new_price
+        order.volume = order.size * new_price
+        self._process_limit_order(order)
+        if self.pool is not None and order.size == 0:
+            self.pool.release_order(order)
+
+
+def _best_remaining(book, replaced: dict, from_high: bool):
+    '''
+    book: LOBTree
+    replaced: dict | order id -> Order, resting orders about to be cancelled
+        Best price of the side once the replaced orders are gone; walks from the touch past the levels
+        that only hold replaced orders
+    :return: int | float | None
+    '''
+    if not replaced:
+        return book.max_price if from_high else book.min_price
+    leaving = {}
+    for order in replaced.values():
+        leaving[order.price] = leaving.get(order.price, 0) + 1
+    for price, count in book.price_tree.items(reverse=from_high):
+        if count > leaving.get(price, 0):
+            return price
+    return None
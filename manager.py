@@ -0,0 +1,200 @@
+'''
+Multi-symbol book manager.
+
+BookManager owns one LimitOrderBook per symbol and routes messages to it. With workers=0 the books
+live in the calling process; with workers=N the symbols are sharded across N processes by a stable
+hash of the symbol, so the GIL only serialises the symbols of one shard. Messages cross the process
+boundary as batches of raw batch.MESSAGE_DTYPE records (one queue put per batch, not per message);
+single orders go as a journal.JOURNAL_DTYPE record so their time in force, post-only flag, expiry,
+peak, owner and stop price survive the trip. collect() returns the fills and top of book of every shard
+merged into single arrays.
+'''
+import multiprocessing
+import zlib
+import numpy as np
+from .lob import LimitOrderBook
+from .batch import ADD, MARKET, MESSAGE_DTYPE
+from .journal import JOURNAL_DTYPE, replay_records
+from .ob_tree.fills import FILL_DTYPE, FillBuffer
+from .ob_tree.order import OrderType
+
+MERGED_FILL_DTYPE = np.dtype([('symbol', 'U16')] + FILL_DTYPE.descr)
+TOP_OF_BOOK_DTYPE = np.dtype([
+    ('symbol', 'U16'),
+    ('bid_price', np.float64),
+    ('bid_size', np.float64),
+    ('ask_price', np.float64),
+    ('ask_size', np.float64),
+])
+
+
+def shard_of(symbol: str, shards: int):
+    '''
+    Stable across processes and runs, unlike hash()
+    :return: int
+    '''
+    return zlib.crc32(symbol.encode()) % shards
+
+
+class _Shard:
+    '''
+    The books of one shard and their fill buffers
+    '''
+
+    def __init__(self, fill_capacity: int, book_kwargs: dict):
+        self.fill_capacity = fill_capacity
+        self.book_kwargs = book_kwargs
+        self.books = {}
+        self.fills = {}
+
+    def book(self, symbol: str):
+        book = self.books.get(symbol)
+        if book is None:
+            fills = self.fills[symbol] = FillBuffer(self.fill_capacity)
+            book = self.books[symbol] = LimitOrderBook(fill_sink=fills.append, **self.book_kwargs)
+            fills.fixed_point = book.fixed_point
+        return book
+
+    def submit(self, symbol: str, records):
+        return replay_records(self.book(symbol), records)
+
+    def drain_fills(self):
+        batches = []
+        for symbol, buffer in self.fills.items():
+            fills = buffer.drain()
+            if len(fills):
+                merged = np.empty(len(fills), dtype=MERGED_FILL_DTYPE)
+                merged['symbol'] = symbol
+                for name in FILL_DTYPE.names:
+                    merged[name] = fills[name]
+                batches.append(merged)
+        if not batches:
+            return np.zeros(0, dtype=MERGED_FILL_DTYPE)
+        return np.concatenate(batches)
+
+    def top_of_book(self):
+        top = np.empty(len(self.books), dtype=TOP_OF_BOOK_DTYPE)
+        for i, (symbol, book) in enumerate(self.books.items()):
+            bid, bid_size, ask, ask_size = book.top_of_book()
+            top[i] = (symbol, np.nan if bid is None else bid, bid_size, np.nan if ask is None else ask, ask_size)
+        return top
+
+
+def _shard_worker(inbox, outbox, fill_capacity: int, book_kwargs: dict):
+    '''
+    Worker process loop: apply record batches until told to stop, answer collect requests
+    '''
+    shard = _Shard(fill_capacity, book_kwargs)
+    while True:
+        message = inbox.get()
+        command = message[0]
+        if command == 'batch':
+            _, symbol, payload, dtype = message
+            shard.submit(symbol, np.frombuffer(payload, dtype=dtype))
+        elif command == 'collect':
+            outbox.put((shard.drain_fills(), shard.top_of_book()))
+        elif command == 'stop':
+            break
+
+
+class BookManager:
+
+    def __init__(self, workers: int = 0, fill_capacity: int = 1 << 16, **book_kwargs):
+        '''
+        workers: int
+            0 keeps every book in this process; otherwise the number of shard processes
+        fill_capacity: int
+            size of each book's FillBuffer, fills beyond it are dropped if collect() isn't called often enough
+        book_kwargs:
+            passed to every LimitOrderBook (backend, tick_size, level_stats, ...)
+        '''
+        self.workers = workers
+        self._local = None
+        self._inboxes = []
+        self._outboxes = []
+        self._processes = []
+        if workers == 0:
+            self._local = _Shard(fill_capacity, book_kwargs)
+            return
+        context = multiprocessing.get_context()
+        for _ in range(workers):
+            inbox, outbox = context.Queue(), context.Queue()
+            process = context.Process(target=_shard_worker, args=(inbox, outbox, fill_capacity, book_kwargs),
+                                      daemon=True)
+            process.start()
+            self._inboxes.append(inbox)
+            self._outboxes.append(outbox)
+            self._processes.append(process)
+
+    def book(self, symbol: str):
+        '''
+        symbol: str
+        :return: LimitOrderBook | only available when the books live in this process
+        '''
+        if self._local is None:
+            raise ValueError('books live in the worker processes, use submit / collect')
+        return self._local.book(symbol)
+
+    def submit(self, symbol: str, records):
+        '''
+        symbol: str
+        records: np.ndarray | structured array with batch.MESSAGE_DTYPE or journal.JOURNAL_DTYPE
+            Route a batch of messages to the symbol's book, see journal.replay_records; asynchronous
+            when sharded
+        '''
+        if self._local is not None:
+            self._local.submit(symbol, records)
+            return
+        dtype = JOURNAL_DTYPE if records.dtype.names == JOURNAL_DTYPE.names else MESSAGE_DTYPE
+        payload = np.ascontiguousarray(records, dtype=dtype).tobytes()
+        self._inboxes[shard_of(symbol, self.workers)].put(('batch', symbol, payload, dtype))
+
+    def process_order(self, symbol: str, order):
+        '''
+        symbol: str
+        order: Order Instance
+            Single order entry point; in sharded mode the order is sent as a one record journal batch,
+            a refused order is then dropped by the worker instead of raising ValueError
+        '''
+        if self._local is not None:
+            self._local.book(symbol).process_order(order)
+            return
+        records = np.zeros(1, dtype=JOURNAL_DTYPE)
+        action = ADD if order.order_type is OrderType.LIMIT else MARKET
+        records[0] = (action, order.side, order.id, order.price or 0.0, order.size, order.timestamp,
+                      order.time_in_force, order.post_only,
+                      np.nan if order.expire_at is None else order.expire_at, order.peak,
+                      -1 if order.owner is None else order.owner,
+                      np.nan if order.stop_price is None else order.stop_price)
+        self.submit(symbol, records)
+
+    def collect(self):
+        '''
+        Drain the fills of every book and read every top of book; waits for the shards to catch up
+        with everything submitted so far
+        :return: np.ndarray, np.ndarray | fills (MERGED_FILL_DTYPE) ordered by timestamp, top of book per symbol
+        '''
+        if self._local is not None:
+            fills, tops = self._local.drain_fills(), self._local.top_of_book()
+        else:
+            for inbox in self._inboxes:
+                inbox.put(('collect',))
+            results = [outbox.get() for outbox in self._outboxes]
+            fills = np.concatenate([result[0] for result in results])
+            tops = np.concatenate([result[1] for result in results])
+        fills = fills[np.argsort(fills['timestamp'], kind='stable')]
+        tops = tops[np.argsort(tops['symbol'], kind='stable')]
+        return fills, tops
+
+    def close(self):
+        for inbox in self._inboxes:
+            inbox.put(('stop',))
+        for process in self._processes:
+            process.join()
+        self._inboxes, self._outboxes, self._processes = [], [], []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,162 @@
+'''
+Per-level book deltas and a conflating publisher.
+
+Every change of a price level makes LOBTree call its delta_sink with (side, price, size, number of orders),
+size and number of orders being 0 once the level is gone: resting, cancelling, amending and every level a
+sweep consumes. DeltaPublisher.append is such a sink and fans the deltas out to two kinds of subscribers:
+full-rate subscribers are called with every delta as it happens, conflating subscribers only keep the
+latest state of each level that changed and receive them as one DELTA_DTYPE array at most once per
+interval, leaving out the levels that are back where they were last published. A level that changes a
+thousand times between two flushes costs a single row, so slow consumers keep up with a busy book at a
+fraction of the bandwidth of full snapshots. A subscriber joining a live book starts from LimitOrderBook.snapshot().
+'''
+import time
+import numpy as np
+
+DELTA_DTYPE = np.dtype([
+    ('side', np.uint8),
+    ('price', np.float64),
+    ('size', np.float64),
+    ('count', np.int64),
+])
+
+
+class ConflatedSubscription:
+
+    def __init__(self, callback, interval, fixed_point=None):
+        '''
+        callback: callable
+            called with a DELTA_DTYPE array of the levels that changed since the previous flush
+        interval: int | float
+            least time between two flushes, in the unit of the clock passed to DeltaPublisher.publish
+        fixed_point: FixedPoint | None
+            the book's tick and lot conversion, prices and sizes are sent in the units of the book's API
+        self.pending: dict
+            key: (side, price); value: (size, number of orders), latest state since the last flush
+        self.published: dict
+            key: (side, price); value: (size, number of orders) last sent, for the levels still on the book
+        '''
+        self.callback = callback
+        self.interval = interval
+        self.pending = {}
+        self.published = {}
+        self.last_flush = None
+        self.sent = 0
+        self.fixed_point = fixed_point
+
+    def flush(self):
+        '''
+        Send the pending deltas whose level differs from what was last published, first changed first
+        :return: np.ndarray | DELTA_DTYPE array that was sent, empty if there was nothing to send
+        '''
+        published = self.published
+        rows = []
+        for key, state in self.pending.items():
+            if published.get(key) == state:
+                continue
+            rows.append(key + state)
+            if state[1]:
+                published[key] = state
+            else:
+                published.pop(key, None)
+        self.pending.clear()
+        deltas = np.array(rows, dtype=DELTA_DTYPE)
+        if self.fixed_point is not None:
+            deltas['price'] = self.fixed_point.to_prices(deltas['price'])
+            deltas['size'] = self.fixed_point.to_sizes(deltas['size'])
+        if rows:
+            self.sent += len(rows)
+            self.callback(deltas)
+        return deltas
+
+
+class DeltaPublisher:
+
+    def __init__(self, book=None):
+        '''
+        book: LimitOrderBook | None
+            if given, the publisher becomes the delta_sink of both sides, see attach
+        self.received: int
+            number of deltas received from the book
+        self.fixed_point: FixedPoint | None
+            taken from the attached book; deltas arrive in ticks and lots and are sent out in the units of
+            the book's API
+        '''
+        self._subscribers = []
+        self._conflated = []
+        self.received = 0
+        self.fixed_point = None
+        if book is not None:
+            self.attach(book)
+
+    def attach(self, book):
+        '''
+        book: LimitOrderBook
+            Receive the deltas of both sides of the book, replacing their current delta_sink
+        '''
+        self.fixed_point = book.fixed_point
+        for subscription in self._conflated:
+            subscription.fixed_point = book.fixed_point
+        book.bid.delta_sink = self.append
+        book.ask.delta_sink = self.append
+
+    def append(self, side, price, size, count):
+        '''
+        Record one level delta, the delta_sink signature
+        O(subscribers)
+        '''
+        self.received += 1
+        if self._subscribers:
+            if self.fixed_point is None:
+                for callback in self._subscribers:
+                    callback(side, price, size, count)
+            else:
+                external_price, external_size = self.fixed_point.to_price(price), self.fixed_point.to_size(size)
+                for callback in self._subscribers:
+                    callback(side, external_price, external_size, count)
+        for subscription in self._conflated:
+            subscription.pending[(side, price)] = (size, count)
+
+    def subscribe(self, callback):
+        '''
+        callback: callable
+            called as callback(side, price, size, number of orders) for every delta
+        :return: callable | handle for unsubscribe
+        '''
+        self._subscribers.append(callback)
+        return callback
+
+    def subscribe_conflated(self, callback, interval):
+        '''
+        callback: callable
+            called with a DELTA_DTYPE array at most once per interval, see ConflatedSubscription
+        interval: int | float
+            in the unit of the clock passed to publish, seconds by default
+        :return: ConflatedSubscription | handle for unsubscribe
+        '''
+        subscription = ConflatedSubscription(callback, interval, self.fixed_point)
+        self._conflated.append(subscription)
+        return subscription
+
+    def unsubscribe(self, handle):
+        if isinstance(handle, ConflatedSubscription):
+            self._conflated.remove(handle)
+        else:
+            self._subscribers.remove(handle)
+
+    def publish(self, now=None):
+        '''
+        now: int | float | None
+            current time, time.monotonic() if None
+            Flush every conflating subscription whose interval has elapsed since its last flush;
+            call it from the event loop, e.g. after every batch or on a timer
+        :return: int | number of deltas sent
+        '''
+        if now is None:
+            now = time.monotonic()
+        sent = 0
+        for subscription in self._conflated:
+            if subscription.last_flush is None or now - subscription.last_flush >= subscription.interval:
+                subscription.last_flush = now
+                sent += len(subscription.flush())
+        return sent
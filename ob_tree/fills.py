@@ -0,0 +1,85 @@
+'''
+Execution reports emitted by the matching loop.
+
+Every maker/taker match produces one fill: (maker_id, taker_id, price, size, timestamp).
+LOBTree.fill_sink can be any callable taking those five arguments; FillBuffer.append is the
+default sink, a preallocated ring buffer of NumPy columns that downstream consumers drain
+in batches, so recording a fill writes five array slots and allocates nothing.
+'''
+import numpy as np
+
+FILL_DTYPE = np.dtype([
+    ('maker_id', np.int64),
+    ('taker_id', np.int64),
+    ('price', np.float64),
+    ('size', np.float64),
+    ('timestamp', np.float64),
+])
+
+
+class FillBuffer:
+
+    def __init__(self, capacity: int = 1 << 16, fixed_point=None):
+        '''
+        capacity: int
+            number of fills kept before the oldest undrained ones get overwritten,
+            rounded up to a power of two
+        fixed_point: FixedPoint | None
+            the book's tick and lot conversion (LimitOrderBook.fixed_point): fills are recorded in ticks and
+            lots and drained in the units of the book's API
+        self.overruns: int
+            number of fills overwritten before they were drained
+        '''
+        capacity = 1 << max(0, capacity - 1).bit_length()
+        self.capacity = capacity
+        self._mask = capacity - 1
+        self._maker_id = np.zeros(capacity, dtype=np.int64)
+        self._taker_id = np.zeros(capacity, dtype=np.int64)
+        self._price = np.zeros(capacity, dtype=np.float64)
+        self._size = np.zeros(capacity, dtype=np.float64)
+        self._timestamp = np.zeros(capacity, dtype=np.float64)
+        # absolute write and read positions, the slot is position & self._mask
+        self._write = 0
+        self._read = 0
+        self.overruns = 0
+        self.fixed_point = fixed_point
+
+    def __len__(self):
+        return self._write - self._read
+
+    def append(self, maker_id: int, taker_id: int, price, size, timestamp):
+        '''
+        Record one fill
+        O(1)
+        '''
+        slot = self._write & self._mask
+        self._maker_id[slot] = maker_id
+        self._taker_id[slot] = taker_id
+        self._price[slot] = price
+        self._size[slot] = size
+        self._timestamp[slot] = timestamp
+        self._write += 1
+        if self._write - self._read > self.capacity:
+            self._read += 1
+            self.overruns += 1
+
+    def drain(self):
+        '''
+        Copy every pending fill out of the ring, oldest first, and mark them as consumed
+        :return: np.ndarray | structured array with FILL_DTYPE
+        '''
+        count = self._write - self._read
+        fills = np.empty(count, dtype=FILL_DTYPE)
+        if count:
+            slots = np.arange(self._read, self._write) & self._mask
+            fills['maker_id'] = self._maker_id[slots]
+            fills['taker_id'] = self._taker_id[slots]
+            if self.fixed_point is None:
+                fills['price'] = self._price[slots]
+                fills['size'] = self._size[slots]
+            else:
+                fills['price'] = self.fixed_point.to_prices(self._price[slots])
+                fills['size'] = self.fixed_point.to_sizes(self._size[slots])
+            fills['timestamp'] = self._timestamp[slots]
+        self._read = self._write
+        return fills
@@ -0,0 +1,156 @@
+'''
+Fixed-point prices and sizes.
+
+With a lot size, LimitOrderBook keeps every price as an integer number of ticks and every size as an integer
+number of lots: the matching loop, the level aggregates and the price index then only do exact integer
+arithmetic, so partial fills never leave rounding drift in OrderLinkedlist.size / volume, and the columnar
+paths (depth, to_columns, process_batch) run on int64 arrays. FixedPoint converts at the edge of the API:
+orders, quotes and batches coming in are scaled and checked against the grid once, prices and sizes going
+out are scaled back.
+'''
+import math
+import numpy as np
+
+# relative slack for values that are on the grid up to binary floating point error, e.g. 100.01 / 0.01
+_TOLERANCE = 1e-9
+
+
+def _scale(increment):
+    '''
+    :return: int | None | number of increments per unit when it is a whole number (0.01 -> 100), so that scaling
+        multiplies and dividing back gives the correctly rounded decimal (10001 / 100 == 100.01), None otherwise
+    '''
+    per_unit = round(1 / increment)
+    if per_unit > 1 and abs(per_unit * increment - 1) < _TOLERANCE:
+        return per_unit
+    return None
+
+
+def _to_int(value, increment, per_unit, name):
+    scaled = value * per_unit if per_unit is not None else value / increment
+    units = round(scaled)
+    if abs(scaled - units) > _TOLERANCE * max(1, abs(scaled)):
+        raise ValueError(f'{name} {value} is not a multiple of {increment}')
+    return units
+
+
+def _to_ints(values, increment, per_unit, name):
+    values = np.asarray(values, dtype=np.float64)
+    scaled = values * per_unit if per_unit is not None else values / increment
+    # prices of messages that ignore them (cancels, market orders) may be NaN
+    scaled = np.where(np.isfinite(scaled), scaled, 0.0)
+    units = np.rint(scaled)
+    if np.any(np.abs(scaled - units) > _TOLERANCE * np.maximum(1.0, np.abs(scaled))):
+        raise ValueError(f'{name}s are not all multiples of {increment}')
+    return units.astype(np.int64)
+
+
+class FixedPoint:
+
+    def __init__(self, tick_size=1, lot_size=1):
+        '''
+        tick_size: int | float
+            price increment, one tick is the integer 1 inside the book
+        lot_size: int | float
+            size increment, one lot is the integer 1 inside the book
+        '''
+        if not tick_size > 0 or not lot_size > 0:
+            raise ValueError('tick_size and lot_size must be positive')
+        self.tick_size = tick_size
+        self.lot_size = lot_size
+        self._ticks_per_unit = _scale(tick_size)
+        self._lots_per_unit = _scale(lot_size)
+
+    def price(self, price):
+        '''
+        price: int | float | None
+        :return: int | None | number of ticks; ValueError if the price is off the tick grid
+        '''
+        if price is None:
+            return None
+        return _to_int(price, self.tick_size, self._ticks_per_unit, 'price')
+
+    def size(self, size):
+        '''
+        size: int | float
+        :return: int | number of lots; ValueError if the size is not a whole number of lots
+        '''
+        return _to_int(size, self.lot_size, self._lots_per_unit, 'size')
+
+    def price_range(self, low_price, high_price):
+        '''
+        low_price, high_price: int | float
+            inclusive price range, not necessarily on the grid
+        :return: int, int | lowest and highest tick inside the range
+        '''
+        per_unit = self._ticks_per_unit
+        low = low_price * per_unit if per_unit is not None else low_price / self.tick_size
+        high = high_price * per_unit if per_unit is not None else high_price / self.tick_size
+        return math.ceil(low - _TOLERANCE * max(1, abs(low))), math.floor(high + _TOLERANCE * max(1, abs(high)))
+
+    def to_price(self, ticks):
+        '''
+        ticks: int | None
+        :return: int | float | None
+        '''
+        if ticks is None:
+            return None
+        return ticks / self._ticks_per_unit if self._ticks_per_unit is not None else ticks * self.tick_size
+
+    def to_size(self, lots):
+        '''
+        lots: int
+        :return: int | float
+        '''
+        return lots / self._lots_per_unit if self._lots_per_unit is not None else lots * self.lot_size
+
+    def to_notional(self, notional):
+        '''
+        notional: int | sum of lots * ticks
+        :return: int | float
+        '''
+        return self.to_size(self.to_price(notional))
+
+    def prices(self, prices):
+        '''
+        prices: array-like
+        :return: np.ndarray | int64 ticks, NaN counted as 0; ValueError if any price is off the tick grid
+        '''
+        return _to_ints(prices, self.tick_size, self._ticks_per_unit, 'price')
+
+    def sizes(self, sizes):
+        '''
+        sizes: array-like
+        :return: np.ndarray | int64 lots; ValueError if any size is not a whole number of lots
+        '''
+        return _to_ints(sizes, self.lot_size, self._lots_per_unit, 'size')
+
+    def to_prices(self, ticks):
+        '''
+        ticks: array-like
+        :return: np.ndarray | float64 prices
+        '''
+        ticks = np.asarray(ticks, dtype=np.float64)
+        return ticks / self._ticks_per_unit if self._ticks_per_unit is not None else ticks * self.tick_size
+
+    def to_sizes(self, lots):
+        '''
+        lots: array-like
+        :return: np.ndarray | float64 sizes
+        '''
+        lots = np.asarray(lots, dtype=np.float64)
+        return lots / self._lots_per_unit if self._lots_per_unit is not None else lots * self.lot_size
+
+    def order(self, order):
+        '''
+        order: Order Instance
+            Convert the order's price, size, peak and stop price to ticks and lots in place
+        :return: Order Instance
+        '''
+        order.price = self.price(order.price)
+        order.size = self.size(order.size)
+        if order.peak:
+            order.peak = self.size(order.peak)
+        order.stop_price = self.price(order.stop_price)
+        order.volume = 0 if order.price is None else order.size * order.price
+        return order
@@ -0,0 +1,236 @@
+'''
+Dense price ladder for tick-quantized instruments.
+
+Prices are mapped onto a fixed window of ticks stored in preallocated arrays; a two level bitmap
+(one bit per tick, one summary bit per 64-tick word) finds the next non-empty level with a couple
+of bit_length() calls instead of walking a tree. When a price falls outside the window the ladder
+recenters around the occupied range, growing the window if the book is wider than it.
+The public interface mirrors the subset of bintrees.FastRBTree used by LOBTree, so either one
+can be plugged in as LOBTree.price_tree.
+'''
+from array import array
+from .fixed_point import _scale, _to_int
+
+WORD_BITS = 64
+
+
+class PriceLadder:
+
+    def __init__(self, tick_size=1, window: int = 4096):
+        '''
+        tick_size: int | float
+            minimum price increment; every price inserted must be a multiple of it
+        window: int
+            number of ticks preallocated around the touch, rounded up to a multiple of 64
+        self._keys: list
+            original price objects so min_key/max_key return exactly what was inserted
+        self._counts: array
+            value stored for each tick (number of orders on the level for LOBTree)
+        self._words: array
+            occupancy bitmap, one bit per tick
+        self._summary: int
+            one bit per non-empty word of self._words
+        '''
+        if tick_size <= 0:
+            raise ValueError('tick_size must be positive')
+        self.tick_size = tick_size
+        self._ticks_per_unit = _scale(tick_size)
+        self._capacity = max(WORD_BITS, -(-window // WORD_BITS) * WORD_BITS)
+        self._base = None
+        self._len = 0
+        self._allocate()
+
+    def _allocate(self):
+        self._keys = [None] * self._capacity
+        self._counts = array('q', bytes(8 * self._capacity))
+        self._words = array('Q', bytes(8 * (self._capacity // WORD_BITS)))
+        self._summary = 0
+
+    def _tick(self, price):
+        '''
+        price: int | float
+        :return: int | absolute tick number of the price; ValueError if the price is off the tick grid,
+            it would share its slot with the neighbouring tick
+        '''
+        return int(_to_int(price, self.tick_size, self._ticks_per_unit, 'price'))
+
+    def check(self, price):
+        '''
+        price: int | float
+            ValueError unless the price is a multiple of tick_size, so that callers can refuse an order
+            before touching anything else
+        '''
+        self._tick(price)
+
+    def _index(self, price):
+        '''
+        price: int | float
+            Translate a price into its slot in the window, or -1 when it is outside the window
+        :return: int
+        '''
+        if self._base is None:
+            return -1
+        index = self._tick(price) - self._base
+        if 0 <= index < self._capacity:
+            return index
+        return -1
+
+    def _occupied(self, index):
+        return (self._words[index >> 6] >> (index & 63)) & 1
+
+    def _recenter(self, tick):
+        '''
+        tick: int
+            Rebuild the window so that it covers both the occupied levels and the new tick;
+            the window doubles whenever the occupied range does not fit in it anymore
+        O(window)
+        '''
+        levels = [(self._base + index, self._keys[index], self._counts[index])
+                  for index in self._iter_indices()]
+        low = min([tick] + [level[0] for level in levels])
+        high = max([tick] + [level[0] for level in levels])
+        while high - low + 1 > self._capacity // 2:
+            self._capacity *= 2
+        self._base = (low + high) // 2 - self._capacity // 2
+        self._allocate()
+        for level_tick, key, count in levels:
+            self._set(level_tick - self._base, key, count)
+
+    def _set(self, index, key, value):
+        word = index >> 6
+        if not self._words[word]:
+            self._summary |= 1 << word
+        self._words[word] |= 1 << (index & 63)
+        self._keys[index] = key
+        self._counts[index] = value
+
+    def _iter_indices(self, reverse: bool = False):
+        '''
+        Yield occupied slots in ascending order, or descending if reverse is True
+        O(1) per occupied slot plus O(1) per non-empty word
+        '''
+        summary = self._summary
+        while summary:
+            if reverse:
+                word_index = summary.bit_length() - 1
+            else:
+                word_index = (summary & -summary).bit_length() - 1
+            summary ^= 1 << word_index
+            word = self._words[word_index]
+            while word:
+                if reverse:
+                    bit = word.bit_length() - 1
+                else:
+                    bit = (word & -word).bit_length() - 1
+                word ^= 1 << bit
+                yield (word_index << 6) | bit
+
+    def __len__(self):
+        return self._len
+
+    def __contains__(self, price):
+        try:
+            index = self._index(price)
+        except ValueError:
+            return False
+        return index >= 0 and self._occupied(index) == 1
+
+    def __getitem__(self, price):
+        index = self._index(price)
+        if index < 0 or not self._occupied(index):
+            raise KeyError(price)
+        return self._counts[index]
+
+    def __setitem__(self, price, value):
+        '''
+        price: int | float
+        value: int
+            Insert a level or overwrite its value; ValueError if the price is not a multiple of tick_size
+            O(1), O(window) when the ladder has to recenter
+        '''
+        index = self._index(price)
+        if index < 0:
+            tick = self._tick(price)
+            if self._base is None:
+                self._base = tick - self._capacity // 2
+            else:
+                self._recenter(tick)
+            index = tick - self._base
+        if not self._occupied(index):
+            self._len += 1
+            self._set(index, price, value)
+        else:
+            self._counts[index] = value
+
+    def __iter__(self):
+        return self.keys()
+
+    def remove(self, price):
+        '''
+        price: int | float
+            Remove the level from the ladder
+            O(1)
+        '''
+        index = self._index(price)
+        if index < 0 or not self._occupied(index):
+            raise KeyError(price)
+        word = index >> 6
+        self._words[word] &= ~(1 << (index & 63))
+        if not self._words[word]:
+            self._summary &= ~(1 << word)
+        self._keys[index] = None
+        self._counts[index] = 0
+        self._len -= 1
+
+    def max_key(self):
+        '''
+        O(1)
+        :return: price of the highest non-empty level
+        '''
+        summary = self._summary
+        if not summary:
+            raise ValueError('Tree is empty')
+        word_index = summary.bit_length() - 1
+        bit = self._words[word_index].bit_length() - 1
+        return self._keys[(word_index << 6) | bit]
+
+    def min_key(self):
+        '''
+        O(1)
+        :return: price of the lowest non-empty level
+        '''
+        summary = self._summary
+        if not summary:
+            raise ValueError('Tree is empty')
+        word_index = (summary & -summary).bit_length() - 1
+        word = self._words[word_index]
+        bit = (word & -word).bit_length() - 1
+        return self._keys[(word_index << 6) | bit]
+
+    def keys(self, reverse: bool = False):
+        return (self._keys[index] for index in self._iter_indices(reverse))
+
+    def items(self, reverse: bool = False):
+        return ((self._keys[index], self._counts[index]) for index in self._iter_indices(reverse))
+
+    def nlargest(self, n: int):
+        '''
+        :return: list | the n highest (price, value) pairs, best first
+        '''
+        result = []
+        for item in self.items(reverse=True):
+            if len(result) == n:
+                break
+            result.append(item)
+        return result
+
+    def nsmallest(self, n: int):
+        '''
+        :return: list | the n lowest (price, value) pairs, best first
+        '''
+        result = []
+        for item in self.items():
+            if len(result) == n:
+                break
+            result.append(item)
+        return result
@@ -0,0 +1,289 @@
+'''
+Segment tree over price ticks, kept in sync with LOBTree.price_tree, for range queries.
+
+Each leaf is one tick and holds the level's total size, notional (size * price) and number of
+orders; internal nodes hold the sums plus the max order count of their subtree and the number of
+non-empty levels below them. That answers "how much is resting between prices A and B",
+"which level has the most orders in that range" and "what is the k-th level from the top"
+in O(log W), W being the number of ticks covered. The covered range grows (and recenters)
+when a price falls outside of it, up to max_capacity ticks; levels further away, e.g. stub quotes far
+from the touch, are kept in a dict next to the tree and every query also scans that dict.
+'''
+import math
+from .fixed_point import _TOLERANCE, _scale, _to_int
+
+# a range wider than this many ticks would make every rebuild of the tree a noticeable stall
+MAX_CAPACITY = 1 << 16
+
+
+class LevelStats:
+
+    def __init__(self, tick_size=1, capacity: int = 4096, max_capacity: int = MAX_CAPACITY):
+        '''
+        tick_size: int | float
+            every price updated must be a multiple of it
+        capacity: int
+            initial number of ticks covered, rounded up to a power of two
+        max_capacity: int
+            the covered range never grows beyond this many ticks, rounded up to a power of two
+        self._outside: dict
+            tick -> [size, notional, number of orders] of the levels that don't fit in the covered range
+        '''
+        if tick_size <= 0:
+            raise ValueError('tick_size must be positive')
+        self.tick_size = tick_size
+        self._ticks_per_unit = _scale(tick_size)
+        self.max_capacity = 1 << max(0, max_capacity - 1).bit_length()
+        self._capacity = min(1 << max(0, capacity - 1).bit_length(), self.max_capacity)
+        self._base = None
+        self._outside = {}
+        self._allocate()
+
+    def _allocate(self):
+        nodes = 2 * self._capacity
+        self._size = [0] * nodes
+        self._notional = [0] * nodes
+        self._count = [0] * nodes
+        self._levels = [0] * nodes
+        self._max_count = [0] * nodes
+
+    def _tick(self, price):
+        '''
+        :return: int | leaf tick of the price; ValueError if the price is off the tick grid
+        '''
+        return int(_to_int(price, self.tick_size, self._ticks_per_unit, 'price'))
+
+    def check(self, price):
+        '''
+        price: int | float
+            ValueError unless the price is a multiple of tick_size, an off-grid price would share its leaf
+            with the neighbouring tick; LOBTree checks a new level's price before touching the book
+        '''
+        self._tick(price)
+
+    def _price(self, tick):
+        return tick / self._ticks_per_unit if self._ticks_per_unit is not None else tick * self.tick_size
+
+    def _bound(self, price, upper: bool):
+        '''
+        Translate a query bound, not necessarily on the grid, into the first tick at or above it (the last
+        tick at or below it if upper)
+        '''
+        scaled = price * self._ticks_per_unit if self._ticks_per_unit is not None else price / self.tick_size
+        slack = _TOLERANCE * max(1, abs(scaled))
+        if upper:
+            return math.floor(scaled + slack)
+        return math.ceil(scaled - slack)
+
+    def _leaf(self, from_high: bool):
+        '''
+        :return: int | leaf index of the lowest (highest if from_high) non-empty level in the tree
+            O(log W)
+        '''
+        node = 1
+        while node < self._capacity:
+            first, second = 2 * node, 2 * node + 1
+            if from_high:
+                first, second = second, first
+            node = first if self._levels[first] else second
+        return node - self._capacity
+
+    def _grow(self, tick):
+        '''
+        tick: int
+            Rebuild the tree so that it covers every non-empty leaf and the new tick, absorbing the levels kept
+            outside of it that fit
+            O(W)
+        :return: bool | False, with the tree left as it is, if that would take more than max_capacity ticks
+        '''
+        low = high = tick
+        if self._levels[1]:
+            low = min(low, self._base + self._leaf(False))
+            high = max(high, self._base + self._leaf(True))
+            if high - low + 1 > self.max_capacity:
+                return False
+        capacity = self._capacity
+        leaves = [(self._base + i, self._size[capacity + i], self._notional[capacity + i], self._count[capacity + i])
+                  for i in range(capacity) if self._count[capacity + i] or self._size[capacity + i]]
+        while high - low + 1 > self._capacity // 2 and self._capacity < self.max_capacity:
+            self._capacity *= 2
+        # centred, unless the range takes more than half of max_capacity
+        self._base = min(max((low + high) // 2 - self._capacity // 2, high - self._capacity + 1), low)
+        self._allocate()
+        capacity = self._capacity
+        for leaf_tick in [leaf_tick for leaf_tick in self._outside if 0 <= leaf_tick - self._base < capacity]:
+            leaves.append((leaf_tick, *self._outside.pop(leaf_tick)))
+        for leaf_tick, size, notional, count in leaves:
+            if not 0 <= leaf_tick - self._base < capacity:
+                # size left behind by float rounding on a level without orders
+                continue
+            node = capacity + leaf_tick - self._base
+            self._size[node] = size
+            self._notional[node] = notional
+            self._count[node] = count
+            self._levels[node] = 1 if count > 0 else 0
+            self._max_count[node] = count
+        for node in range(capacity - 1, 0, -1):
+            self._pull(node)
+        return True
+
+    def _pull(self, node):
+        left = 2 * node
+        right = left + 1
+        self._size[node] = self._size[left] + self._size[right]
+        self._notional[node] = self._notional[left] + self._notional[right]
+        self._count[node] = self._count[left] + self._count[right]
+        self._levels[node] = self._levels[left] + self._levels[right]
+        self._max_count[node] = max(self._max_count[left], self._max_count[right])
+
+    def update(self, price, size_delta, count_delta: int):
+        '''
+        price: int | float
+        size_delta: int | float
+            change of the level's total size
+        count_delta: int
+            change of the level's number of orders
+            ValueError if the price is not a multiple of tick_size
+            O(log W), O(W) when the covered range has to grow, O(1) for a level kept outside of it
+        '''
+        tick = self._tick(price)
+        if self._base is None:
+            self._base = tick - self._capacity // 2
+        index = tick - self._base
+        if not 0 <= index < self._capacity:
+            outside = self._outside.get(tick)
+            if outside is None and not self._grow(tick):
+                outside = self._outside[tick] = [0, 0, 0]
+            if outside is not None:
+                outside[0] += size_delta
+                outside[1] += size_delta * price
+                outside[2] += count_delta
+                if not outside[0] and not outside[2]:
+                    del self._outside[tick]
+                return
+            index = tick - self._base
+        node = self._capacity + index
+        self._size[node] += size_delta
+        self._notional[node] += size_delta * price
+        count = self._count[node] + count_delta
+        self._count[node] = count
+        self._levels[node] = 1 if count > 0 else 0
+        self._max_count[node] = count
+        node >>= 1
+        while node:
+            self._pull(node)
+            node >>= 1
+
+    def _cover(self, low, high):
+        '''
+        :return: list | nodes exactly covering the leaves low..high, left to right
+        '''
+        left_nodes, right_nodes = [], []
+        low += self._capacity
+        high += self._capacity + 1
+        while low < high:
+            if low & 1:
+                left_nodes.append(low)
+                low += 1
+            if high & 1:
+                high -= 1
+                right_nodes.append(high)
+            low >>= 1
+            high >>= 1
+        return left_nodes + right_nodes[::-1]
+
+    def range_sum(self, low_price, high_price):
+        '''
+        low_price, high_price: int | float
+            inclusive price range
+        :return: (size, notional, number of orders) resting in the range
+        '''
+        size = notional = count = 0
+        if self._base is None:
+            return size, notional, count
+        low, high = self._bound(low_price, False), self._bound(high_price, True)
+        for tick, (level_size, level_notional, level_count) in self._outside.items():
+            if low <= tick <= high:
+                size += level_size
+                notional += level_notional
+                count += level_count
+        low, high = max(low - self._base, 0), min(high - self._base, self._capacity - 1)
+        if low > high:
+            return size, notional, count
+        for node in self._cover(low, high):
+            size += self._size[node]
+            notional += self._notional[node]
+            count += self._count[node]
+        return size, notional, count
+
+    def range_argmax(self, low_price, high_price, prefer_high: bool = False):
+        '''
+        low_price, high_price: int | float
+            inclusive price range
+        prefer_high: bool
+            on ties, return the highest price instead of the lowest one
+        :return: (price, number of orders) of the level with the most orders in the range, (None, 0) if it is empty
+        '''
+        if self._base is None:
+            return None, 0
+        low, high = self._bound(low_price, False), self._bound(high_price, True)
+        # best level so far, ties going to the preferred side
+        best_tick, best_count = None, 0
+        for tick, (_, _, count) in self._outside.items():
+            if low <= tick <= high and count > 0 and (count > best_count or count == best_count and
+                                                       (tick > best_tick) == prefer_high):
+                best_tick, best_count = tick, count
+        low, high = max(low - self._base, 0), min(high - self._base, self._capacity - 1)
+        if low <= high:
+            nodes = self._cover(low, high)
+            if prefer_high:
+                nodes.reverse()
+            node = max(nodes, key=self._max_count.__getitem__)
+            target = self._max_count[node]
+            if target > 0 and target >= best_count:
+                # walk down to the leaf holding the max, favouring the requested side
+                while node < self._capacity:
+                    first, second = 2 * node, 2 * node + 1
+                    if prefer_high:
+                        first, second = second, first
+                    node = first if self._max_count[first] == target else second
+                tick = self._base + node - self._capacity
+                if target > best_count or (tick > best_tick) == prefer_high:
+                    best_tick, best_count = tick, target
+        if best_tick is None:
+            return None, 0
+        return self._price(best_tick), best_count
+
+    def kth_level(self, k: int, from_high: bool = False):
+        '''
+        k: int
+            1 based rank among non-empty levels
+        from_high: bool
+            count from the highest price down instead of from the lowest price up
+        :return: int | float | None - price of the k-th non-empty level, None if there are fewer than k levels
+        '''
+        if self._base is None or k < 1:
+            return None
+        before = after = ()
+        if self._outside:
+            # the levels outside the tree lie below or above its covered range: take the ones met before it first
+            ticks = sorted((tick for tick, (_, _, count) in self._outside.items() if count > 0), reverse=from_high)
+            before = [tick for tick in ticks if (tick >= self._base + self._capacity if from_high else tick < self._base)]
+            after = ticks[len(before):]
+            if k <= len(before):
+                return self._price(before[k - 1])
+            k -= len(before)
+        if self._levels[1] < k:
+            k -= self._levels[1]
+            return self._price(after[k - 1]) if k <= len(after) else None
+        node = 1
+        while node < self._capacity:
+            first, second = 2 * node, 2 * node + 1
+            if from_high:
+                first, second = second, first
+            if self._levels[first] >= k:
+                node = first
+            else:
+                k -= self._levels[first]
+                node = second
+        return self._price(self._base + node - self._capacity)
@@ -1,23 +1,155 @@
+from enum import IntEnum
+
+
+class Side(IntEnum):
+    BID = 0
+    ASK = 1
+
+
+class OrderType(IntEnum):
+    LIMIT = 0
+    MARKET = 1
+
+
+class TimeInForce(IntEnum):
+    GTC = 0  # good till cancelled
+    IOC = 1  # immediate or cancel: match what can be matched, drop the rest
+    FOK = 2  # fill or kill: match in full or not at all
+    GTT = 3  # good till time: rests until Order.expire_at
+
+
+class PostOnly(IntEnum):
+    OFF = 0
+    REJECT = 1  # refuse a post-only order that would cross
+    REPRICE = 2  # move it one tick behind the opposite touch instead
+
+
+class SelfTradePrevention(IntEnum):
+    OFF = 0  # orders of the same owner trade with each other
+    CANCEL_NEWEST = 1  # cancel the rest of the incoming order
+    CANCEL_OLDEST = 2  # cancel the resting order and keep matching
+    CANCEL_BOTH = 3  # cancel both
+    DECREMENT = 4  # take the smaller size off both, cancelling the smaller order (both if equal)
+
+
+# accept the legacy strings as well as the enums (and their int codes) at the API edge
+SIDES = {'bid': Side.BID, 'ask': Side.ASK, Side.BID: Side.BID, Side.ASK: Side.ASK}
+ORDER_TYPES = {'limit': OrderType.LIMIT, 'market': OrderType.MARKET,
+               OrderType.LIMIT: OrderType.LIMIT, OrderType.MARKET: OrderType.MARKET}
+TIME_IN_FORCE = {'gtc': TimeInForce.GTC, 'ioc': TimeInForce.IOC, 'fok': TimeInForce.FOK, 'gtt': TimeInForce.GTT}
+TIME_IN_FORCE.update({member: member for member in TimeInForce})
+POST_ONLY = {None: PostOnly.OFF, 'reject': PostOnly.REJECT, 'reprice': PostOnly.REPRICE}
+POST_ONLY.update({member: member for member in PostOnly})
+SELF_TRADE_PREVENTION = {None: SelfTradePrevention.OFF, 'cancel_newest': SelfTradePrevention.CANCEL_NEWEST,
+                         'cancel_oldest': SelfTradePrevention.CANCEL_OLDEST,
+                         'cancel_both': SelfTradePrevention.CANCEL_BOTH, 'decrement': SelfTradePrevention.DECREMENT}
+SELF_TRADE_PREVENTION.update({member: member for member in SelfTradePrevention})
+_LIMIT = OrderType.LIMIT
+_MARKET = OrderType.MARKET
+_GTC = TimeInForce.GTC
+_GTT = TimeInForce.GTT
+_OFF = PostOnly.OFF
+
+
 class Order:
-    def __init__(self, price: int, id: int, order_type: str, timestamp: int, size: int, side: str):
+    __slots__ = ('id', 'timestamp', 'side', 'size', 'order_type', 'price', 'volume', 'prev', 'next', 'seq',
+                 'peak', 'reserve', 'time_in_force', 'expire_at', 'post_only', 'owner', 'stop_price')
+
+    @classmethod
+    def resting(cls, id: int, timestamp, side: Side, size, price, next=None):
+        '''
+        side: Side
+            no conversion, unlike __init__
+        next: Order Instance | None
+            the next older order of the level
+            Plain good-till-cancelled limit order built without __init__ and its argument conversions,
+            for bulk loads; sets every slot in __slots__ order, so keep the two in step
+        :return: Order Instance
+        '''
+        order = cls.__new__(cls)
+        order.id = id
+        order.timestamp = timestamp
+        order.side = side
+        order.size = size
+        order.order_type = _LIMIT
+        order.price = price
+        order.volume = size * price
+        order.prev = None
+        order.next = next
+        order.seq = 0
+        order.peak = 0
+        order.reserve = 0
+        order.time_in_force = _GTC
+        order.expire_at = None
+        order.post_only = _OFF
+        order.owner = None
+        order.stop_price = None
+        return order
+
+    def __init__(self, price: int, id: int, order_type, timestamp: int, size: int, side, peak: int = 0,
+                 time_in_force=_GTC, expire_at=None, post_only=_OFF, owner: int = None, stop_price=None):
+        '''
+        order_type: str | OrderType
+            'limit' / 'market' or the OrderType member, stored as OrderType
+        side: str | Side
+            'bid' / 'ask' or the Side member, stored as Side
+        peak: int
+            iceberg orders only: size displayed on the book at a time, the rest of the order is kept as
+            hidden reserve and shown peak by peak as the displayed part gets filled; 0 for a plain order
+        time_in_force: str | TimeInForce
+            'gtc' (default), 'ioc', 'fok' or 'gtt', or the TimeInForce member, stored as TimeInForce
+        expire_at: int | float | None
+            good-till-time orders only: the order is cancelled once the book's clock, driven by the
+            timestamps of the orders it processes, reaches expire_at
+        post_only: None | str | PostOnly
+            limit orders only: None, 'reject' or 'reprice' (one tick behind the opposite touch) when the
+            order would cross, stored as PostOnly
+        owner: int | None
+            non-negative owner / session id; the book indexes resting orders by owner for cancel_all,
+            cancel_side_range and mass_quote
+        stop_price: int | float | None
+            stop orders only: the order waits in the book's stop index until a trade prints at or above
+            (bid) or at or below (ask) the stop price, then runs as the market or limit order it describes
+        self.reserve: int
+            hidden size of a resting iceberg order; size is only the displayed part
+        '''
         self.id = id
         self.timestamp = timestamp
-        self.side = side
+        self.side = SIDES[side]
         self.size = size
-        self.order_type = order_type
+        self.order_type = order_type = ORDER_TYPES[order_type]
         # if market order, then it adds no depth to the book
-        if self.order_type == 'market':
+        if order_type is _MARKET:
             self.price = None
             self.volume = 0
         else:
             self.price = price
-            self.volume = self.size * self.price
+            self.volume = size * price
         self.prev = None
         self.next = None
+        # sequence number in its level's QueueIndex, 0 when not indexed
+        self.seq = 0
+        self.peak = peak
+        self.reserve = 0
+        if time_in_force is not _GTC or expire_at is not None:
+            time_in_force = TIME_IN_FORCE[time_in_force]
+            if (time_in_force is _GTT) != (expire_at is not None):
+                raise ValueError('expire_at is required for, and only for, good-till-time orders')
+        self.time_in_force = time_in_force
+        self.expire_at = expire_at
+        self.post_only = post_only if post_only is _OFF else POST_ONLY[post_only]
+        self.owner = owner
+        self.stop_price = stop_price
 
     def is_bid(self):
         '''
         Return true is order is bid, otherwise false
         :return: bool
         '''
-        return self.side == 'bid'
+        return self.side is Side.BID
+
+    def is_iceberg(self):
+        '''
+        :return: bool
+        '''
+        return self.peak > 0
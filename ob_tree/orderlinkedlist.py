@@ -1,24 +1,49 @@
 
+from .order import SelfTradePrevention
+from .queue_index import QueueIndex
+
+_CANCEL_NEWEST = SelfTradePrevention.CANCEL_NEWEST
+_CANCEL_BOTH = SelfTradePrevention.CANCEL_BOTH
+_DECREMENT = SelfTradePrevention.DECREMENT
+
+
 class OrderLinkedlist:
+    __slots__ = ('volume', 'size', 'reserve', '_head', '_tail', 'queue', 'tombstones')
 
-    def __init__(self):
+    def __init__(self, queue_index: bool = False):
+        '''
+        queue_index: bool
+            keep a QueueIndex so that position() is O(log n) instead of a walk from the tail
+        self.size, self.volume: displayed size and notional of the orders on the level
+        self.reserve: hidden iceberg reserve on the level, not part of size
+        self.tombstones: number of lazily cancelled orders still linked, see LOBTree._tombstone;
+            a tombstone is an order with size 0, it is not part of size, volume, reserve or the queue index
+        '''
         self.volume = 0
         self.size = 0
+        self.reserve = 0
         self._head = None
         self._tail = None
+        self.queue = QueueIndex() if queue_index else None
+        self.tombstones = 0
 
     def set_head(self, order):
         '''
         order: Order Instance
             if _head is None, set _head and _tail to order 
             else insert before the _head
-            O(1)
+            O(1), O(log n) with a queue index
         '''
         if self._head is None:
             self._head = order
             self._tail = order
-            return
-        self.insert_before(self._head, order)
+        else:
+            self.insert_before(self._head, order)
+        if self.queue is not None:
+            # the head is the back of the queue
+            if order.seq:
+                self.queue.discard(order)
+            self.queue.push(order)
 
     def set_tail(self, order):
         '''
@@ -30,8 +55,10 @@ class OrderLinkedlist:
         if self._tail is None:
             self._head = order
             self._tail = order
-            return
-        self.insert_after(self._tail, order)
+        else:
+            self.insert_after(self._tail, order)
+        if self.queue is not None:
+            self._reindex()
 
     def insert_before(self, order, order_to_insert):
         '''
@@ -40,12 +67,12 @@ class OrderLinkedlist:
             Function used in set_head and insert_at_position method
             O(1)
         '''
-        if order_to_insert == self._head and order_to_insert == self._tail:
+        if order_to_insert is order or (order_to_insert == self._head and order_to_insert == self._tail):
             return
         self.remove(order_to_insert, decrement=False)
         if order != self._head:
-            order_to_insert = order.prev
-            order_to_insert = order
+            order_to_insert.prev = order.prev
+            order_to_insert.next = order
             order.prev.next = order_to_insert
             order.prev = order_to_insert
         else:
@@ -61,7 +88,7 @@ class OrderLinkedlist:
             Function used in set_tail  
             O(1)
         '''
-        if order_to_insert == self._head and order_to_insert == self._tail:
+        if order_to_insert is order or (order_to_insert == self._head and order_to_insert == self._tail):
             return
         self.remove(order_to_insert, decrement=False)
         if order != self._tail:
@@ -95,6 +122,8 @@ class OrderLinkedlist:
             self.set_tail(order_to_insert)
         else:
             self.insert_before(order, order_to_insert)
+            if self.queue is not None:
+                self._reindex()
 
     def remove_order_with_value(self, value):
         '''
@@ -113,7 +142,7 @@ class OrderLinkedlist:
         '''
         order: Order Instance
         decrement: bool
-            decrement self.size when True
+            decrement self.size, self.volume and self.reserve when True
             Remove given order
             O(1)
         '''
@@ -130,6 +159,75 @@ class OrderLinkedlist:
         if decrement:
             self.size -= order.size
             self.volume -= order.volume
+            self.reserve -= order.reserve
+            if self.queue is not None and order.seq:
+                self.queue.discard(order)
+                if self.queue.stale > self.queue.live + 64:
+                    self._reindex()
+
+    def _reindex(self):
+        '''
+        Renumber the queue index from the oldest order (tail) to the newest one (head), tombstones left out
+        O(n)
+        '''
+        queue = self.queue = QueueIndex()
+        order = self._tail
+        while order is not None:
+            if order.size:
+                queue.push(order)
+            order = order.prev
+
+    def compact(self, pool=None):
+        '''
+        pool: OrderPool | None
+            tombstones are handed back to the pool
+            Unlink every tombstone, i.e. every order of size 0 left by LOBTree._tombstone,
+            and renumber the queue index if it has gone stale
+            O(n)
+        '''
+        # relink the live orders in one pass instead of unlinking tombstones one by one
+        older = None
+        order = self._tail
+        while order is not None:
+            newer = order.prev
+            if order.size:
+                order.next = older
+                if older is None:
+                    self._tail = order
+                else:
+                    older.prev = order
+                older = order
+            else:
+                order.prev = order.next = None
+                if pool is not None:
+                    pool.release_order(order)
+            order = newer
+        if older is None:
+            self._head = self._tail = None
+        else:
+            older.prev = None
+            self._head = older
+        self.tombstones = 0
+        if self.queue is not None and self.queue.stale > self.queue.live + 64:
+            self._reindex()
+
+    def position(self, order):
+        '''
+        order: Order Instance
+            Orders ahead of the given order in the FIFO queue, i.e. between it and the tail
+            O(log n) with a queue index, O(n) otherwise
+        :return: int, int | number of orders and total size ahead
+        '''
+        if self.queue is not None:
+            return self.queue.ahead(order)
+        count = size = 0
+        ahead = self._tail
+        while ahead is not None and ahead is not order:
+            if ahead.size:
+                count += 1
+                size += ahead.size
+            ahead = ahead.prev
+        return count, size
 
     def containing_order(self, value):
         '''
@@ -142,36 +240,109 @@ class OrderLinkedlist:
             order = order.next
         return order is not None
 
-    def _consume_orders(self, order, order_ids):
+    def _consume_orders(self, order, order_ids, fill_sink=None, pool=None, owners=None, stp=SelfTradePrevention.OFF):
         '''
         order: Order Instance
         order_ids: dict | LOBTree.order_ids
+        owners: dict | None
+            LOBTree.owners, fully filled maker orders with an owner are taken out of it
+        fill_sink: callable | None
+            called as fill_sink(maker_id, taker_id, price, size, timestamp) for every match
+        pool: OrderPool | None
+            fully filled maker orders are handed back to the pool
+        stp: SelfTradePrevention
+            what happens when the tail order has the same owner as the incoming order, checked as each
+            tail order comes up so it takes no extra pass over the level: the incoming order's cancelled
+            size is taken off order.size without a fill, a cancelled resting order leaves the book in full,
+            hidden reserve included
+            Tombstones reached at the tail are unlinked (and recycled) on the way, they don't count as deleted
             Eat up orders on this price level until either the order is fully executed or
             all of the orders on this level have exhausted
             There are three scenarios:
-                1) tail order size is larger or equal to the order => delete order from order_ids, decrease the tail order size accordingly
-                2) tail order size is smaller than the order and order size is smaller than price level total size
-                    => keep taking the orders on this level until order.size is 0, decrease and delete the order from order_ids 
+                1) tail order size is larger than the order => decrease the tail order size accordingly
+                2) tail order size is smaller or equal to the order => take the whole tail order and delete it from order_ids;
+                    an iceberg tail order is replenished from its reserve and moved to the head instead, still in this loop
                 3) order size is larger than all of the orders on this level => return order.size after deducting the order executed 
-        :return: int, int
+        :return: int, int, bool | unfilled size, number of orders deleted, whether anything traded
         '''
         # keeps a track of number of orders deleted to update the LOBTree.price_tree
         number_of_orders_deleted = 0
-        while order.size > 0 and self.size > 0:
+        traded = False
+        owner = order.owner if stp else None
+        # the level ends with its last order, not when its size, which float sizes leave a rounding error
+        # away from 0, runs out
+        while order.size > 0 and self._tail is not None:
             # respecting time priority principle, orders on the same level follows FIFO design
             # since we add new orders at the head, we take orders out at the tail
-            if self._tail.size >= order.size:
-                self._tail.size -= order.size
+            maker = self._tail
+            if owner is not None and maker.owner == owner:
+                if stp is _CANCEL_NEWEST or (stp is _DECREMENT and maker.size > order.size):
+                    if stp is _DECREMENT:
+                        maker.size -= order.size
+                        self.size -= order.size
+                        decrement = order.size * maker.price
+                        maker.volume -= decrement
+                        self.volume -= decrement
+                        if self.queue is not None:
+                            self.queue.resize(maker, maker.size)
+                    order.size = 0
+                    return order.size, number_of_orders_deleted, traded
+                if stp is _DECREMENT:
+                    order.size -= maker.size
+                elif stp is _CANCEL_BOTH:
+                    order.size = 0
+            elif maker.size > order.size:
+                if fill_sink is not None:
+                    fill_sink(maker.id, order.id, maker.price, order.size, order.timestamp)
+                maker.size -= order.size
                 self.size -= order.size
-                if self._tail.size == 0:
-                    del order_ids[self._tail.id]
-                    self.remove(self._tail)
-                    number_of_orders_deleted += 1
+                filled = order.size * maker.price
+                maker.volume -= filled
+                self.volume -= filled
+                if self.queue is not None:
+                    self.queue.resize(maker, maker.size)
                 order.size = 0
-                return order.size, number_of_orders_deleted
+                return order.size, number_of_orders_deleted, True
             else:
-                order.size -= self._tail.size
-                del order_ids[self._tail.id]
-                self.remove(self._tail)
-                number_of_orders_deleted += 1
-        return order.size, number_of_orders_deleted
+                if not maker.size:
+                    # tombstone of a lazily cancelled order
+                    self.remove(maker, decrement=False)
+                    self.tombstones -= 1
+                    if pool is not None:
+                        pool.release_order(maker)
+                    continue
+                if fill_sink is not None:
+                    fill_sink(maker.id, order.id, maker.price, maker.size, order.timestamp)
+                order.size -= maker.size
+                traded = True
+                if maker.reserve:
+                    self.size -= maker.size
+                    self.volume -= maker.volume
+                    self._replenish(maker)
+                    continue
+            del order_ids[maker.id]
+            if maker.owner is not None:
+                owned = owners[maker.owner]
+                del owned[maker.id]
+                if not owned:
+                    del owners[maker.owner]
+            self.remove(maker)
+            number_of_orders_deleted += 1
+            if pool is not None:
+                pool.release_order(maker)
+        return order.size, number_of_orders_deleted, traded
+
+    def _replenish(self, order):
+        '''
+        order: Order Instance | iceberg order whose displayed size was just filled, still linked
+            Show the next peak out of the hidden reserve and send the order to the back of the queue
+            O(1), O(log n) with a queue index
+        '''
+        refill = order.peak if order.reserve > order.peak else order.reserve
+        order.reserve -= refill
+        self.reserve -= refill
+        order.size = refill
+        order.volume = refill * order.price
+        self.size += refill
+        self.volume += order.volume
+        self.set_head(order)
@@ -0,0 +1,56 @@
+'''
+Free-list pool for Order and OrderLinkedlist instances.
+
+Add/cancel churn creates and drops an Order per message and a price level every time a level
+empties. With a pool attached to the book, cancelled and fully filled orders and emptied levels
+are kept on a free list and re-initialised in place the next time one is needed.
+An order handed back to the pool must not be used by the caller anymore.
+'''
+from .order import Order, PostOnly, TimeInForce
+from .orderlinkedlist import OrderLinkedlist
+
+
+class OrderPool:
+
+    def __init__(self, max_size: int = 1 << 16):
+        '''
+        max_size: int
+            upper bound on the number of idle orders (and, separately, idle levels) kept around
+        '''
+        self.max_size = max_size
+        self._orders = []
+        self._levels = []
+
+    def order(self, price, id: int, order_type, timestamp, size, side, peak: int = 0, time_in_force=TimeInForce.GTC,
+              expire_at=None, post_only=PostOnly.OFF, owner: int = None, stop_price=None):
+        '''
+        Same arguments as Order
+        :return: Order Instance | recycled if one is available
+        '''
+        if self._orders:
+            order = self._orders.pop()
+            order.__init__(price, id, order_type, timestamp, size, side, peak, time_in_force, expire_at, post_only,
+                           owner, stop_price)
+            return order
+        return Order(price, id, order_type, timestamp, size, side, peak, time_in_force, expire_at, post_only, owner,
+                     stop_price)
+
+    def release_order(self, order: Order):
+        if len(self._orders) < self.max_size:
+            self._orders.append(order)
+
+    def level(self, queue_index: bool = False):
+        '''
+        queue_index: bool
+            same as OrderLinkedlist
+        :return: OrderLinkedlist Instance | empty, recycled if one is available
+        '''
+        if self._levels:
+            level = self._levels.pop()
+            level.__init__(queue_index)
+            return level
+        return OrderLinkedlist(queue_index)
+
+    def release_level(self, level: OrderLinkedlist):
+        if len(self._levels) < self.max_size:
+            self._levels.append(level)
@@ -0,0 +1,100 @@
+'''
+Order-statistic index over one price level's FIFO queue.
+
+Every order joining the back of the queue gets the next sequence number, and a Fenwick tree keyed
+by sequence number holds the order's size and a count of one. The orders ahead of an order are the
+ones with a smaller sequence number, so "how many orders / how much size is ahead of me" is a
+prefix sum: O(log n) per query, insert, cancel and partial fill, independent of where the order
+sits in the queue. Cancelled slots are left at zero and the level renumbers its queue once they
+outnumber the live orders.
+'''
+
+
+class QueueIndex:
+    __slots__ = ('_sizes', '_counts', '_values', 'live')
+
+    def __init__(self):
+        # Fenwick trees are 1-based, slot 0 is unused
+        self._sizes = [0]
+        self._counts = [0]
+        # size recorded for each sequence number, 0 once the order left the queue
+        self._values = [0]
+        self.live = 0
+
+    def __len__(self):
+        return self.live
+
+    @property
+    def stale(self):
+        '''
+        :return: int | sequence numbers that no longer hold an order
+        '''
+        return len(self._values) - 1 - self.live
+
+    def push(self, order):
+        '''
+        order: Order Instance
+            Append the order at the back of the queue and store its sequence number on order.seq
+            O(log n)
+        '''
+        seq = len(self._values)
+        size = order.size
+        # a new Fenwick node covers (seq - lowbit(seq), seq]: sum the nodes below it
+        node_size = size
+        node_count = 1
+        stop = seq - (seq & -seq)
+        child = seq - 1
+        while child > stop:
+            node_size += self._sizes[child]
+            node_count += self._counts[child]
+            child -= child & -child
+        self._sizes.append(node_size)
+        self._counts.append(node_count)
+        self._values.append(size)
+        self.live += 1
+        order.seq = seq
+
+    def _add(self, seq, size_delta, count_delta):
+        sizes, counts = self._sizes, self._counts
+        end = len(sizes)
+        while seq < end:
+            sizes[seq] += size_delta
+            counts[seq] += count_delta
+            seq += seq & -seq
+
+    def discard(self, order):
+        '''
+        order: Order Instance
+            Take the order out of the queue
+            O(log n)
+        '''
+        seq = order.seq
+        self._add(seq, -self._values[seq], -1)
+        self._values[seq] = 0
+        self.live -= 1
+        order.seq = 0
+
+    def resize(self, order, size):
+        '''
+        order: Order Instance
+        size: int
+            Record a new size for the order without changing its place in the queue
+            O(log n)
+        '''
+        seq = order.seq
+        self._add(seq, size - self._values[seq], 0)
+        self._values[seq] = size
+
+    def ahead(self, order):
+        '''
+        order: Order Instance
+        :return: int, int | number of orders and total size ahead of the order
+            O(log n)
+        '''
+        seq = order.seq - 1
+        count = size = 0
+        while seq > 0:
+            count += self._counts[seq]
+            size += self._sizes[seq]
+            seq -= seq & -seq
+        return count, size
@@ -0,0 +1,96 @@
+'''
+Sorted-array price index for sparse books.
+
+An illiquid, wide-tick instrument may only ever show a few dozen levels, and then the per-node overhead
+of a Red-Black tree is most of the book's index. SortedLevels keeps the prices in one sorted Python list,
+located with bisect, and the values in a dict: the best prices are the two ends of the list, lookups are a
+dict access, and inserting or removing a level is a binary search plus a memmove of the list, which for a
+few hundred levels costs less than rebalancing tree nodes. The public interface mirrors the subset of
+bintrees.FastRBTree used by LOBTree, like PriceLadder.
+'''
+from bisect import bisect_left, insort
+
+
+class SortedLevels:
+
+    def __init__(self, items=()):
+        '''
+        items: iterable | (price, value) pairs to start with
+        self._keys: list
+            prices in ascending order
+        self._values: dict
+            key: price; value: value stored for the level (number of orders for LOBTree)
+        '''
+        self._values = dict(items)
+        self._keys = sorted(self._values)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, price):
+        return price in self._values
+
+    def __getitem__(self, price):
+        return self._values[price]
+
+    def __setitem__(self, price, value):
+        '''
+        price: int | float
+        value: int
+            Insert a level or overwrite its value
+            O(1) to overwrite, O(log M) search plus an O(M) memmove to insert
+        '''
+        if price not in self._values:
+            insort(self._keys, price)
+        self._values[price] = value
+
+    def __iter__(self):
+        return self.keys()
+
+    def remove(self, price):
+        '''
+        price: int | float
+            Remove the level
+            O(log M) search plus an O(M) memmove
+        '''
+        del self._values[price]
+        del self._keys[bisect_left(self._keys, price)]
+
+    def max_key(self):
+        '''
+        O(1)
+        :return: price of the highest level
+        '''
+        if not self._keys:
+            raise ValueError('Tree is empty')
+        return self._keys[-1]
+
+    def min_key(self):
+        '''
+        O(1)
+        :return: price of the lowest level
+        '''
+        if not self._keys:
+            raise ValueError('Tree is empty')
+        return self._keys[0]
+
+    def keys(self, reverse: bool = False):
+        return iter(reversed(self._keys) if reverse else self._keys)
+
+    def items(self, reverse: bool = False):
+        values = self._values
+        return ((price, values[price]) for price in (reversed(self._keys) if reverse else self._keys))
+
+    def nlargest(self, n: int):
+        '''
+        :return: list | the n highest (price, value) pairs, best first
+        '''
+        values = self._values
+        return [(price, values[price]) for price in self._keys[:-n - 1:-1]] if n > 0 else []
+
+    def nsmallest(self, n: int):
+        '''
+        :return: list | the n lowest (price, value) pairs, best first
+        '''
+        values = self._values
+        return [(price, values[price]) for price in self._keys[:n]]
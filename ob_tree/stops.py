@@ -0,0 +1,77 @@
+'''
+Trigger index for stop and stop-limit orders.
+
+Pending stops of one side live in a FastRBTree keyed by stop price, each key holding the orders at that
+stop price in arrival order, next to the LOBTree of the same side. Bid stops trigger when the last trade
+price rises to their stop price, ask stops when it falls to it, so the triggered stops are always a
+contiguous range at one end of the tree: a trade pops the levels from that end while they are in range,
+O(log S) per triggered stop price, and never looks at the stops that stay pending.
+'''
+from bintrees import FastRBTree
+from .order import Order, Side
+
+
+class StopIndex:
+
+    def __init__(self, side):
+        '''
+        side: Side
+            side of the stop orders held
+        self.levels: FastRBTree
+            key: stop price; value: dict of order id -> Order in arrival order
+        self.order_ids: dict
+            key: order id; value: Order
+        '''
+        self.side = side
+        self.levels = FastRBTree()
+        self.order_ids = {}
+
+    def __len__(self):
+        return len(self.order_ids)
+
+    def __contains__(self, order_id):
+        return order_id in self.order_ids
+
+    def add(self, order: Order):
+        '''
+        order: Order Instance | with a stop_price
+            O(log S) for the first stop at a price, O(1) for the others
+        '''
+        if order.id in self.order_ids:
+            raise ValueError('stop order already pending')
+        level = self.levels.get(order.stop_price)
+        if level is None:
+            level = self.levels[order.stop_price] = {}
+        level[order.id] = order
+        self.order_ids[order.id] = order
+
+    def cancel(self, order_id: int):
+        '''
+        order_id: int
+        :return: Order Instance | the pending stop removed
+        '''
+        order = self.order_ids.pop(order_id)
+        level = self.levels[order.stop_price]
+        del level[order_id]
+        if not level:
+            self.levels.remove(order.stop_price)
+        return order
+
+    def triggered(self, last_price):
+        '''
+        last_price: int | float
+            Remove and return every stop the last trade price has reached, the stop price closest to
+            where the price came from first and arrival order within a stop price
+        :return: list | Order Instances
+        '''
+        levels = self.levels
+        released = []
+        if self.side is Side.BID:
+            while levels and levels.min_key() <= last_price:
+                released.extend(levels.pop_min()[1].values())
+        else:
+            while levels and levels.max_key() >= last_price:
+                released.extend(levels.pop_max()[1].values())
+        for order in released:
+            del self.order_ids[order.id]
+        return released
@@ -0,0 +1,137 @@
+'''
+Hierarchical timer wheel (Varghese & Lauck) for good-till-time order expiry.
+
+Time is counted in ticks of `resolution` timestamp units. Level l has 2 ** bits slots of
+2 ** (bits * l) ticks each; an entry is stored on the level of the highest base 2 ** bits digit in
+which its deadline differs from the current tick, in the slot given by that digit of the deadline.
+When the clock reaches a slot boundary the slot's entries cascade one or more levels down, and
+the entries of the level 0 slot of the current tick are due. Scheduling is O(1), every entry
+cascades at most `levels` times, and advancing the clock skips whole slots on the lowest
+non-empty level instead of stepping tick by tick. Deadlines beyond the top level wait in an
+overflow list that is rescanned when the clock reaches the turn of the top level holding the
+earliest of them.
+'''
+
+
+class TimerWheel:
+
+    def __init__(self, resolution=0.001, bits: int = 6, levels: int = 4):
+        '''
+        resolution: int | float
+            timestamp units per tick; deadlines are rounded up to a whole tick
+        bits: int
+            log2 of the number of slots per level
+        levels: int
+            number of levels, the wheel spans 2 ** (bits * levels) ticks before using the overflow list
+        self.current: int | current tick, None until the clock is first set by advance()
+            (or, failing that, by the first schedule(), to the tick just before its deadline)
+        '''
+        self.resolution = resolution
+        self.bits = bits
+        self.levels = levels
+        self._mask = (1 << bits) - 1
+        self._slots = [[[] for _ in range(1 << bits)] for _ in range(levels)]
+        # number of entries per level, the last one being the overflow list
+        self._counts = [0] * (levels + 1)
+        self._overflow = []
+        self.current = None
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def tick_of(self, timestamp):
+        '''
+        :return: int | first tick at or after the timestamp
+        '''
+        tick = int(timestamp / self.resolution)
+        return tick if tick * self.resolution >= timestamp else tick + 1
+
+    def schedule(self, deadline, item):
+        '''
+        deadline: int | float
+            timestamp at which the item is due
+        item: any
+        :return: bool | False if the deadline has already passed, the item is then not scheduled
+        '''
+        tick = self.tick_of(deadline)
+        if self.current is None:
+            self.current = tick - 1
+        if tick <= self.current:
+            return False
+        self._place(tick, item)
+        self.count += 1
+        return True
+
+    def _place(self, tick, item):
+        level = ((tick ^ self.current).bit_length() - 1) // self.bits
+        if level >= self.levels:
+            self._overflow.append((tick, item))
+            self._counts[self.levels] += 1
+            return
+        self._slots[level][(tick >> (self.bits * level)) & self._mask].append((tick, item))
+        self._counts[level] += 1
+
+    def advance(self, timestamp):
+        '''
+        timestamp: int | float
+            Move the clock forward to the timestamp; does nothing if it is not ahead of the clock
+        :return: list | items whose deadline is at or before the timestamp, earliest slot first
+        '''
+        target = int(timestamp / self.resolution)
+        if self.current is None:
+            self.current = target
+            return []
+        due = []
+        counts = self._counts
+        while self.current < target:
+            for lowest, count in enumerate(counts):
+                if count:
+                    break
+            else:
+                self.current = target
+                break
+            span = 1 << (self.bits * lowest)
+            tick = (self.current // span + 1) * span
+            if lowest == self.levels:
+                # only far deadlines left: go straight to the turn of the earliest one
+                tick = max(tick, min(deadline for deadline, _ in self._overflow) // span * span)
+            if tick > target:
+                self.current = target
+                break
+            self.current = tick
+            self._expire_tick(tick, due)
+        self.count -= len(due)
+        return due
+
+    def _expire_tick(self, tick, due):
+        '''
+        Cascade every level whose slot boundary is at this tick, highest first, then pop level 0
+        '''
+        bits, mask, slots, counts = self.bits, self._mask, self._slots, self._counts
+        if tick & ((1 << (bits * self.levels)) - 1) == 0 and self._overflow:
+            entries, self._overflow = self._overflow, []
+            counts[self.levels] = 0
+            self._reschedule(entries, due)
+        for level in range(self.levels - 1, 0, -1):
+            if tick & ((1 << (bits * level)) - 1):
+                continue
+            slot = slots[level][(tick >> (bits * level)) & mask]
+            if slot:
+                entries = slot[:]
+                slot.clear()
+                counts[level] -= len(entries)
+                self._reschedule(entries, due)
+        slot = slots[0][tick & mask]
+        if slot:
+            counts[0] -= len(slot)
+            due.extend(item for _, item in slot)
+            slot.clear()
+
+    def _reschedule(self, entries, due):
+        current = self.current
+        for tick, item in entries:
+            if tick <= current:
+                due.append(item)
+            else:
+                self._place(tick, item)
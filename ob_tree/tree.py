@@ -6,33 +6,118 @@ therefore maintaining a 'perfectly' balanced tree all the time is not necessary.
 as it requires less balancing. 
 Hence, I chose to use FastRBTree over SortedDict and FastAVLTree, despite bintrees' halted development
 '''
+import bintrees
 from bintrees import FastRBTree
+from .ladder import PriceLadder
+from .sorted_levels import SortedLevels
+from .level_stats import LevelStats
 from .orderlinkedlist import OrderLinkedlist
-from .order import Order
+from .order import Order, SelfTradePrevention, TimeInForce
+import gc
 import logging
+import numpy as np
 
 LOG = logging.getLogger(__name__)
 
+# the 'auto' backend moves to the Red-Black tree above SPARSE_MAX_LEVELS levels and back to the sorted
+# array below SPARSE_MIN_LEVELS; the gap keeps a book hovering around the limit from switching back and forth.
+# Without its C extension bintrees falls back to a pure Python RBTree, which the sorted array outruns up to
+# several thousand levels (see benchmarks/sparse_levels.py)
+SPARSE_MAX_LEVELS = 512 if FastRBTree is not bintrees.RBTree else 8192
+SPARSE_MIN_LEVELS = SPARSE_MAX_LEVELS // 4
+# tombstones a level may hold beyond its number of live orders before a lazy cancel compacts it
+COMPACT_SLACK = 32
+
+
+def make_price_tree(backend: str = 'rbtree', tick_size=1, window: int = 4096):
+    '''
+    backend: str
+        'rbtree' for bintrees.FastRBTree, 'ladder' for the array-backed PriceLadder, 'sorted' for the
+        bisect-based SortedLevels; 'auto' starts with SortedLevels, LOBTree switches it to a FastRBTree
+        when the book gets deep
+    tick_size: int | float
+        only used by the ladder backend
+    window: int
+        only used by the ladder backend, number of preallocated ticks
+    :return: FastRBTree | PriceLadder | SortedLevels
+    '''
+    if backend == 'rbtree':
+        return FastRBTree()
+    if backend == 'ladder':
+        return PriceLadder(tick_size=tick_size, window=window)
+    if backend == 'sorted' or backend == 'auto':
+        return SortedLevels()
+    raise ValueError(f'Unknown price tree backend: {backend}')
+
 
 class LOBTree:
 
-    def __init__(self):
+    def __init__(self, backend: str = 'auto', tick_size=1, window: int = 4096, level_stats: bool = False,
+                 queue_positions: bool = False, lazy_cancel: bool = False):
         '''
         Limit order book tree implementation using Red-Black tree for self-balancing 
         Each limit price level is a OrderLinkedlist, and each order contains information 
         including id, price, timestamp, volume
+        backend: str
+            'auto' (default), 'rbtree', 'ladder' or 'sorted'; see make_price_tree. With 'auto' the price tree
+            is a SortedLevels while the side is sparse and a FastRBTree once it has more than SPARSE_MAX_LEVELS
+            levels
+        level_stats: bool
+            keep a LevelStats segment tree in sync with the price levels so that range_volume and
+            level_with_most_orders run in O(log M); prices must be multiples of tick_size,
+            an order priced off the grid is refused with ValueError before the book is touched
+        queue_positions: bool
+            give every price level a QueueIndex so that queue_position is O(log n) instead of O(n)
+        lazy_cancel: bool
+            cancel_order leaves a tombstone in the level's queue instead of unlinking the order, see cancel_order
         self.limit_level: dict
             key: price level; value: OrderLinkedlist object
         self.order_ids: dict  
             key: order id; value: Order object
             helps to locate order by id
+        self.fill_sink: callable | None
+            receives (maker_id, taker_id, price, size, timestamp) for every match, e.g. FillBuffer.append
+        self.pool: OrderPool | None
+            if set, emptied price levels and fully filled / cancelled orders are recycled through it
+        self.owners: dict
+            key: owner id; value: dict of order id -> Order for the owner's resting orders
+        self.delta_sink: callable | None
+            receives (side, price, size, number of orders) every time a price level changes, size and
+            number of orders being 0 once the level is gone, e.g. DeltaPublisher.append
+        self.side: Side | None
+            side passed to delta_sink, set by LimitOrderBook
+        self.last_price: int | float | None
+            price of the last level the latest market_order call traded at, None if it traded nothing
+        self.self_trade_prevention: SelfTradePrevention
+            applied by market_order when an incoming order meets a resting order of its own owner,
+            see OrderLinkedlist._consume_orders; set by LimitOrderBook
+        self.dtype: np.dtype
+            dtype of the price and size columns of top_levels and to_columns; np.int64 when prices and sizes
+            are integer ticks and lots, see ob_tree.fixed_point; set by LimitOrderBook
         '''
+        self.backend = backend
+        self.tick_size = tick_size
+        self.window = window
         # tree that store price as keys and number of orders on that level as values
-        self.price_tree = FastRBTree()
+        self.price_tree = make_price_tree(backend, tick_size, window)
+        self._auto = backend == 'auto'
         self.max_price = None
         self.min_price = None
         self.limit_levels = {}
         self.order_ids = {}
+        self.owners = {}
+        self.fill_sink = None
+        self.delta_sink = None
+        self.side = None
+        self.last_price = None
+        self.self_trade_prevention = SelfTradePrevention.OFF
+        self.pool = None
+        self.level_stats = LevelStats(tick_size, window) if level_stats else None
+        # the ladder and the level stats only hold prices on the tick grid, see check_price
+        self._grid = backend == 'ladder' or level_stats
+        self.queue_positions = queue_positions
+        self.lazy_cancel = lazy_cancel
+        self.dtype = np.float64
 
     @property
     def max(self):
@@ -61,10 +146,21 @@ class LOBTree:
         if order.id in self.order_ids:
             raise ValueError('order already exists in the book')
             return
+        self.check_price(order.price)
 
+        if order.peak and order.size > order.peak:
+            # iceberg: only the peak is displayed, the rest waits in the hidden reserve
+            order.reserve += order.size - order.peak
+            order.size = order.peak
+        order.volume = order.size * order.price
         if order.price not in self.limit_levels:
-            new_price_level = OrderLinkedlist()
+            if self.pool is None:
+                new_price_level = OrderLinkedlist(self.queue_positions)
+            else:
+                new_price_level = self.pool.level(self.queue_positions)
             self.price_tree[order.price] = 1
+            if self._auto:
+                self._fit_price_tree()
             self.limit_levels[order.price] = new_price_level
             self.limit_levels[order.price].set_head(order)
             self.limit_levels[order.price].size += order.size
@@ -78,23 +174,128 @@ class LOBTree:
             self.limit_levels[order.price].size += order.size
             self.order_ids[order.id] = order
             self.price_tree[order.price] += 1
+        level = self.limit_levels[order.price]
+        level.volume += order.volume
+        level.reserve += order.reserve
+        if order.owner is not None:
+            self._add_owned(order)
+        if self.level_stats is not None:
+            self.level_stats.update(order.price, order.size, 1)
+        if self.delta_sink is not None:
+            self.delta_sink(self.side, order.price, level.size, self.price_tree[order.price])
+
+    def _add_owned(self, order: Order):
+        owned = self.owners.get(order.owner)
+        if owned is None:
+            owned = self.owners[order.owner] = {}
+        owned[order.id] = order
+
+    def _drop_owned(self, order: Order):
+        owned = self.owners[order.owner]
+        del owned[order.id]
+        if not owned:
+            del self.owners[order.owner]
 
     def update_existing_order_size(self, order_id: int, updated_size: int):
         '''
         order_id: int
         size: int
-            Update an existing order's size in a price level and its price level's overall size
+            Amend an existing order's size in place and its price level's overall size:
+            a decrease keeps the order's place in the queue, an increase sends it to the back of the queue
+            (the head), an unchanged size does nothing; a size of 0 or less cancels the order
+            O(1), O(log n) with a queue index
         :return: None
         '''
-        delta = self.order_ids[order_id].size - updated_size
-        try:
-            self.order_ids[order_id].size = updated_size
-            order_price = self.order_ids[order_id].price
-            # updated order will be put at the front of the list
-            self.limit_levels[order_price].set_head(self.order_ids[order_id])
-            self.limit_levels[order_price].size -= delta
-        except Exception as e:
-            LOG.info('Order is not in the book')
+        order = self.order_ids[order_id]
+        delta = updated_size - order.size
+        if delta == 0:
+            return
+        if updated_size <= 0:
+            self.cancel_order(order_id)
+            return
+        level = self.limit_levels[order.price]
+        order.size = updated_size
+        order.volume = updated_size * order.price
+        level.size += delta
+        level.volume += delta * order.price
+        if delta > 0:
+            level.set_head(order)
+        elif level.queue is not None:
+            level.queue.resize(order, updated_size)
+        if self.level_stats is not None:
+            self.level_stats.update(order.price, delta, 0)
+        if self.delta_sink is not None:
+            self.delta_sink(self.side, order.price, level.size, self.price_tree[order.price])
+
+    def check_price(self, price):
+        '''
+        price: int | float
+            ValueError unless a level can be added at the price: the ladder backend and the level stats only
+            take multiples of tick_size. Every path that adds a level calls it before it changes the book
+        '''
+        if not self._grid or price in self.limit_levels:
+            return
+        if self.backend == 'ladder':
+            self.price_tree.check(price)
+        if self.level_stats is not None:
+            self.level_stats.check(price)
+
+    def move_order(self, order_id: int, new_price, new_size: int = None):
+        '''
+        order_id: int
+        new_price: int | float
+        new_size: int | None
+            Amend an existing order's price (and size): the order goes to the back of the queue of its new
+            price level without leaving order_ids or the owner index; amending to the current price only
+            applies the size, see update_existing_order_size, and a size of 0 or less cancels the order wherever
+            the price is. The caller makes sure the new price doesn't cross
+            O(log M)
+        :return: None
+        '''
+        order = self.order_ids[order_id]
+        if new_size is not None and new_size <= 0:
+            self.cancel_order(order_id)
+            return
+        if new_price == order.price:
+            if new_size is not None:
+                self.update_existing_order_size(order_id, new_size)
+            return
+        self.check_price(new_price)
+        old_price = order.price
+        old_level = self.limit_levels[old_price]
+        old_level.remove(order, decrement=True)
+        self.price_tree[old_price] -= 1
+        if self.level_stats is not None:
+            self.level_stats.update(old_price, -order.size, -1)
+        if not self.price_tree[old_price]:
+            self._remove_price_level(old_price)
+        if self.delta_sink is not None:
+            self._publish_level(old_price)
+        order.price = new_price
+        if new_size is not None:
+            order.size = new_size
+        order.volume = order.size * new_price
+        level = self.limit_levels.get(new_price)
+        if level is None:
+            level = OrderLinkedlist(self.queue_positions) if self.pool is None else self.pool.level(self.queue_positions)
+            self.limit_levels[new_price] = level
+            self.price_tree[new_price] = 1
+            if self._auto:
+                self._fit_price_tree()
+            if self.max_price is None or new_price > self.max_price:
+                self.max_price = new_price
+            if self.min_price is None or new_price < self.min_price:
+                self.min_price = new_price
+        else:
+            self.price_tree[new_price] += 1
+        level.set_head(order)
+        level.size += order.size
+        level.volume += order.volume
+        level.reserve += order.reserve
+        if self.level_stats is not None:
+            self.level_stats.update(new_price, order.size, 1)
+        if self.delta_sink is not None:
+            self.delta_sink(self.side, new_price, level.size, self.price_tree[new_price])
 
     def remove_order(self, order_id: int):
         '''
@@ -106,73 +307,535 @@ class LOBTree:
         :return: Order Instance | order removed from the book
         '''
         popped = self.order_ids.pop(order_id)
+        if popped.owner is not None:
+            self._drop_owned(popped)
         self.limit_levels[popped.price].remove(popped, decrement=True)
         self.price_tree[popped.price] -= 1
-        if self.limit_levels[popped.price].size == 0:
+        if self.level_stats is not None:
+            self.level_stats.update(popped.price, -popped.size, -1)
+        if not self.price_tree[popped.price]:
             self._remove_price_level(popped.price)
+        if self.delta_sink is not None:
+            self._publish_level(popped.price)
+        return popped
+
+    def queue_position(self, order_id: int):
+        '''
+        order_id: int
+            What is order X's current position in the book
+        :return: int, int | number of orders and total size ahead of the order on its price level
+        '''
+        order = self.order_ids[order_id]
+        return self.limit_levels[order.price].position(order)
+
+    def cancel_order(self, order_id: int):
+        '''
+        order_id: int
+            Remove the order from the book for good; unlike remove_order the order is recycled
+            when a pool is attached, so nothing is returned in that case.
+            With lazy_cancel the order is only tombstoned, see _tombstone, and None is returned
+        :return: Order Instance | None
+        '''
+        if self.lazy_cancel:
+            self._tombstone(order_id)
+            return None
+        popped = self.remove_order(order_id)
+        if self.pool is not None:
+            self.pool.release_order(popped)
+            return None
         return popped
 
+    def _tombstone(self, order_id: int):
+        '''
+        order_id: int
+            Lazy cancel: the order leaves order_ids, the owner index and its level's size and order count at
+            once, so the book's aggregates are exact, but stays linked in the level's queue with size 0.
+            The matching loop drops tombstones as they reach the tail, a level whose last live order is
+            cancelled is removed outright, and a level holding more tombstones than live orders (plus
+            COMPACT_SLACK) is compacted on the spot, so the O(n) walks stay amortized O(1) per cancel
+            O(1) unless the level goes away or gets compacted
+        '''
+        order = self.order_ids.pop(order_id)
+        if order.owner is not None:
+            self._drop_owned(order)
+        price = order.price
+        count = self.price_tree[price] - 1
+        if self.level_stats is not None:
+            self.level_stats.update(price, -order.size, -1)
+        level = self.limit_levels[price]
+        if not count:
+            # the tombstones linked in the level go with it
+            level.remove(order, decrement=True)
+            self._remove_price_level(price)
+            if self.pool is not None:
+                self.pool.release_order(order)
+        else:
+            self.price_tree[price] = count
+            # same bookkeeping as OrderLinkedlist.remove, minus the unlink
+            level.size -= order.size
+            level.volume -= order.volume
+            level.reserve -= order.reserve
+            if level.queue is not None and order.seq:
+                level.queue.discard(order)
+            order.size = order.volume = order.reserve = 0
+            order.owner = None
+            level.tombstones += 1
+            if level.tombstones > count + COMPACT_SLACK:
+                level.compact(self.pool)
+        if self.delta_sink is not None:
+            self._publish_level(price)
+
+    def compact(self):
+        '''
+        Unlink every tombstone left by lazy cancels on this side, e.g. from an idle loop;
+        the matching loop and cancel_order already reclaim them as they go, this only frees memory sooner
+        O(orders on levels with tombstones)
+        :return: int | number of tombstones reclaimed
+        '''
+        reclaimed = 0
+        for level in self.limit_levels.values():
+            if level.tombstones:
+                reclaimed += level.tombstones
+                level.compact(self.pool)
+        return reclaimed
+
+    def replace_orders(self, order_ids, orders=()):
+        '''
+        order_ids: iterable | ids of resting orders to cancel
+        orders: iterable | Order Instances to rest; the caller checks that their ids are free and that
+            they don't cross the opposite side
+            Cancel and add in one pass: orders are unlinked and linked first, then the price tree, the level
+            stats and the best prices get one update per touched price, so a level that loses a quote and
+            gains another one is never deleted and recreated. Cancelled orders are recycled when a pool is attached
+            O(orders + touched levels * log M)
+        :return: None
+        '''
+        levels = self.limit_levels
+        pool = self.pool
+        orders = list(orders)
+        for order in orders:
+            self.check_price(order.price)
+        # price -> [order count delta, size delta]
+        touched = {}
+        for order_id in order_ids:
+            order = self.order_ids.pop(order_id)
+            if order.owner is not None:
+                self._drop_owned(order)
+            levels[order.price].remove(order, decrement=True)
+            delta = touched.get(order.price)
+            if delta is None:
+                delta = touched[order.price] = [0, 0]
+            delta[0] -= 1
+            delta[1] -= order.size
+            if pool is not None:
+                pool.release_order(order)
+        for order in orders:
+            order.volume = order.size * order.price
+            level = levels.get(order.price)
+            if level is None:
+                level = OrderLinkedlist(self.queue_positions) if pool is None else pool.level(self.queue_positions)
+                levels[order.price] = level
+            level.set_head(order)
+            level.size += order.size
+            level.volume += order.volume
+            self.order_ids[order.id] = order
+            if order.owner is not None:
+                self._add_owned(order)
+            delta = touched.get(order.price)
+            if delta is None:
+                delta = touched[order.price] = [0, 0]
+            delta[0] += 1
+            delta[1] += order.size
+        for price, (count, size) in touched.items():
+            if self.level_stats is not None:
+                self.level_stats.update(price, size, count)
+            if levels[price]._head is None or (price in self.price_tree and not self.price_tree[price] + count):
+                self._remove_price_level(price)
+            elif price in self.price_tree:
+                self.price_tree[price] += count
+            else:
+                self.price_tree[price] = count
+                if self.max_price is None or price > self.max_price:
+                    self.max_price = price
+                if self.min_price is None or price < self.min_price:
+                    self.min_price = price
+            if self.delta_sink is not None:
+                self._publish_level(price)
+        if self._auto:
+            self._fit_price_tree()
+
+    def _publish_level(self, price):
+        '''
+        Send the current size and number of orders of the price level to delta_sink, zeros if it is gone
+        '''
+        level = self.limit_levels.get(price)
+        if level is None:
+            self.delta_sink(self.side, price, 0, 0)
+        else:
+            self.delta_sink(self.side, price, level.size, self.price_tree[price])
+
     def _remove_price_level(self, price: int):
         '''
         order: Order Instance
             Given a price level, remove the price level in the price_tree and limit_levels
             reset the max and min prices
         '''
-        del self.limit_levels[price]
+        level = self.limit_levels.pop(price)
+        if self.pool is not None:
+            self.pool.release_level(level)
         self.price_tree.remove(price)
+        if self._auto:
+            self._fit_price_tree()
         if self.max_price == price:
             try:
                 self.max_price = self.price_tree.max_key()
-            except KeyError or ValueError:
+            except (KeyError, ValueError):
                 self.max_price = None
         if self.min_price == price:
             try:
                 self.min_price = self.price_tree.min_key()
-            except KeyError or ValueError:
+            except (KeyError, ValueError):
                 self.min_price = None
 
-    def market_order(self, order: Order):
+    def _fit_price_tree(self):
+        '''
+        'auto' backend: swap the price tree for a FastRBTree once the side has more than SPARSE_MAX_LEVELS
+        levels, and back to a SortedLevels once it is under SPARSE_MIN_LEVELS
+        O(1) unless it switches, O(M log M) when it does
+        '''
+        levels = len(self.price_tree)
+        if type(self.price_tree) is SortedLevels:
+            if levels > SPARSE_MAX_LEVELS:
+                self.price_tree = FastRBTree(self.price_tree.items())
+        elif levels < SPARSE_MIN_LEVELS:
+            self.price_tree = SortedLevels(self.price_tree.items())
+
+    def market_order(self, order: Order, limit_price=None):
         '''
         order: Order Instance
+        limit_price: int | None
+            if given, stop sweeping as soon as the best level is worse than limit_price;
+            used to match the marketable part of a limit order
+            Sweep the book from the best level until the order is filled, the book is empty
+            or the limit price is reached; order.size is left with the unfilled size
+        :return: int | unfilled size
         '''
         if len(self.limit_levels) == 0:
             raise ValueError('No orders in the book')
             return
+        self.last_price = None
 
-        if order.is_bid:
+        if order.is_bid():
             best_price = self.min_price
             while order.size > 0 and best_price != None:
+                if limit_price is not None and best_price > limit_price:
+                    return order.size
                 price_level = self._get_price(best_price)
-                order.size, number_of_orders_deleted = price_level._consume_orders(
-                    order, self.order_ids)
+                level_size = price_level.size
+                order.size, number_of_orders_deleted, traded = price_level._consume_orders(
+                    order, self.order_ids, self.fill_sink, self.pool, self.owners, self.self_trade_prevention)
+                if traded:
+                    self.last_price = best_price
                 self.price_tree[best_price] -= number_of_orders_deleted
-                if price_level._head == None:
+                if self.level_stats is not None:
+                    self.level_stats.update(best_price, price_level.size - level_size, -number_of_orders_deleted)
+                if not self.price_tree[best_price]:
                     self._remove_price_level(best_price)
+                if self.delta_sink is not None:
+                    self._publish_level(best_price)
                 best_price = self.min_price
-            if order.size != 0:
+            if order.size != 0 and limit_price is None:
                 LOG.warning('no more limit orders in the bid book')
         else:
             best_price = self.max_price
             while order.size > 0 and best_price != None:
+                if limit_price is not None and best_price < limit_price:
+                    return order.size
                 price_level = self._get_price(best_price)
-                order.size, number_of_orders_deleted = price_level._consume_orders(
-                    order, self.order_ids)
+                level_size = price_level.size
+                order.size, number_of_orders_deleted, traded = price_level._consume_orders(
+                    order, self.order_ids, self.fill_sink, self.pool, self.owners, self.self_trade_prevention)
+                if traded:
+                    self.last_price = best_price
                 self.price_tree[best_price] -= number_of_orders_deleted
-                if price_level._head == None:
+                if self.level_stats is not None:
+                    self.level_stats.update(best_price, price_level.size - level_size, -number_of_orders_deleted)
+                if not self.price_tree[best_price]:
                     self._remove_price_level(best_price)
+                if self.delta_sink is not None:
+                    self._publish_level(best_price)
                 best_price = self.max_price
-            if order.size != 0:
+            if order.size != 0 and limit_price is None:
                 LOG.warning('no more orders in the ask book')
+        return order.size
 
-    def level_with_most_orders(self, range: int):
+    def fillable(self, order: Order, limit_price=None):
+        '''
+        order: Order Instance
+        limit_price: int | None
+            same as market_order
+            Whether market_order would fill the order in full, hidden iceberg reserve included;
+            walks the levels from the touch only until enough size is found.
+            With self-trade prevention on and the order's owner resting on this side, its own orders
+            don't count: cancel_oldest skips them, the other modes end the sweep at the first one
+            O(levels walked), plus the orders walked on those levels when the owner rests here
+        :return: bool
+        '''
+        needed = order.size
+        levels = self.limit_levels
+        stp = self.self_trade_prevention
+        owner = order.owner if stp and order.owner in self.owners else None
+        if order.is_bid():
+            prices = self.price_tree.keys()
+        else:
+            prices = self.price_tree.keys(reverse=True)
+        for price in prices:
+            if limit_price is not None and (price > limit_price if order.is_bid() else price < limit_price):
+                return False
+            level = levels[price]
+            if owner is None:
+                needed -= level.size + level.reserve
+            else:
+                # the sweep meets the level's orders from the tail, an iceberg only shows its next peak
+                # after going to the head, behind any own order that would stop the sweep
+                reserve = level.reserve
+                maker = level._tail
+                while maker is not None:
+                    if maker.owner == owner:
+                        if stp is not SelfTradePrevention.CANCEL_OLDEST:
+                            return False
+                        reserve -= maker.reserve
+                    else:
+                        needed -= maker.size
+                        if needed <= 0:
+                            return True
+                    maker = maker.prev
+                needed -= reserve
+            if needed <= 0:
+                return True
+        return needed <= 0
+
+    def top_levels(self, n: int = None, reverse: bool = False):
+        '''
+        n: int | None
+            number of levels, all of them if None
+        reverse: bool
+            start from the highest price (bid side) if True, from the lowest price (ask side) otherwise
+            Only the n requested levels are visited, starting from the touch: O(log M + n) on the
+            Red-Black tree, O(n) bit scans on the ladder
+        :return: np.ndarray, np.ndarray, np.ndarray | prices, sizes and number of orders per level, best first
+        '''
+        if n is None:
+            items = list(self.price_tree.items(reverse=reverse))
+        elif reverse:
+            items = self.price_tree.nlargest(n)
+        else:
+            items = self.price_tree.nsmallest(n)
+        levels = self.limit_levels
+        prices = np.array([price for price, _ in items], dtype=self.dtype)
+        sizes = np.array([levels[price].size for price, _ in items], dtype=self.dtype)
+        counts = np.array([count for _, count in items], dtype=np.int64)
+        return prices, sizes, counts
+
+    def range_volume(self, low_price, high_price):
+        '''
+        low_price, high_price: int | float
+            inclusive price range
+            O(log M) with level_stats, O(M) scan of the levels otherwise
+        :return: (size, notional, number of orders) resting between the two prices
+        '''
+        if self.level_stats is not None:
+            return self.level_stats.range_sum(low_price, high_price)
+        size = notional = count = 0
+        for price, level in self.limit_levels.items():
+            if low_price <= price <= high_price:
+                size += level.size
+                notional += level.size * price
+                count += self.price_tree[price]
+        return size, notional, count
+
+    def level_with_most_orders(self, range: int, reverse: bool = False):
         '''
         range: int
             Gives the price level with the most orders on the top levels
+            number of levels counted from the touch
+        reverse: bool
+            the touch is the highest price (bid side) if True, the lowest price (ask side) otherwise
+            ties go to the level closest to the touch
+            O(log M) with level_stats, O(log M + range) otherwise
+        :return: (price, number of orders) | (None, 0) if the book is empty
+        '''
+        if range < 1 or len(self.limit_levels) == 0:
+            return None, 0
+        if self.level_stats is not None:
+            last = self.level_stats.kth_level(min(range, len(self.limit_levels)), from_high=reverse)
+            if reverse:
+                return self.level_stats.range_argmax(last, self.max_price, prefer_high=True)
+            return self.level_stats.range_argmax(self.min_price, last)
+        items = self.price_tree.nlargest(range) if reverse else self.price_tree.nsmallest(range)
+        best_price, best_count = None, 0
+        for price, count in items:
+            if count > best_count:
+                best_price, best_count = price, count
+        return best_price, best_count
+
+    def to_columns(self):
+        '''
+        Every resting order, levels in ascending price and orders in FIFO order (oldest first) within a level
+        :return: dict | 'id', 'price', 'size', 'timestamp', 'peak', 'reserve', 'expire_at', 'owner' NumPy arrays;
+            expire_at is NaN for orders without expiry, owner is -1 for orders without owner
+        '''
+        ids, prices, sizes, timestamps, peaks, reserves, expire_ats, owners = [], [], [], [], [], [], [], []
+        nan = float('nan')
+        for price in self.price_tree.keys():
+            order = self.limit_levels[price]._tail
+            while order is not None:
+                if not order.size:
+                    # tombstone
+                    order = order.prev
+                    continue
+                ids.append(order.id)
+                prices.append(price)
+                sizes.append(order.size)
+                timestamps.append(order.timestamp)
+                peaks.append(order.peak)
+                reserves.append(order.reserve)
+                expire_ats.append(nan if order.expire_at is None else order.expire_at)
+                owners.append(-1 if order.owner is None else order.owner)
+                order = order.prev
+        return {
+            'id': np.array(ids, dtype=np.int64),
+            'price': np.array(prices, dtype=self.dtype),
+            'size': np.array(sizes, dtype=self.dtype),
+            'timestamp': np.array(timestamps, dtype=np.float64),
+            'peak': np.array(peaks, dtype=self.dtype),
+            'reserve': np.array(reserves, dtype=self.dtype),
+            'expire_at': np.array(expire_ats, dtype=np.float64),
+            'owner': np.array(owners, dtype=np.int64),
+        }
+
+    def load_columns(self, side, ids, prices, sizes, timestamps, peaks=None, reserves=None, expire_ats=None,
+                     owners=None):
         '''
-        pass
+        side: Side
+        ids, prices, sizes, timestamps: array-like columns laid out as returned by to_columns
+        peaks, reserves: array-like | None
+            iceberg columns of to_columns, every order is a plain order when omitted
+        expire_ats: array-like | None
+            expiry column of to_columns, orders with a value other than NaN are good-till-time
+        owners: array-like | None
+            owner column of to_columns, -1 for orders without owner
+            Replace the content of the tree. Levels are linked directly and the price tree, level stats and
+            queue indexes get one update per level, instead of going through insert_order once per order;
+            delta_sink sees every old level go away, then every new level
+        :return: None
+        '''
+        if self.delta_sink is not None:
+            for price in list(self.price_tree.keys()):
+                self.delta_sink(self.side, price, 0, 0)
+        self.price_tree = make_price_tree(self.backend, self.tick_size, self.window)
+        if self.level_stats is not None:
+            self.level_stats = LevelStats(self.tick_size, self.window)
+        self.limit_levels = {}
+        self.order_ids = {}
+        self.owners = {}
+        self.max_price = None
+        self.min_price = None
+        ids = np.asarray(ids).tolist()
+        prices = np.asarray(prices).tolist()
+        sizes = np.asarray(sizes).tolist()
+        timestamps = np.asarray(timestamps).tolist()
+        icebergs = None
+        if peaks is not None and np.any(peaks):
+            icebergs = np.asarray(peaks).tolist(), np.asarray(reserves).tolist()
+        expiring = None
+        if expire_ats is not None:
+            expire_ats = np.asarray(expire_ats, dtype=np.float64)
+            indices = np.flatnonzero(~np.isnan(expire_ats))
+            if len(indices):
+                expiring = list(zip(indices.tolist(), expire_ats[indices].tolist()))
+        owned = None
+        if owners is not None:
+            owners = np.asarray(owners, dtype=np.int64)
+            indices = np.flatnonzero(owners >= 0)
+            if len(indices):
+                owned = list(zip(indices.tolist(), owners[indices].tolist()))
+        # the cyclic GC would otherwise rescan the growing set of orders many times over
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            self._link_columns(side, ids, prices, sizes, timestamps, icebergs, expiring, owned)
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def _link_columns(self, side, ids, prices, sizes, timestamps, icebergs=None, expiring=None, owned=None):
+        resting = Order.resting
+        orders = []
+        append = orders.append
+        # every order is linked to the previous, older order as it is built: the oldest order is the tail of its
+        # level and prev points to the next newer order. The chain is cut at the level boundaries below, which
+        # also sets the prev of the newest order of every level
+        older = Order.__new__(Order)
+        for order_id, price, size, timestamp in zip(ids, prices, sizes, timestamps):
+            order = resting(order_id, timestamp, side, size, price, older)
+            older.prev = order
+            append(order)
+            older = order
+        reserves = None
+        if icebergs is not None:
+            peaks, reserves = icebergs
+            for order, peak, reserve in zip(orders, peaks, reserves):
+                order.peak = peak
+                order.reserve = reserve
+        if expiring is not None:
+            for index, expire_at in expiring:
+                orders[index].time_in_force = TimeInForce.GTT
+                orders[index].expire_at = expire_at
+        if owned is not None:
+            for index, owner in owned:
+                orders[index].owner = owner
+                self._add_owned(orders[index])
+        self.order_ids = dict(zip(ids, orders))
+        count = len(orders)
+        if not count:
+            return
+        starts = [0] + (np.flatnonzero(np.diff(np.asarray(prices))) + 1).tolist()
+        ends = starts[1:] + [count]
+        for start, end in zip(starts, ends):
+            orders[start].next = None
+            orders[end - 1].prev = None
+            price = prices[start]
+            level = OrderLinkedlist(self.queue_positions)
+            level._tail = orders[start]
+            level._head = orders[end - 1]
+            level_size = sum(sizes[start:end])
+            level.size = level_size
+            level.volume = level_size * price
+            if reserves is not None:
+                level.reserve = sum(reserves[start:end])
+            if level.queue is not None:
+                level._reindex()
+            self.limit_levels[price] = level
+            self.price_tree[price] = end - start
+            if self.level_stats is not None:
+                self.level_stats.update(price, level_size, end - start)
+        self.min_price = self.price_tree.min_key()
+        self.max_price = self.price_tree.max_key()
+        if self._auto:
+            self._fit_price_tree()
+        if self.delta_sink is not None:
+            for price, count in self.price_tree.items():
+                self.delta_sink(self.side, price, self.limit_levels[price].size, count)
 
-    def iceberg(self):
+    def iceberg(self, price=None):
         '''
-        Iceberg order type
+        price: int | float | None
+            Hidden iceberg reserve resting at the price level, or on the whole side if price is None;
+            iceberg orders are plain orders with a peak, see Order, replenished inside the matching loop
+        :return: int | float
         '''
-        pass
+        if price is None:
+            return sum(level.reserve for level in self.limit_levels.values())
+        level = self.limit_levels.get(price)
+        return 0 if level is None else level.reserve
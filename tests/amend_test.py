@@ -0,0 +1,96 @@
+import pytest
+from ..lob import LimitOrderBook
+from ..batch import MODIFY
+from ..ob_tree.order import Order, Side
+
+
+def fifo(level):
+    ids, order = [], level._tail
+    while order is not None:
+        ids.append(order.id)
+        order = order.prev
+    return ids
+
+
+def build(**kwargs):
+    lob = LimitOrderBook(**kwargs)
+    for order_id, price in [(1, 100), (2, 100), (3, 100), (4, 99)]:
+        lob.process_order(Order(price=price, id=order_id, order_type='limit', timestamp=0.0, size=5, side='bid',
+                                owner=order_id % 2))
+    return lob
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'backend': 'ladder', 'level_stats': True, 'queue_positions': True}])
+def test_amend_priority(kwargs):
+    lob = build(**kwargs)
+    level = lob.bid.limit_levels[100]
+    order = lob.bid.order_ids[2]
+
+    # a decrease keeps the order's place
+    lob.update_order(2, 'bid', new_size=2, change_price=False)
+    assert fifo(level) == [1, 2, 3]
+    assert (level.size, level.volume) == (12, 1200)
+    assert lob.queue_position(3) == (2, 7)
+    # so does an amend to the same price
+    lob.update_order(2, 'bid', new_size=1, new_price=100)
+    assert fifo(level) == [1, 2, 3] and level.size == 11
+    lob.update_order(2, 'bid', new_price=100, change_size=False)
+    assert fifo(level) == [1, 2, 3] and level.size == 11
+
+    # an increase sends it to the back
+    lob.update_order(2, 'bid', new_size=4, change_price=False)
+    assert fifo(level) == [1, 3, 2] and level.size == 14
+    assert lob.queue_position(2) == (2, 10)
+
+    # a new price moves the same order object to the back of the new level
+    lob.update_order(1, 'bid', new_size=3, new_price=99)
+    assert lob.bid.order_ids[1].price == 99 and fifo(lob.bid.limit_levels[99]) == [4, 1]
+    assert (lob.bid.price_tree[100], lob.bid.price_tree[99]) == (2, 2)
+    assert lob.bid.limit_levels[99].size == 8 and lob.bid.owners[1][1] is lob.bid.order_ids[1]
+    lob.update_order(3, 'bid', new_price=101, change_size=False)
+    lob.update_order(2, 'bid', new_price=101, change_size=False)
+    assert 100 not in lob.bid.limit_levels and 100 not in lob.bid.price_tree
+    assert lob.bid.max_price == 101 and fifo(lob.bid.limit_levels[101]) == [3, 2]
+    assert lob.bid.order_ids[2] is order
+    if lob.bid.level_stats is not None:
+        assert lob.range_volume(99, 101) == (17, 9 * 101 + 8 * 99, 4)
+
+    # amending to nothing cancels
+    lob.update_order(3, 'bid', new_size=0, change_price=False)
+    assert 3 not in lob.bid.order_ids and fifo(lob.bid.limit_levels[101]) == [2]
+
+
+def test_price_amend_to_nothing_cancels():
+    lob = LimitOrderBook()
+    for order_id, price in [(1, 100), (2, 99)]:
+        lob.process_order(Order(price=price, id=order_id, order_type='limit', timestamp=0.0, size=5, side='bid'))
+    lob.update_order(1, 'bid', new_size=0, new_price=101)
+    assert 1 not in lob.bid.order_ids and lob.best_bid == 99
+    assert lob.snapshot().bid_prices.tolist() == [99]
+    lob.process_order(Order(price=None, id=3, order_type='market', timestamp=0.0, size=5, side='ask'))
+    assert lob.best_bid is None
+
+
+def test_crossing_price_amend_matches():
+    lob = build()
+    lob.process_order(Order(price=105, id=10, order_type='limit', timestamp=0.0, size=3, side='ask'))
+    lob.process_order(Order(price=106, id=11, order_type='limit', timestamp=0.0, size=5, side='ask',
+                            post_only='reject'))
+    lob.update_order(2, 'bid', new_price=106, change_size=False)
+    # 3 traded at 105, 2 at 106, nothing is left to rest
+    assert lob.best_bid == 100 and lob.best_ask == 106
+    assert 2 not in lob.bid.order_ids and 10 not in lob.ask.order_ids and lob.ask.order_ids[11].size == 3
+    assert lob.last_trade_price == 106 and 2 not in lob.bid.owners[0]
+    # a post-only amend through the touch is refused and the order stays where it was
+    with pytest.raises(ValueError):
+        lob.update_order(11, 'ask', new_price=100, change_size=False)
+    assert lob.best_ask == 106 and lob.ask.order_ids[11].size == 3
+    lob.update_order(4, 'bid', new_size=8, new_price=107)
+    assert lob.best_ask is None and lob.best_bid == 107 and lob.bid.order_ids[4].size == 5
+
+
+def test_crossing_batch_modify():
+    lob = build()
+    lob.process_order(Order(price=105, id=10, order_type='limit', timestamp=0.0, size=3, side='ask'))
+    lob.process_batch([MODIFY], [Side.BID], [106], [4], [1], [1.0])
+    assert lob.best_ask is None and lob.best_bid == 106 and lob.bid.order_ids[1].size == 1
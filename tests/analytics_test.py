@@ -0,0 +1,72 @@
+import numpy as np
+from ..lob import LimitOrderBook
+from ..analytics import (QUOTE_DTYPE, record_history, order_flow_imbalance, microprice, queue_depletion,
+                         spreads, features)
+from ..ob_tree.fills import FILL_DTYPE
+from ..benchmarks.suite import generate_flow, to_records
+
+
+def make_quotes(rows):
+    return np.array(rows, dtype=QUOTE_DTYPE)
+
+
+def test_quote_features():
+    quotes = make_quotes([
+        (0.0, 100, 5, 101, 5),
+        (1.0, 100, 8, 101, 5),   # bid size added: +3
+        (2.0, 100, 8, 101, 2),   # ask size removed: +3
+        (3.0, 99, 4, 101, 2),    # best bid exhausted: -8
+        (4.0, 99, 4, 100, 1),    # ask improves: -1
+    ])
+    assert order_flow_imbalance(quotes).tolist() == [0, 3, 3, -8, -1]
+    assert microprice(quotes)[0] == 100.5
+    assert microprice(quotes)[3] == (99 * 2 + 101 * 4) / 6
+    bid_depletion, ask_depletion = queue_depletion(quotes)
+    assert bid_depletion.tolist() == [0, 0, 0, 8, 0]
+    assert ask_depletion.tolist() == [0, 0, 3, 0, 0]
+
+
+def test_spreads():
+    quotes = make_quotes([
+        (0.0, 100, 5, 102, 5),
+        (1.0, 100, 5, 102, 2),
+        (2.0, 101, 5, 103, 2),
+    ])
+    fills = np.array([(1, 9, 102, 3, 1.0), (2, 9, 100, 1, 2.0)], dtype=FILL_DTYPE)
+    direction, effective, realized = spreads(quotes, fills, horizon=1.0)
+    assert direction.tolist() == [1, -1]
+    assert effective.tolist() == [2, 2]
+    # the mid moves up to 102 after both: the buyer's edge is gone, the seller's doubles for the maker
+    assert realized.tolist() == [0, 4]
+    frame = features(quotes, fills, window=2.0)
+    assert frame.index.tolist() == [0.0, 2.0]
+    assert frame['trades'].tolist() == [1, 1]
+    assert frame['mid'].tolist() == [101, 102]
+    assert frame['spread'].tolist() == [2, 2]
+
+
+def test_record_history_matches_the_book():
+    prefill, flow = generate_flow('sweep_heavy', 3000, prefill=300, seed=5)
+    records = to_records(prefill + flow)
+    records['timestamp'] = np.arange(len(records), dtype=np.float64)
+    quotes, fills = record_history(records, chunk=500)
+    # the same replay, reading the top of book after every message
+    book = LimitOrderBook()
+    tops = {}
+    for record in records:
+        book.process_records(record[None])
+        bid, bid_size, ask, ask_size = book.top_of_book()
+        tops[record['timestamp']] = (np.nan if bid is None else bid, bid_size, np.nan if ask is None else ask, ask_size)
+    last = {}
+    for row in quotes.tolist():
+        last[row[0]] = row[1:]
+    previous = None
+    for timestamp, top in tops.items():
+        if timestamp in last:
+            previous = last[timestamp]
+        np.testing.assert_array_equal(previous, top)
+    assert len(fills) and np.all(np.diff(fills['timestamp']) >= 0)
+    frame = features(quotes, fills, window=100.0)
+    assert len(frame) == len(records) // 100
+    assert frame['volume'].sum() == fills['size'].sum()
+    assert frame['ofi'].sum() == order_flow_imbalance(quotes).sum()
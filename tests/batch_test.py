@@ -0,0 +1,57 @@
+import time
+import numpy as np
+from ..lob import LimitOrderBook
+from ..batch import ADD, CANCEL, MODIFY, MARKET, BID, ASK, make_records
+from ..ob_tree.order import Order
+
+
+def test_process_records():
+    records = make_records(8)
+    rows = [
+        (ADD, ASK, 1, 101, 5, 1.0),
+        (ADD, ASK, 2, 102, 5, 2.0),
+        (ADD, BID, 3, 99, 5, 3.0),
+        (MODIFY, BID, 3, 99, 2, 4.0),     # size only
+        (MODIFY, ASK, 2, 103, 4, 5.0),    # price and size
+        (MARKET, BID, 4, 0, 6, 6.0),
+        (CANCEL, BID, 3, 0, 0, 7.0),
+        (CANCEL, BID, 42, 0, 0, 8.0),     # unknown id
+    ]
+    for i, row in enumerate(rows):
+        records[i] = row
+    lob = LimitOrderBook()
+    report = lob.process_records(records)
+    assert report.messages == 8
+    assert report.rejected == 1
+    assert report.messages_per_second > 0
+    assert 1 not in lob.ask.order_ids
+    assert lob.ask.order_ids[2].price == 103
+    assert lob.ask.order_ids[2].size == 3
+    assert len(lob.bid.order_ids) == 0
+
+
+def test_batch_matches_per_object_path():
+    rng = np.random.default_rng(7)
+    n = 2000
+    action = np.where(rng.random(n) < 0.9, ADD, MARKET)
+    side = rng.integers(0, 2, n)
+    price = rng.integers(9990, 10010, n).astype(float)
+    size = rng.integers(1, 10, n).astype(float)
+    order_id = np.arange(n)
+    timestamp = np.arange(n, dtype=float)
+
+    batched = LimitOrderBook()
+    batched.process_batch(action, side, price, size, order_id, timestamp)
+
+    single = LimitOrderBook()
+    for i in range(n):
+        order_type = 'limit' if action[i] == ADD else 'market'
+        try:
+            single.process_order(Order(price=float(price[i]), id=int(order_id[i]), order_type=order_type,
+                                       timestamp=time.time(), size=float(size[i]),
+                                       side='bid' if side[i] == BID else 'ask'))
+        except ValueError:
+            pass
+    for book in ['bid', 'ask']:
+        assert list(getattr(batched, book).price_tree.items()) == list(getattr(single, book).price_tree.items())
+        assert set(getattr(batched, book).order_ids) == set(getattr(single, book).order_ids)
@@ -0,0 +1,31 @@
+import copy
+from ..benchmarks.suite import WORKLOADS, compare, generate_flow, run_suite
+
+
+def test_generate_flow_mix():
+    prefill, flow = generate_flow('cancel_heavy', 2000, prefill=500)
+    assert len(prefill) == 500 and all(op[0] == 'add' for op in prefill)
+    kinds = [op[0] for op in flow]
+    assert kinds.count('cancel') > kinds.count('market')
+    # cancels only ever target orders that were added and not cancelled yet
+    live = {op[1] for op in prefill}
+    for op in flow:
+        if op[0] == 'add':
+            live.add(op[1])
+        elif op[0] == 'cancel':
+            live.remove(op[1])
+
+
+def test_suite_and_regression_check():
+    results = run_suite(500)
+    assert set(results['workloads']) == set(WORKLOADS)
+    for operations in results['workloads'].values():
+        for name in ('add', 'cancel', 'market', 'depth', 'process_records'):
+            stats = operations[name]
+            assert stats['ops_per_sec'] > 0
+            assert stats['p50_ns'] <= stats['p99_ns'] <= stats['p999_ns']
+    assert compare(results, results, 0.2) == []
+    slower = copy.deepcopy(results)
+    slower['workloads']['add_heavy']['add']['ops_per_sec'] /= 2
+    slower['workloads']['add_heavy']['add']['p99_ns'] *= 2
+    assert len(compare(slower, results, 0.2)) == 2
@@ -0,0 +1,56 @@
+import random
+import time
+import pytest
+from ..lob import LimitOrderBook
+from ..ob_tree.order import Order
+
+
+def build_book(**kwargs):
+    lob = LimitOrderBook(**kwargs)
+    rng = random.Random(9)
+    for order_id in range(3000):
+        side = rng.choice(['bid', 'ask'])
+        price = rng.randint(9900, 10000) if side == 'bid' else rng.randint(10001, 10100)
+        lob.process_order(Order(price=price, id=order_id, order_type='limit', timestamp=float(order_id),
+                                size=rng.randint(1, 9), side=side))
+    for order_id in range(0, 3000, 3):
+        lob.cancel_order(order_id, 'bid' if order_id in lob.bid.order_ids else 'ask')
+    lob.process_order(Order(price=None, id=-1, order_type='market', timestamp=0.0, size=40, side='bid'))
+    return lob
+
+
+def assert_same_book(expected, actual):
+    for side in ['bid', 'ask']:
+        a, b = getattr(expected, side), getattr(actual, side)
+        assert list(a.price_tree.items()) == list(b.price_tree.items())
+        assert (a.min_price, a.max_price) == (b.min_price, b.max_price)
+        for price, level in a.limit_levels.items():
+            assert level.size == b.limit_levels[price].size
+            mine, theirs = level._tail, b.limit_levels[price]._tail
+            while mine is not None:
+                assert (mine.id, mine.size, mine.timestamp, mine.side) == \
+                    (theirs.id, theirs.size, theirs.timestamp, theirs.side)
+                assert b.order_ids[mine.id] is theirs
+                mine, theirs = mine.prev, theirs.prev
+            assert theirs is None
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'backend': 'ladder', 'level_stats': True, 'queue_positions': True}])
+def test_checkpoint_round_trip(tmp_path, kwargs):
+    path = str(tmp_path / 'book.ckpt')
+    original = build_book()
+    original.save_checkpoint(path)
+    restored = LimitOrderBook(**kwargs)
+    restored.load_checkpoint(path)
+    assert_same_book(original, restored)
+    # the restored book keeps working
+    for order_id in list(restored.ask.order_ids)[:20]:
+        restored.cancel_order(order_id, 'ask')
+        original.cancel_order(order_id, 'ask')
+    for book in (original, restored):
+        book.process_order(Order(price=10050, id=10 ** 6, order_type='limit', timestamp=time.time(), size=60, side='bid'))
+    assert_same_book(original, restored)
+    if kwargs:
+        order_id = next(iter(restored.bid.order_ids))
+        assert restored.queue_position(order_id) == original.queue_position(order_id)
+        assert restored.range_volume(9900, 10100) == original.range_volume(9900, 10100)
@@ -0,0 +1,12 @@
+import pytest
+from ..ob_tree.order import Order
+
+
+@pytest.fixture
+def limit():
+    '''
+    Limit order factory shared by the tests: limit(id, side, price, size), any other Order argument by keyword
+    '''
+    def _limit(id, side, price, size, timestamp=0.0, **kwargs):
+        return Order(price=price, id=id, order_type='limit', timestamp=timestamp, size=size, side=side, **kwargs)
+    return _limit
@@ -0,0 +1,97 @@
+from ..lob import LimitOrderBook
+from ..ob_tree.deltas import DeltaPublisher
+from ..ob_tree.order import Order, Side
+from ..benchmarks.suite import generate_flow, _apply, _tracked
+
+
+def test_top_of_book(limit):
+    lob = LimitOrderBook()
+    assert lob.best_bid is None and lob.best_ask is None
+    assert lob.top_of_book() == (None, 0, None, 0)
+    lob.process_order(limit(1, 'bid', 99, 5))
+    lob.process_order(limit(2, 'bid', 100, 3))
+    lob.process_order(limit(3, 'ask', 102, 4))
+    assert (lob.best_bid, lob.best_ask) == (100, 102)
+    assert lob.top_of_book() == (100, 3, 102, 4)
+    lob.cancel_order(2, 'bid')
+    assert lob.best_bid == 99
+    lob.process_order(Order(price=None, id=4, order_type='market', timestamp=0.0, size=4, side='bid'))
+    assert lob.best_ask is None
+    assert lob.top_of_book() == (99, 5, None, 0)
+
+
+def test_level_deltas(limit):
+    deltas = []
+    lob = LimitOrderBook(delta_sink=lambda *delta: deltas.append(delta))
+    lob.process_order(limit(1, 'ask', 101, 5))
+    lob.process_order(limit(2, 'ask', 101, 2))
+    lob.process_order(limit(3, 'ask', 102, 4))
+    lob.update_order(3, 'ask', new_size=1, change_price=False)
+    lob.update_order(2, 'ask', new_price=103, change_size=False)
+    lob.process_order(Order(price=None, id=4, order_type='market', timestamp=0.0, size=6, side='bid'))
+    lob.cancel_order(2, 'ask')
+    assert deltas == [
+        (Side.ASK, 101, 5, 1),
+        (Side.ASK, 101, 7, 2),
+        (Side.ASK, 102, 4, 1),
+        (Side.ASK, 102, 1, 1),
+        (Side.ASK, 101, 5, 1),
+        (Side.ASK, 103, 2, 1),
+        (Side.ASK, 101, 0, 0),
+        (Side.ASK, 102, 0, 0),
+        (Side.ASK, 103, 0, 0),
+    ]
+
+
+def test_deltas_mirror_the_book():
+    lob = LimitOrderBook()
+    publisher = DeltaPublisher(lob)
+    mirror, conflated = {}, {}
+
+    def apply(side, price, size, count):
+        if count:
+            mirror[(side, price)] = (size, count)
+        else:
+            mirror.pop((side, price), None)
+
+    def apply_conflated(deltas):
+        for side, price, size, count in deltas.tolist():
+            if count:
+                conflated[(side, price)] = (size, count)
+            else:
+                conflated.pop((side, price), None)
+
+    publisher.subscribe(apply)
+    subscription = publisher.subscribe_conflated(apply_conflated, interval=50)
+    prefill, flow = generate_flow('sweep_heavy', 2000, prefill=200, seed=3)
+    for operation in prefill:
+        _apply(lob, operation)
+    for clock, operation in enumerate(flow):
+        if _tracked(lob, operation):
+            _apply(lob, operation)
+        publisher.publish(clock)
+    publisher.publish(len(flow) + 50)
+    expected = {}
+    for side, book in ((Side.BID, lob.bid), (Side.ASK, lob.ask)):
+        for price, count in book.price_tree.items():
+            expected[(side, price)] = (book.limit_levels[price].size, count)
+    assert mirror == expected
+    assert conflated == expected
+    assert subscription.sent < publisher.received / 2
+
+
+def test_conflation_drops_round_trips(limit):
+    lob = LimitOrderBook()
+    publisher = DeltaPublisher(lob)
+    batches = []
+    publisher.subscribe_conflated(batches.append, interval=1.0)
+    lob.process_order(limit(1, 'bid', 100, 5))
+    assert publisher.publish(0.0) == 1
+    lob.process_order(limit(2, 'bid', 100, 5))
+    lob.process_order(limit(3, 'bid', 99, 1))
+    lob.cancel_order(2, 'bid')
+    assert publisher.publish(0.5) == 0
+    assert publisher.publish(1.0) == 1
+    assert batches[-1].tolist() == [(Side.BID, 99.0, 1.0, 1)]
+    assert publisher.publish(2.0) == 0
+    assert len(batches) == 2
@@ -0,0 +1,26 @@
+import pytest
+import numpy as np
+from ..lob import LimitOrderBook
+from ..ob_tree.order import Order
+
+
+@pytest.mark.parametrize('backend', ['rbtree', 'ladder'])
+def test_depth_and_snapshot(backend):
+    lob = LimitOrderBook(backend=backend)
+    orders = [(1, 99, 2, 'bid'), (2, 99, 3, 'bid'), (3, 98, 1, 'bid'), (4, 95, 4, 'bid'),
+              (5, 101, 1, 'ask'), (6, 103, 2, 'ask'), (7, 103, 2, 'ask')]
+    for order_id, price, size, side in orders:
+        lob.process_order(Order(price=price, id=order_id, order_type='limit', timestamp=0, size=size, side=side))
+    depth = lob.depth(2)
+    np.testing.assert_array_equal(depth.bid_prices, [99, 98])
+    np.testing.assert_array_equal(depth.bid_sizes, [5, 1])
+    np.testing.assert_array_equal(depth.bid_counts, [2, 1])
+    np.testing.assert_array_equal(depth.ask_prices, [101, 103])
+    np.testing.assert_array_equal(depth.ask_sizes, [1, 4])
+    np.testing.assert_array_equal(depth.ask_counts, [1, 2])
+    snapshot = lob.snapshot()
+    np.testing.assert_array_equal(snapshot.bid_prices, [99, 98, 95])
+    np.testing.assert_array_equal(snapshot.ask_prices, [101, 103])
+    assert snapshot.bid_counts.dtype == np.int64
+    empty = LimitOrderBook(backend=backend).depth(10)
+    assert len(empty.bid_prices) == 0 and len(empty.ask_sizes) == 0
@@ -0,0 +1,73 @@
+import random
+import pytest
+from ..lob import LimitOrderBook
+from ..feed import FeedHandler, load_snapshot, snapshot_message
+from ..feed_server import StandInFeedServer
+
+
+def l3_script(count: int, seed: int = 2):
+    rng = random.Random(seed)
+    events, live = [], []
+    for order_id in range(count):
+        roll = rng.random()
+        if roll < 0.6 or not live:
+            side = rng.choice(['bid', 'ask'])
+            price = rng.randint(95, 100) if side == 'bid' else rng.randint(101, 106)
+            events.append({'type': 'add', 'id': order_id, 'side': side, 'price': price, 'size': rng.randint(1, 9)})
+            live.append((order_id, side))
+        elif roll < 0.8:
+            victim, side = live.pop(rng.randrange(len(live)))
+            events.append({'type': 'cancel', 'id': victim, 'side': side})
+        elif roll < 0.9:
+            target, side = rng.choice(live)
+            price = rng.randint(95, 100) if side == 'bid' else rng.randint(101, 106)
+            events.append({'type': 'modify', 'id': target, 'side': side, 'price': price, 'size': rng.randint(1, 9)})
+        else:
+            events.append({'type': 'trade', 'id': order_id, 'side': rng.choice(['bid', 'ask']), 'size': rng.randint(1, 12)})
+    return events
+
+
+def assert_same_book(expected, actual):
+    for side in ['bid', 'ask']:
+        a, b = getattr(expected, side), getattr(actual, side)
+        assert list(a.price_tree.items()) == list(b.price_tree.items())
+        assert {i: o.size for i, o in a.order_ids.items()} == {i: o.size for i, o in b.order_ids.items()}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('drop', [(), (300, 301, 1500)])
+async def test_feed_handler_tracks_reference_book(drop):
+    events = l3_script(2000)
+    async with StandInFeedServer(events, drop=drop) as server:
+        handler = FeedHandler(LimitOrderBook(), server.uri, batch_size=128)
+        await handler.run(until_seq=len(events))
+    assert_same_book(server.book, handler.book)
+    stats = handler.stats()
+    # a snapshot requested after the first gap may already cover the later ones
+    assert (stats['gaps'] >= 1) if drop else (stats['gaps'] == 0)
+    assert stats['snapshots'] == 1 + stats['gaps']
+    assert stats['messages'] > 0
+    assert stats['latency_p99_us'] >= stats['latency_p50_us'] >= 0
+
+
+@pytest.mark.asyncio
+async def test_gap_at_the_tail_found_by_heartbeat():
+    events = l3_script(200)
+    async with StandInFeedServer(events, drop=(200,)) as server:
+        handler = FeedHandler(LimitOrderBook(), server.uri)
+        await handler.run(until_seq=len(events))
+    assert handler.stats()['gaps'] == 1
+    assert_same_book(server.book, handler.book)
+
+
+def test_load_snapshot_groups_unsorted_prices():
+    book = LimitOrderBook()
+    load_snapshot(book, {
+        'bid': {'id': [1, 2, 3], 'price': [100, 99, 100], 'size': [1, 2, 3], 'timestamp': [0.0, 1.0, 2.0]},
+        'ask': {'id': [], 'price': [], 'size': [], 'timestamp': []},
+    })
+    assert len(book.bid.order_ids) == 3
+    assert dict(book.bid.price_tree.items()) == {99: 1, 100: 2}
+    assert book.bid.limit_levels[100].size == 4
+    # time priority within the level is the order of the message
+    assert snapshot_message(book, 0)['bid']['id'] == [2, 1, 3]
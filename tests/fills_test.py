@@ -0,0 +1,30 @@
+from ..lob import LimitOrderBook
+from ..ob_tree.fills import FillBuffer
+from ..ob_tree.order import Order
+
+
+def test_fills_from_sweep():
+    fills = FillBuffer(capacity=8)
+    lob = LimitOrderBook(fill_sink=fills.append)
+    lob.process_order(Order(price=101, id=1, order_type='limit', timestamp=1.0, size=5, side='ask'))
+    lob.process_order(Order(price=101, id=2, order_type='limit', timestamp=2.0, size=5, side='ask'))
+    lob.process_order(Order(price=102, id=3, order_type='limit', timestamp=3.0, size=5, side='ask'))
+    lob.process_order(Order(price=None, id=4, order_type='market', timestamp=4.0, size=12, side='bid'))
+    assert len(fills) == 3
+    batch = fills.drain()
+    assert list(batch['maker_id']) == [1, 2, 3]
+    assert list(batch['taker_id']) == [4, 4, 4]
+    assert list(batch['price']) == [101, 101, 102]
+    assert list(batch['size']) == [5, 5, 2]
+    assert list(batch['timestamp']) == [4.0, 4.0, 4.0]
+    assert len(fills) == 0
+    assert len(fills.drain()) == 0
+
+
+def test_fill_buffer_overrun():
+    fills = FillBuffer(capacity=3)
+    assert fills.capacity == 4
+    for i in range(6):
+        fills.append(i, 100, 10.0, 1.0, float(i))
+    assert fills.overruns == 2
+    assert list(fills.drain()['maker_id']) == [2, 3, 4, 5]
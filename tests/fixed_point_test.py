@@ -0,0 +1,137 @@
+import random
+import numpy as np
+import pytest
+from ..lob import LimitOrderBook
+from ..batch import ADD, CANCEL, MARKET, MODIFY
+from ..journal import JournalWriter, replay_journal
+from ..ob_tree.deltas import DeltaPublisher
+from ..ob_tree.fills import FillBuffer
+from ..ob_tree.fixed_point import FixedPoint
+from ..ob_tree.order import Order, Side
+
+
+def test_conversions():
+    fixed_point = FixedPoint(tick_size=0.01, lot_size=0.001)
+    assert fixed_point.price(100.01) == 10001 and fixed_point.to_price(10001) == 100.01
+    assert fixed_point.size(1.234) == 1234 and fixed_point.to_size(1234) == 1.234
+    assert fixed_point.price(None) is None
+    assert fixed_point.price_range(100.005, 100.02) == (10001, 10002)
+    assert fixed_point.prices([100.01, np.nan]).tolist() == [10001, 0]
+    assert fixed_point.to_prices(np.array([10001, 9999])).tolist() == [100.01, 99.99]
+    with pytest.raises(ValueError):
+        fixed_point.price(100.005)
+    with pytest.raises(ValueError):
+        fixed_point.sizes([1.0, 0.0005])
+    coarse = FixedPoint(tick_size=5, lot_size=100)
+    assert coarse.price(105) == 21 and coarse.to_price(21) == 105
+    assert coarse.price_range(101, 109) == (21, 21)
+
+
+def test_partial_fills_are_exact(limit):
+    fills = FillBuffer()
+    lob = LimitOrderBook(tick_size=0.01, lot_size=0.0001, fill_sink=fills.append)
+    fills.fixed_point = lob.fixed_point
+    rng = random.Random(4)
+    sizes = [round(rng.uniform(0.5, 2.5), 4) for _ in range(200)]
+    for order_id, size in enumerate(sizes):
+        lob.process_order(limit(order_id, 'ask', 100.1, size))
+    level = lob.ask.limit_levels[10010]
+    assert isinstance(level.size, int) and isinstance(level.volume, int)
+    taken = 0
+    for order_id in range(1000, 1300):
+        size = round(rng.uniform(0.01, 0.5), 4)
+        lob.process_order(Order(None, order_id, 'market', 0.0, size, 'bid'))
+        taken += round(size * 10000)
+    assert level.size == sum(round(size * 10000) for size in sizes) - taken
+    assert level.volume == level.size * 10010
+    drained = fills.drain()
+    assert set(drained['price'].tolist()) == {100.1}
+    assert round(drained['size'].sum(), 4) == taken / 10000
+    assert lob.top_of_book() == (None, 0, 100.1, level.size / 10000)
+
+
+def test_api_edge(limit):
+    lob = LimitOrderBook(tick_size=0.5, lot_size=0.1, level_stats=True)
+    lob.process_order(limit(1, 'bid', 99.5, 1.5))
+    lob.process_order(limit(2, 'bid', 99.5, 0.3))
+    lob.process_order(limit(3, 'ask', 100.5, 2.0, peak=0.5))
+    assert lob.bid.max_price == 199 and lob.ask.min_price == 201
+    assert lob.best_bid == 99.5 and lob.best_ask == 100.5
+    depth = lob.depth(5)
+    assert depth.bid_prices.tolist() == [99.5] and depth.bid_sizes.tolist() == [1.8]
+    assert depth.ask_sizes.tolist() == [0.5] and lob.ask.iceberg() == 15
+    assert lob.range_volume(99.2, 101) == (2.3, 99.5 * 1.8 + 100.5 * 0.5, 3)
+    assert lob.queue_position(2) == (1, 1.5)
+    lob.update_order(2, 'bid', new_size=0.2, new_price=100.0)
+    assert lob.best_bid == 100.0 and lob.top_of_book()[1] == 0.2
+    lob.process_order(limit(4, 'ask', 100.5, 1.0, post_only='reprice'))
+    lob.process_order(limit(5, 'bid', 100.5, 1.0, post_only='reprice'))
+    assert lob.bid.order_ids[5].price == 200
+    with pytest.raises(ValueError):
+        lob.process_order(limit(6, 'bid', 99.3, 1.0))
+    with pytest.raises(ValueError):
+        lob.process_order(limit(7, 'bid', 99.0, 0.05))
+    with pytest.raises(ValueError):
+        lob.mass_quote(8, bids=[(9, 98.0, 1.0), (10, 98.25, 1.0)])
+    assert 9 not in lob.bid.order_ids
+    assert lob.mass_quote(8, bids=[(9, 98.0, 1.0)], asks=[(10, 102.0, 0.4)]) == (0, 2)
+    assert lob.ask.limit_levels[204].size == 4
+    assert lob.cancel_side_range(8, 'ask', 101.9, 102.1) == 1
+
+
+def test_stop_orders_in_ticks(limit):
+    lob = LimitOrderBook(tick_size=0.01, lot_size=1)
+    lob.process_order(limit(1, 'ask', 100.01, 5))
+    lob.process_order(limit(2, 'ask', 100.02, 5))
+    lob.process_order(Order(None, 3, 'market', 0.0, 2, 'bid', stop_price=100.01))
+    lob.process_order(limit(4, 'bid', 100.01, 1))
+    # the stop released at 100.01 takes 2 more lots from the same level
+    assert lob.ask.limit_levels[10001].size == 2 and lob.last_trade_price == 10001
+
+
+def test_batch_journal_and_checkpoint(tmp_path):
+    journal_path = str(tmp_path / 'book.journal')
+    rng = np.random.default_rng(2)
+    count = 3000
+    action = rng.choice([ADD, ADD, CANCEL, MODIFY, MARKET], count)
+    side = rng.integers(0, 2, count)
+    offset = rng.integers(0, 20, count) * 0.05
+    price = np.where(side == 0, 99.95 - offset, 100.0 + offset)
+    size = rng.integers(1, 40, count) * 0.25
+    order_id = np.where(action == ADD, np.arange(count), rng.integers(0, count, count))
+    timestamp = np.arange(count, dtype=np.float64)
+    with JournalWriter(journal_path) as journal:
+        lob = LimitOrderBook(tick_size=0.05, lot_size=0.25, journal=journal)
+        lob.process_batch(action, side, price, size, order_id, timestamp)
+    floats = LimitOrderBook()
+    floats.process_batch(action, side, price, size, order_id, timestamp)
+    expected = lob.snapshot()
+    for column, values in zip(expected._fields, floats.snapshot()):
+        assert np.allclose(getattr(expected, column), values)
+
+    replayed = LimitOrderBook(tick_size=0.05, lot_size=0.25)
+    replay_journal(replayed, journal_path)
+    assert list(replayed.bid.price_tree.items()) == list(lob.bid.price_tree.items())
+    assert list(replayed.ask.price_tree.items()) == list(lob.ask.price_tree.items())
+
+    checkpoint = str(tmp_path / 'book.npz')
+    lob.save_checkpoint(checkpoint)
+    for book in (LimitOrderBook(tick_size=0.05, lot_size=0.25), LimitOrderBook()):
+        book.load_checkpoint(checkpoint)
+        for column, values in zip(expected._fields, book.snapshot()):
+            assert np.allclose(getattr(expected, column), values)
+    assert lob.bid.to_columns()['price'].dtype == np.int64
+    with pytest.raises(ValueError):
+        lob.process_batch([ADD], [0], [99.97], [1.0], [count + 1], [0.0])
+
+
+def test_deltas_in_api_units(limit):
+    lob = LimitOrderBook(tick_size=0.01, lot_size=0.5)
+    publisher = DeltaPublisher(lob)
+    received, batches = [], []
+    publisher.subscribe(lambda *delta: received.append(delta))
+    publisher.subscribe_conflated(batches.append, 0)
+    lob.process_order(limit(1, 'bid', 99.99, 1.5))
+    assert received == [(Side.BID, 99.99, 1.5, 1)]
+    publisher.publish(now=1.0)
+    assert batches[0][['price', 'size']].tolist() == [(99.99, 1.5)]
@@ -0,0 +1,85 @@
+import pytest
+from ..lob import LimitOrderBook
+from ..ob_tree.fills import FillBuffer
+from ..ob_tree.order import Order
+
+
+def market(order_id, size, side):
+    return Order(price=None, id=order_id, order_type='market', timestamp=float(order_id), size=size, side=side)
+
+
+def fifo(level):
+    ids, order = [], level._tail
+    while order is not None:
+        ids.append(order.id)
+        order = order.prev
+    return ids
+
+
+def assert_level_aggregates(tree):
+    for price, level in tree.limit_levels.items():
+        order, size, volume, reserve = level._tail, 0, 0, 0
+        while order is not None:
+            assert order.volume == order.size * order.price
+            size, volume, reserve = size + order.size, volume + order.volume, reserve + order.reserve
+            order = order.prev
+        assert (level.size, level.volume, level.reserve) == (size, volume, reserve)
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'backend': 'ladder', 'level_stats': True, 'queue_positions': True}])
+def test_iceberg_replenishes_within_sweep(kwargs, limit):
+    fills = FillBuffer()
+    lob = LimitOrderBook(fill_sink=fills.append, **kwargs)
+    lob.process_order(limit(1, 'ask', 101, 25, peak=10))
+    lob.process_order(limit(2, 'ask', 101, 5))
+    level = lob.ask.limit_levels[101]
+    assert (level.size, level.reserve, lob.ask.iceberg(101)) == (15, 15, 15)
+
+    lob.process_order(market(3, 12, 'bid'))
+    # the peak was filled, replenished and sent behind order 2
+    assert [(f['maker_id'], f['size']) for f in fills.drain()] == [(1, 10), (2, 2)]
+    assert fifo(level) == [2, 1]
+    assert (lob.ask.order_ids[1].size, lob.ask.order_ids[1].reserve) == (10, 5)
+    assert (level.size, level.reserve) == (13, 5)
+    assert lob.ask.price_tree[101] == 2
+    assert lob.queue_position(1) == (1, 3)
+    assert_level_aggregates(lob.ask)
+    if lob.ask.level_stats is not None:
+        assert lob.ask.range_volume(101, 101) == (13, 13 * 101, 2)
+
+    lob.process_order(limit(4, 'ask', 102, 4))
+    lob.process_order(market(5, 20, 'bid'))
+    assert [(f['maker_id'], f['price'], f['size']) for f in fills.drain()] == \
+        [(2, 101, 3), (1, 101, 10), (1, 101, 5), (4, 102, 2)]
+    assert 101 not in lob.ask.limit_levels and 1 not in lob.ask.order_ids
+    assert lob.ask.iceberg() == 0
+    assert_level_aggregates(lob.ask)
+
+
+def test_crossing_iceberg_rests_its_peak(limit):
+    lob = LimitOrderBook()
+    lob.process_order(limit(1, 'ask', 101, 8))
+    order = limit(2, 'bid', 102, 20, peak=5)
+    lob.process_order(order)
+    # the whole order is marketable, only the remainder is split into peak and reserve
+    assert 101 not in lob.ask.limit_levels
+    assert (order.size, order.reserve, lob.bid.limit_levels[102].size) == (5, 7, 5)
+    assert lob.bid.iceberg() == 7
+    lob.cancel_order(2, 'bid')
+    assert lob.bid.iceberg() == 0 and len(lob.bid.limit_levels) == 0
+
+
+def test_iceberg_checkpoint(tmp_path, limit):
+    lob = LimitOrderBook()
+    lob.process_order(limit(1, 'bid', 99, 30, peak=10))
+    lob.process_order(limit(2, 'bid', 99, 3))
+    lob.process_order(market(3, 10, 'ask'))
+    path = str(tmp_path / 'book.ckpt')
+    lob.save_checkpoint(path)
+    restored = LimitOrderBook()
+    restored.load_checkpoint(path)
+    level = restored.bid.limit_levels[99]
+    assert fifo(level) == [2, 1]
+    assert (level.size, level.reserve) == (13, 10)
+    assert (restored.bid.order_ids[1].peak, restored.bid.order_ids[1].reserve) == (10, 10)
+    assert_level_aggregates(restored.bid)
@@ -0,0 +1,51 @@
+from ..lob import LimitOrderBook
+from ..instrumentation import LatencyHistogram
+from ..ob_tree.fills import FillBuffer
+from ..ob_tree.order import Order
+
+
+def test_histogram_precision():
+    histogram = LatencyHistogram(sub_bucket_bits=6)
+    for value in range(64):
+        histogram.record(value)
+        assert histogram.upper_bound(histogram.counts.index(1)) == value
+        histogram.reset()
+    for value in (100, 1000, 12345, 10 ** 6, 10 ** 9):
+        histogram.record(value)
+        bound = histogram.upper_bound(histogram.counts.index(1))
+        assert value <= bound <= value * (1 + 2 ** -5)
+        histogram.reset()
+    for value in range(1, 1001):
+        histogram.record(value)
+    assert histogram.count == 1000 and histogram.min == 1 and histogram.max == 1000
+    assert 500 <= histogram.percentile(50) <= 500 * (1 + 2 ** -5)
+    assert 990 <= histogram.percentile(99) <= 1000
+    assert histogram.percentile(100) == 1000
+
+
+def test_instrumentation_switch():
+    fills = FillBuffer()
+    lob = LimitOrderBook(fill_sink=fills.append)
+    assert 'process_order' not in vars(lob)
+    stats = lob.enable_instrumentation()
+    for i, price in enumerate((101, 101, 102, 103)):
+        lob.process_order(Order(price=price, id=i, order_type='limit', timestamp=1.0, size=5, side='ask'))
+    lob.update_order(0, 'ask', new_size=3, change_price=False)
+    lob.cancel_order(3, 'ask')
+    lob.process_order(Order(price=None, id=10, order_type='market', timestamp=2.0, size=12, side='bid'))
+    exported = stats.export(buckets=True)
+    assert exported['process_order']['count'] == 5
+    assert exported['update_order']['count'] == 1
+    assert exported['remove_order']['count'] == 1
+    assert exported['market_order']['count'] == 1
+    assert exported['sweep_levels']['max'] == 2
+    assert exported['market_order']['p50'] > 0
+    assert sum(count for _, count in exported['process_order']['buckets']) == 5
+    # the chained sink still received every fill
+    assert len(fills.drain()) == 3
+    assert lob.ask.fill_sink == fills.append
+
+    lob.disable_instrumentation()
+    assert 'process_order' not in vars(lob) and 'market_order' not in vars(lob.ask)
+    lob.process_order(Order(price=104, id=20, order_type='limit', timestamp=3.0, size=5, side='ask'))
+    assert stats.export()['process_order']['count'] == 5
@@ -0,0 +1,138 @@
+import random
+import numpy as np
+import pytest
+from ..lob import LimitOrderBook
+from ..batch import ADD, MARKET, make_records
+from ..journal import JournalWriter, read_journal, replay_journal
+from ..ob_tree.fills import FillBuffer
+from ..ob_tree.order import Order
+
+
+def test_journal_replay_rebuilds_book(tmp_path):
+    path = str(tmp_path / 'book.journal')
+    rng = random.Random(5)
+    with JournalWriter(path) as journal:
+        lob = LimitOrderBook(journal=journal)
+        live = []
+        for order_id in range(2000):
+            side = rng.choice(['bid', 'ask'])
+            price = rng.randint(9950, 10050)
+            lob.process_order(Order(price=price, id=order_id, order_type='limit', timestamp=float(order_id),
+                                    size=rng.randint(1, 9), side=side))
+            live.append(order_id)
+            roll = rng.random()
+            live = [i for i in live if i in lob.bid.order_ids or i in lob.ask.order_ids]
+            if roll < 0.2 and live:
+                victim = live.pop(rng.randrange(len(live)))
+                lob.cancel_order(victim, 'bid' if victim in lob.bid.order_ids else 'ask')
+            elif roll < 0.3 and live:
+                target = rng.choice(live)
+                side = 'bid' if target in lob.bid.order_ids else 'ask'
+                lob.update_order(target, side, new_size=rng.randint(1, 9), change_price=False)
+            elif roll < 0.35 and lob.bid.order_ids:
+                lob.process_order(Order(price=None, id=-order_id, order_type='market', timestamp=float(order_id),
+                                        size=rng.randint(5, 20), side='ask'))
+        records = make_records(2)
+        records[0] = (ADD, 0, 10 ** 6, 9000, 3, 0.0)
+        records[1] = (MARKET, 1, 10 ** 6 + 1, 0, 1, 0.0)
+        lob.process_records(records)
+
+    replayed = LimitOrderBook()
+    messages, _ = replay_journal(replayed, path, chunk_size=500)
+    assert messages == len(read_journal(path))
+    assert isinstance(read_journal(path), np.memmap)
+    for side in ['bid', 'ask']:
+        original, rebuilt = getattr(lob, side), getattr(replayed, side)
+        assert list(original.price_tree.items()) == list(rebuilt.price_tree.items())
+        assert {i: o.size for i, o in original.order_ids.items()} == {i: o.size for i, o in rebuilt.order_ids.items()}
+        for price, level in original.limit_levels.items():
+            assert level._tail.id == rebuilt.limit_levels[price]._tail.id
+
+
+def test_journal_rejects_foreign_file(tmp_path):
+    path = tmp_path / 'not_a_journal'
+    path.write_bytes(b'x' * 64)
+    with pytest.raises(ValueError):
+        read_journal(str(path))
+
+
+def test_journal_uses_book_clock(tmp_path):
+    path = str(tmp_path / 'book.journal')
+    with JournalWriter(path) as journal:
+        lob = LimitOrderBook(journal=journal)
+        lob.process_order(Order(price=100, id=1, order_type='limit', timestamp=1.0, size=5, side='bid'))
+        lob.process_order(Order(price=99, id=2, order_type='limit', timestamp=2.0, size=5, side='bid',
+                                time_in_force='gtt', expire_at=10.0))
+        lob.cancel_order(1, 'bid')
+        lob.process_order(Order(price=98, id=3, order_type='limit', timestamp=3.0, size=5, side='bid'))
+        lob.update_order(3, 'bid', new_size=2, change_price=False)
+    assert read_journal(path)['timestamp'].tolist() == [1.0, 2.0, 2.0, 3.0, 3.0]
+    replayed = LimitOrderBook()
+    replay_journal(replayed, path)
+    # the good-till-time order is still live at time 3
+    assert set(replayed.bid.order_ids) == {2, 3}
+
+
+@pytest.mark.parametrize('lot_size', [None, 0.5])
+def test_journal_replays_order_attributes(tmp_path, lot_size, limit):
+    path = str(tmp_path / 'book.journal')
+    orders = [
+        limit(1, 'ask', 101, 5, timestamp=1.0),
+        limit(2, 'ask', 102, 10, timestamp=1.0, peak=2, owner=7),
+        limit(3, 'bid', 102, 20, timestamp=2.0, time_in_force='fok'),
+        limit(4, 'bid', 101, 3, timestamp=2.0, post_only='reject'),
+        limit(5, 'bid', 101, 3, timestamp=2.0, post_only='reprice'),
+        limit(6, 'bid', 101, 8, timestamp=3.0, time_in_force='ioc'),
+        limit(7, 'bid', 99, 4, timestamp=3.0, time_in_force='gtt', expire_at=5.0),
+        limit(8, 'bid', 98, 4, timestamp=3.0, time_in_force='gtt', expire_at=50.0),
+        Order(None, 9, 'market', 4.0, 1, 'ask', stop_price=100),
+        Order(None, 10, 'market', 4.0, 3, 'bid', owner=7),
+        limit(11, 'bid', 97, 2, timestamp=6.0),
+    ]
+    refused = 0
+    with JournalWriter(path) as journal:
+        lob = LimitOrderBook(journal=journal, lot_size=lot_size, self_trade_prevention='cancel_newest')
+        for order in orders:
+            try:
+                lob.process_order(order)
+            except ValueError:
+                refused += 1
+    # refused, dropped and expired orders did not rest, nor the stop which never triggered
+    assert set(lob.bid.order_ids) == {5, 8, 11} and set(lob.ask.order_ids) == {2}
+    replayed = LimitOrderBook(lot_size=lot_size, self_trade_prevention='cancel_newest')
+    assert refused == 2 and replay_journal(replayed, path) == (len(orders), refused)
+    for side in ['bid', 'ask']:
+        original, rebuilt = getattr(lob, side), getattr(replayed, side)
+        assert list(original.price_tree.items()) == list(rebuilt.price_tree.items())
+        assert {i: (o.size, o.reserve, o.owner) for i, o in original.order_ids.items()} == \
+            {i: (o.size, o.reserve, o.owner) for i, o in rebuilt.order_ids.items()}
+    assert set(replayed.ask_stops.order_ids) == {9}
+    assert replayed.last_trade_price == lob.last_trade_price
+
+
+def test_journal_reads_version_1(tmp_path):
+    path = tmp_path / 'old.journal'
+    records = make_records(2)
+    records[0] = (ADD, 0, 1, 100, 3, 0.0)
+    records[1] = (ADD, 1, 2, 101, 4, 0.0)
+    path.write_bytes(b'LOBJRNL\x00' + np.array([1, records.itemsize], dtype='<u4').tobytes() + records.tobytes())
+    replayed = LimitOrderBook()
+    assert replay_journal(replayed, str(path)) == (2, 0)
+    assert (replayed.best_bid, replayed.best_ask) == (100, 101)
+    with pytest.raises(ValueError):
+        JournalWriter(str(path))
+
+
+def test_mass_quote_replay_cancels_both_sides_first(tmp_path):
+    path = str(tmp_path / 'book.journal')
+    with JournalWriter(path) as journal:
+        lob = LimitOrderBook(journal=journal)
+        lob.mass_quote(1, bids=[(1, 99, 5)], asks=[(2, 101, 5)], timestamp=1.0)
+        # the new bid sits at the price of the old ask it replaces
+        lob.mass_quote(1, bids=[(3, 101, 5)], asks=[(4, 102, 5)], timestamp=2.0)
+    fills = FillBuffer()
+    replayed = LimitOrderBook(fill_sink=fills.append)
+    assert replay_journal(replayed, path) == (6, 0)
+    assert len(fills.drain()) == 0
+    assert (replayed.best_bid, replayed.best_ask) == (101, 102)
+    assert set(replayed.bid.order_ids) == {3} and set(replayed.ask.order_ids) == {4}
@@ -0,0 +1,111 @@
+import pytest
+from ..lob import LimitOrderBook
+from ..ob_tree.ladder import PriceLadder
+from ..ob_tree.order import Order
+import time
+import random
+
+
+def test_ladder_min_max_and_remove():
+    ladder = PriceLadder(tick_size=1, window=128)
+    for price in [100, 103, 101, 164]:
+        ladder[price] = 1
+    ladder[101] += 1
+    assert len(ladder) == 4
+    assert ladder[101] == 2
+    assert ladder.min_key() == 100
+    assert ladder.max_key() == 164
+    ladder.remove(100)
+    ladder.remove(164)
+    assert 100 not in ladder
+    assert ladder.min_key() == 101
+    assert ladder.max_key() == 103
+    assert list(ladder.keys(reverse=True)) == [103, 101]
+    ladder.remove(101)
+    ladder.remove(103)
+    with pytest.raises(ValueError):
+        ladder.max_key()
+    with pytest.raises(KeyError):
+        ladder.remove(103)
+
+
+def test_ladder_recenters_and_grows():
+    ladder = PriceLadder(tick_size=0.5, window=64)
+    ladder[100.5] = 3
+    # far outside the initial window on both sides
+    ladder[10.0] = 1
+    ladder[400.0] = 2
+    assert ladder.min_key() == 10.0
+    assert ladder.max_key() == 400.0
+    assert ladder[100.5] == 3
+    assert ladder.nsmallest(2) == [(10.0, 1), (100.5, 3)]
+    assert ladder.nlargest(1) == [(400.0, 2)]
+
+
+def test_ladder_matches_rbtree_book():
+    '''
+    Feed the same random flow into both backends and compare the resulting books
+    '''
+    books = [LimitOrderBook(), LimitOrderBook(backend='ladder', window=64)]
+    ids = random.sample(range(100000, 999999), 500)
+    flow = [(ids[i], random.randint(9900, 10100), random.randint(1, 10), ['bid', 'ask'][i % 2])
+            for i in range(500)]
+    for book in books:
+        for order_id, price, size, side in flow:
+            # keep the book uncrossed
+            price = price - 200 if side == 'bid' else price + 200
+            book.process_order(Order(price=price, id=order_id, order_type='limit',
+                                     timestamp=time.time(), size=size, side=side))
+        for order_id, _, _, side in flow[:100]:
+            (book.bid if side == 'bid' else book.ask).remove_order(order_id)
+        book.process_order(Order(price=None, id=1, order_type='market',
+                                 timestamp=time.time(), size=200, side='bid'))
+    rbtree, ladder = books
+    for side in ['bid', 'ask']:
+        expected, actual = getattr(rbtree, side), getattr(ladder, side)
+        assert list(expected.price_tree.items()) == list(actual.price_tree.items())
+        assert expected.max_price == actual.max_price
+        assert expected.min_price == actual.min_price
+        assert set(expected.order_ids) == set(actual.order_ids)
+
+
+def test_ladder_rejects_prices_off_the_grid():
+    ladder = PriceLadder(tick_size=1, window=64)
+    ladder[10000] = 1
+    with pytest.raises(ValueError):
+        ladder[9999.5] = 1
+    assert 9999.5 not in ladder and len(ladder) == 1 and ladder.min_key() == 10000
+    cents = PriceLadder(tick_size=0.01, window=64)
+    cents[100.01] = 1
+    cents[100.02] = 2
+    assert list(cents.items()) == [(100.01, 1), (100.02, 2)]
+    with pytest.raises(ValueError):
+        cents[100.015] = 1
+    lob = LimitOrderBook(backend='ladder')
+    lob.process_order(Order(price=10000, id=1, order_type='limit', timestamp=0.0, size=1, side='ask'))
+    with pytest.raises(ValueError):
+        lob.process_order(Order(price=9999.5, id=2, order_type='limit', timestamp=0.0, size=1, side='ask'))
+    assert lob.best_ask == 10000 and 2 not in lob.ask.order_ids
+
+
+def test_off_grid_orders_leave_the_ladder_book_untouched():
+    lob = LimitOrderBook(backend='ladder')
+    lob.process_order(Order(price=99, id=1, order_type='limit', timestamp=0.0, size=5, side='bid', owner=7))
+    lob.process_order(Order(price=100, id=3, order_type='limit', timestamp=0.0, size=5, side='ask'))
+    with pytest.raises(ValueError):
+        lob.update_order(1, 'bid', new_price=98.5, change_size=False)
+    with pytest.raises(ValueError):
+        lob.update_order(1, 'bid', new_price=100.5, change_size=False)
+    assert list(lob.bid.limit_levels) == [99] and lob.bid.limit_levels[99]._tail.id == 1
+    with pytest.raises(ValueError):
+        lob.mass_quote(7, bids=[(2, 98.5, 1)])
+    with pytest.raises(ValueError):
+        lob.mass_quote(7, bids=[(2, 98, 1)], asks=[(4, 101.5, 1)])
+    assert list(lob.bid.order_ids) == [1] and lob.bid.max_price == 99 and sorted(lob.bid.owners[7]) == [1]
+    with pytest.raises(ValueError):
+        lob.bid.replace_orders([1], [Order(98.5, 2, 'limit', 0.0, 1, 'bid')])
+    assert list(lob.bid.order_ids) == [1] and list(lob.bid.price_tree.items()) == [(99, 1)]
+    # a marketable off-grid bid is refused before it trades
+    with pytest.raises(ValueError):
+        lob.process_order(Order(price=100.5, id=5, order_type='limit', timestamp=0.0, size=8, side='bid'))
+    assert lob.ask.limit_levels[100].size == 5 and lob.last_trade_price is None
@@ -0,0 +1,91 @@
+import random
+import pytest
+from ..lob import LimitOrderBook
+from ..ob_tree.fills import FillBuffer
+from ..ob_tree.order import Order
+from ..ob_tree.pool import OrderPool
+from ..ob_tree.tree import COMPACT_SLACK
+
+
+def test_cancel_tombstones_and_matching_skips_it(limit):
+    fills = FillBuffer()
+    lob = LimitOrderBook(fill_sink=fills.append, lazy_cancel=True)
+    for i in range(1, 4):
+        lob.process_order(limit(i, 'ask', 101, 5))
+    assert lob.cancel_order(1, 'ask') is None
+    level = lob.ask.limit_levels[101]
+    assert 1 not in lob.ask.order_ids
+    assert level.size == 10 and lob.ask.price_tree[101] == 2 and level.tombstones == 1
+    assert lob.ask.queue_position(3) == (1, 5)
+    lob.process_order(limit(10, 'bid', 101, 7))
+    assert fills.drain()['maker_id'].tolist() == [2, 3]
+    assert level.tombstones == 0
+    assert lob.ask.limit_levels[101].size == 3
+
+
+def test_level_with_only_tombstones_left_is_removed(limit):
+    lob = LimitOrderBook(lazy_cancel=True)
+    lob.process_order(limit(1, 'ask', 101, 5))
+    lob.process_order(limit(2, 'ask', 101, 5))
+    lob.process_order(limit(3, 'ask', 102, 5))
+    # the newer order is tombstoned, the older one then trades away
+    lob.cancel_order(2, 'ask')
+    lob.process_order(limit(10, 'bid', 101, 5))
+    assert 101 not in lob.ask.limit_levels
+    assert lob.best_ask == 102
+    lob.cancel_order(3, 'ask')
+    assert lob.best_ask is None
+
+
+def test_compaction(limit):
+    pool = OrderPool()
+    lob = LimitOrderBook(lazy_cancel=True, pool=pool, queue_positions=True)
+    for i in range(1, 101):
+        lob.process_order(limit(i, 'bid', 99, 1))
+    for i in range(1, 51):
+        lob.cancel_order(i, 'bid')
+    level = lob.bid.limit_levels[99]
+    assert level.tombstones == 50
+    assert lob.compact() == 50
+    assert level.tombstones == 0
+    assert lob.bid.queue_position(100) == (49, 49)
+    # cancels past the slack compact the level on their own
+    for i in range(51, 100):
+        lob.cancel_order(i, 'bid')
+    assert level.tombstones <= 1 + COMPACT_SLACK
+    assert level.size == 1 and lob.bid.to_columns()['id'].tolist() == [100]
+
+
+@pytest.mark.parametrize('pool', [None, OrderPool()])
+def test_matches_eager_cancels(pool, limit):
+    rng = random.Random(3)
+    books = [(LimitOrderBook(fill_sink=fills.append, lazy_cancel=lazy, pool=pool if lazy else None), fills)
+             for lazy, fills in ((False, FillBuffer()), (True, FillBuffer()))]
+    resting = []
+    for i in range(1, 3001):
+        roll = rng.random()
+        if roll < 0.5 or not resting:
+            side = rng.choice(('bid', 'ask'))
+            price = rng.randint(95, 100) if side == 'bid' else rng.randint(101, 106)
+            size = rng.randint(1, 10)
+            for lob, _ in books:
+                lob.process_order(limit(i, side, price, size))
+            resting.append((i, side))
+        elif roll < 0.9:
+            order_id, side = resting.pop(rng.randrange(len(resting)))
+            book = books[0][0].bid if side == 'bid' else books[0][0].ask
+            if order_id in book.order_ids:
+                for lob, _ in books:
+                    lob.cancel_order(order_id, side)
+        else:
+            side = rng.choice(('bid', 'ask'))
+            size = rng.randint(1, 30)
+            for lob, _ in books:
+                if (lob.ask if side == 'bid' else lob.bid).limit_levels:
+                    lob.process_order(Order(None, i, 'market', 0.0, size, side))
+    (eager, eager_fills), (lazy, lazy_fills) = books
+    assert eager_fills.drain()['maker_id'].tolist() == lazy_fills.drain()['maker_id'].tolist()
+    assert [list(column) for column in eager.depth(10)] == [list(column) for column in lazy.depth(10)]
+    for side in ('bid', 'ask'):
+        expected, actual = getattr(eager, side).to_columns(), getattr(lazy, side).to_columns()
+        assert expected['id'].tolist() == actual['id'].tolist()
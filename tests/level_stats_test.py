@@ -0,0 +1,117 @@
+import random
+import pytest
+from ..lob import LimitOrderBook
+from ..ob_tree.level_stats import LevelStats, MAX_CAPACITY
+from ..ob_tree.order import Order
+
+
+def test_level_stats_queries():
+    stats = LevelStats(tick_size=1, capacity=16)
+    for price, size, count in [(100, 5, 1), (102, 7, 3), (105, 1, 3), (99, 2, 2)]:
+        stats.update(price, size, count)
+    assert stats.range_sum(100, 104) == (12, 5 * 100 + 7 * 102, 4)
+    assert stats.range_argmax(99, 110) == (102, 3)
+    assert stats.range_argmax(99, 110, prefer_high=True) == (105, 3)
+    assert stats.kth_level(1) == 99
+    assert stats.kth_level(2, from_high=True) == 102
+    assert stats.kth_level(5) is None
+    # grows beyond the initial capacity
+    stats.update(1000, 4, 1)
+    assert stats.range_sum(0, 2000) == (19, 5 * 100 + 7 * 102 + 105 + 2 * 99 + 4000, 10)
+    stats.update(102, -7, -3)
+    assert stats.range_argmax(0, 2000) == (105, 3)
+
+
+@pytest.mark.parametrize('backend', ['rbtree', 'ladder'])
+def test_range_queries_match_scan(backend):
+    '''
+    The segment tree answers must agree with the O(M) scan of an identical book without it
+    '''
+    books = [LimitOrderBook(backend=backend), LimitOrderBook(backend=backend, level_stats=True)]
+    rng = random.Random(3)
+    flow = [(i, rng.randint(9950, 10050), rng.randint(1, 5), rng.choice(['bid', 'ask'])) for i in range(1000)]
+    for book in books:
+        for order_id, price, size, side in flow:
+            book.process_order(Order(price=price, id=order_id, order_type='limit', timestamp=0, size=size, side=side))
+        for order_id, _, _, side in flow[::7]:
+            tree = book.bid if side == 'bid' else book.ask
+            if order_id in tree.order_ids:
+                tree.remove_order(order_id)
+        book.process_order(Order(price=None, id=-1, order_type='market', timestamp=0, size=50, side='bid'))
+    scan, indexed = books
+    for low, high in [(9900, 10100), (9990, 10010), (10000, 10000), (10200, 10300)]:
+        assert scan.range_volume(low, high) == indexed.range_volume(low, high)
+    for depth in [1, 5, 50, 5000]:
+        assert scan.bid.level_with_most_orders(depth, reverse=True) == \
+            indexed.bid.level_with_most_orders(depth, reverse=True)
+        assert scan.ask.level_with_most_orders(depth) == indexed.ask.level_with_most_orders(depth)
+
+
+def test_level_stats_refuse_prices_off_the_grid():
+    stats = LevelStats(tick_size=0.1, capacity=16)
+    stats.update(100.2, 1, 1)
+    stats.update(100.3, 2, 1)
+    with pytest.raises(ValueError):
+        stats.update(100.25, 1, 1)
+    assert stats.kth_level(2) == pytest.approx(100.3)
+    # query bounds need not be on the grid
+    assert stats.range_sum(100.15, 100.25) == (1, 100.2, 1)
+    lob = LimitOrderBook(level_stats=True)
+    lob.process_order(Order(price=100, id=1, order_type='limit', timestamp=0, size=1, side='bid'))
+    lob.process_order(Order(price=99, id=2, order_type='limit', timestamp=0, size=1, side='bid'))
+    for price in (100.2, 100.4):
+        with pytest.raises(ValueError):
+            lob.process_order(Order(price=price, id=3, order_type='limit', timestamp=0, size=1, side='bid'))
+    with pytest.raises(ValueError):
+        lob.update_order(2, 'bid', new_price=99.5, change_size=False)
+    assert list(lob.bid.price_tree.keys()) == [99, 100] and set(lob.bid.order_ids) == {1, 2}
+    assert lob.bid.level_with_most_orders(2, reverse=True) == (100, 1)
+
+
+def test_level_stats_keep_far_levels_outside_the_tree():
+    rng = random.Random(11)
+    stats = LevelStats(tick_size=1, capacity=16, max_capacity=64)
+    levels = {}
+    for _ in range(3000):
+        # mostly around the touch, some stubs far away on either side
+        tick = rng.choice([rng.randint(1000, 1040), rng.randint(0, 5000)])
+        count = levels.get(tick, 0)
+        delta = rng.choice([1, 1, -1]) if count else 1
+        stats.update(tick, delta * 2, delta)
+        levels[tick] = count + delta
+        if not levels[tick]:
+            del levels[tick]
+    assert stats._capacity <= 64 and stats._outside
+    prices = sorted(levels)
+    for k in (1, 2, len(prices) // 2, len(prices), len(prices) + 1):
+        assert stats.kth_level(k) == (prices[k - 1] if k <= len(prices) else None)
+        assert stats.kth_level(k, from_high=True) == (prices[-k] if k <= len(prices) else None)
+    for low, high in [(0, 5000), (990, 1050), (1020, 3000), (-5, 999)]:
+        inside = [price for price in prices if low <= price <= high]
+        assert stats.range_sum(low, high) == (2 * sum(levels[p] for p in inside),
+                                              2 * sum(levels[p] * p for p in inside),
+                                              sum(levels[p] for p in inside))
+        most = max((levels[p] for p in inside), default=0)
+        expected = [p for p in inside if levels[p] == most]
+        assert stats.range_argmax(low, high) == ((expected[0], most) if inside else (None, 0))
+        assert stats.range_argmax(low, high, prefer_high=True) == ((expected[-1], most) if inside else (None, 0))
+
+
+def test_stub_quotes_do_not_blow_up_the_tree():
+    lob = LimitOrderBook(tick_size=0.01, level_stats=True)
+    lob.process_order(Order(price=100.0, id=1, order_type='limit', timestamp=0, size=1, side='bid'))
+    lob.process_order(Order(price=0.01, id=2, order_type='limit', timestamp=0, size=1, side='bid'))
+    lob.process_order(Order(price=100.01, id=3, order_type='limit', timestamp=0, size=2, side='ask'))
+    lob.process_order(Order(price=5000.0, id=4, order_type='limit', timestamp=0, size=1, side='ask'))
+    assert lob.bid.level_stats._capacity <= MAX_CAPACITY and lob.ask.level_stats._capacity <= MAX_CAPACITY
+    assert lob.range_volume(0, 10000) == (5, pytest.approx(100.0 + 0.01 + 2 * 100.01 + 5000.0), 4)
+    assert lob.bid.level_with_most_orders(5, reverse=True) == (100.0, 1)
+    assert lob.ask.level_stats.kth_level(2) == 5000.0
+
+
+def test_off_grid_marketable_order_is_refused_before_matching():
+    lob = LimitOrderBook(level_stats=True)
+    lob.process_order(Order(price=100, id=1, order_type='limit', timestamp=0, size=5, side='ask'))
+    with pytest.raises(ValueError):
+        lob.process_order(Order(price=100.5, id=2, order_type='limit', timestamp=0, size=8, side='bid'))
+    assert lob.ask.limit_levels[100].size == 5 and lob.last_trade_price is None
@@ -0,0 +1,67 @@
+import numpy as np
+from ..batch import ADD, MARKET, make_records
+from ..manager import BookManager
+from ..ob_tree.order import Order
+
+
+def synthetic_flow(symbol_count: int, messages: int, seed: int = 1):
+    rng = np.random.default_rng(seed)
+    flow = {}
+    for s in range(symbol_count):
+        records = make_records(messages)
+        records['action'] = np.where(rng.random(messages) < 0.85, ADD, MARKET)
+        records['side'] = rng.integers(0, 2, messages)
+        records['id'] = np.arange(messages) + s * messages
+        records['price'] = rng.integers(95, 106, messages)
+        records['size'] = rng.integers(1, 5, messages)
+        records['timestamp'] = np.arange(messages) * symbol_count + s
+        flow[f'SYM{s}'] = records
+    return flow
+
+
+def test_sharded_matches_in_process():
+    flow = synthetic_flow(12, 300)
+    results = []
+    for workers in (0, 2):
+        with BookManager(workers=workers) as manager:
+            for symbol, records in flow.items():
+                manager.submit(symbol, records[:150])
+                manager.submit(symbol, records[150:])
+            results.append(manager.collect())
+    (local_fills, local_tops), (sharded_fills, sharded_tops) = results
+    assert len(local_fills) > 0
+    np.testing.assert_array_equal(local_fills, sharded_fills)
+    np.testing.assert_array_equal(local_tops, sharded_tops)
+    assert list(local_tops['symbol']) == sorted(flow)
+
+
+def test_process_order_routes_by_symbol():
+    with BookManager() as manager:
+        manager.process_order('AAA', Order(price=10, id=1, order_type='limit', timestamp=0.0, size=2, side='ask'))
+        manager.process_order('BBB', Order(price=20, id=1, order_type='limit', timestamp=0.0, size=2, side='ask'))
+        manager.process_order('AAA', Order(price=None, id=2, order_type='market', timestamp=1.0, size=1, side='bid'))
+        fills, tops = manager.collect()
+        assert list(fills['symbol']) == ['AAA']
+        assert manager.book('BBB').ask.min_price == 20
+        assert list(tops['ask_size']) == [1, 2]
+
+
+def test_sharded_process_order_keeps_order_attributes():
+    results = []
+    for workers in (0, 1):
+        with BookManager(workers=workers) as manager:
+            manager.process_order('AAA', Order(price=10, id=1, order_type='limit', timestamp=0.0, size=2, side='ask'))
+            # waits for a trade at 12, must not take the ask
+            manager.process_order('AAA', Order(price=None, id=2, order_type='market', timestamp=1.0, size=1,
+                                               side='bid', stop_price=12))
+            # doesn't cross, must not rest
+            manager.process_order('AAA', Order(price=9, id=3, order_type='limit', timestamp=2.0, size=1, side='bid',
+                                               time_in_force='ioc'))
+            manager.process_order('AAA', Order(price=11, id=4, order_type='limit', timestamp=3.0, size=4, side='ask',
+                                               peak=1, owner=5))
+            results.append(manager.collect())
+    (local_fills, local_tops), (sharded_fills, sharded_tops) = results
+    assert len(sharded_fills) == 0
+    for tops in (local_tops, sharded_tops):
+        assert np.isnan(tops['bid_price'][0])
+        assert (tops['ask_price'][0], tops['ask_size'][0]) == (10, 2)
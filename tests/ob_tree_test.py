@@ -1,7 +1,7 @@
 import pytest
 from ..lob import LimitOrderBook
 from ..ob_tree.tree import LOBTree
-from ..ob_tree.order import Order
+from ..ob_tree.order import Order, Side
 from ..ob_tree.orderlinkedlist import OrderLinkedlist
 import time
 import random
@@ -42,11 +42,12 @@ def order_instances_factory():
     Mainly used for filling the orderbook
     '''
     def _orders(id):
-        price = random.randint(10000, 10100)
         order_type = 'limit'
         timestamp = time.time()
         size = round(random.uniform(0.5, 2.5), 4)
         side = ['bid', 'ask'][random.randrange(2)]
+        # bids and asks don't overlap so that process_order doesn't match them against each other
+        price = random.randint(10000, 10049) if side == 'bid' else random.randint(10051, 10100)
         return Order(price=price, id=id, order_type=order_type, timestamp=timestamp, size=size, side=side)
     return _orders
 
@@ -127,18 +128,19 @@ def test_update_order(lob_instance):
 
     # change the size to 3, which is larger than all of the order sizes in the book
     if order_need_update.is_bid():
-        lob_instance.update_order(order_need_update.id, 'bid', 3, 20000)
-        assert lob_instance.bid.max_price == 20000
-        assert 20000 in lob_instance.bid.price_tree
-        assert 20000 in lob_instance.bid.limit_levels
-        assert lob_instance.bid.limit_levels[20000].size == 3
+        # the asks start at 10051, a bid amended above that would trade with them instead of resting
+        lob_instance.update_order(order_need_update.id, 'bid', 3, 10050)
+        assert lob_instance.bid.max_price == 10050
+        assert 10050 in lob_instance.bid.price_tree
+        assert 10050 in lob_instance.bid.limit_levels
+        assert lob_instance.bid.limit_levels[10050].size == 3
         assert rand_id[0] in lob_instance.bid.order_ids
         new_price_level = list(lob_instance.bid.limit_levels)[3]
         lob_instance.update_order(
             order_need_update.id, 'bid', new_price=new_price_level, change_size=False)
-        assert lob_instance.bid.max_price != 20000
-        assert 20000 not in lob_instance.bid.price_tree
-        assert 20000 not in lob_instance.bid.limit_levels
+        assert lob_instance.bid.max_price != 10050
+        assert 10050 not in lob_instance.bid.price_tree
+        assert 10050 not in lob_instance.bid.limit_levels
         assert lob_instance.bid.limit_levels[new_price_level]._head.id == order_need_update.id
     else:
         lob_instance.update_order(order_need_update.id, 'ask', 3, 20000)
@@ -221,3 +223,75 @@ def test_market_order(lob_instance, single_order_instance_factory):
     assert 9998 not in lob_instance.ask.price_tree
     assert 111018 not in lob_instance.ask.order_ids
     assert lob_instance.ask.limit_levels[9999].size == 0.5
+
+
+def test_crossing_limit_order(single_order_instance_factory):
+    '''
+    A marketable limit order sweeps the opposite book up to its limit price and the remainder rests
+    '''
+    lob = LimitOrderBook()
+    for order_id, price, size in [(1, 101, 5), (2, 101, 5), (3, 102, 5), (4, 104, 5)]:
+        lob.process_order(single_order_instance_factory(
+            price=price, id=order_id, order_type='limit', side='ask', timestamp=time.time(), size=size))
+    lob.process_order(single_order_instance_factory(
+        price=103, id=5, order_type='limit', side='bid', timestamp=time.time(), size=18))
+    assert 101 not in lob.ask.limit_levels
+    assert 102 not in lob.ask.limit_levels
+    assert lob.ask.min_price == 104
+    assert lob.bid.max_price == 103
+    assert lob.bid.order_ids[5].size == 3
+    assert lob.bid.limit_levels[103].size == 3
+    # a sell that only partially crosses the new bid
+    lob.process_order(single_order_instance_factory(
+        price=103, id=6, order_type='limit', side='ask', timestamp=time.time(), size=2))
+    assert 6 not in lob.ask.order_ids
+    assert lob.bid.order_ids[5].size == 1
+    # non-marketable orders rest untouched
+    lob.process_order(single_order_instance_factory(
+        price=100, id=7, order_type='limit', side='bid', timestamp=time.time(), size=1))
+    assert lob.bid.price_tree[100] == 1
+    assert lob.ask.price_tree[104] == 1
+
+
+def test_market_sell_order(single_order_instance_factory):
+    lob = LimitOrderBook()
+    for order_id, price in [(1, 100), (2, 99)]:
+        lob.process_order(single_order_instance_factory(
+            price=price, id=order_id, order_type='limit', side='bid', timestamp=time.time(), size=1))
+    lob.process_order(single_order_instance_factory(
+        price=None, id=3, order_type='market', side='ask', timestamp=time.time(), size=1))
+    assert lob.bid.max_price == 99
+    assert 1 not in lob.bid.order_ids
+
+
+def test_set_head_on_current_head(single_order_instance_factory):
+    level = OrderLinkedlist()
+    first = single_order_instance_factory(price=100, id=1, order_type='limit', side='bid', timestamp=time.time(), size=1)
+    second = single_order_instance_factory(price=100, id=2, order_type='limit', side='bid', timestamp=time.time(), size=1)
+    level.set_head(first)
+    level.set_head(second)
+    level.set_head(second)
+    assert level._head is second and level._tail is first
+    assert second.next is first and first.prev is second
+    level.set_head(first)
+    assert level._head is first and level._tail is second
+    assert first.next is second and second.prev is first and second.next is None
+
+
+def test_float_sizes_leave_no_empty_levels(limit):
+    lob = LimitOrderBook()
+    lob.process_order(limit(1, 'ask', 100, 0.1))
+    lob.process_order(limit(2, 'ask', 100, 0.2))
+    # the level's size is a rounding error away from 0 once both are gone
+    lob.cancel_order(1, 'ask')
+    lob.cancel_order(2, 'ask')
+    assert 100 not in lob.ask.price_tree and lob.ask.min_price is None
+    lob.process_order(limit(3, 'ask', 101, 0.5))
+    lob.process_order(Order(price=None, id=4, order_type='market', timestamp=0.0, size=0.5, side='bid'))
+    assert not lob.ask.order_ids
+
+
+def test_resting_order_sets_every_slot():
+    order = Order.resting(1, 2.0, Side.ASK, 3, 100)
+    assert {name: getattr(order, name) for name in Order.__slots__} == {
+        name: getattr(Order(100, 1, 'limit', 2.0, 3, 'ask'), name) for name in Order.__slots__}
@@ -0,0 +1,108 @@
+import pytest
+from ..lob import LimitOrderBook
+from ..ob_tree.order import Order
+from ..ob_tree.pool import OrderPool
+
+
+def assert_consistent(lob):
+    for tree in (lob.bid, lob.ask):
+        assert list(tree.price_tree.keys()) == sorted(tree.limit_levels)
+        for price, level in tree.limit_levels.items():
+            ids, order = [], level._tail
+            while order is not None:
+                ids.append(order.id)
+                assert tree.order_ids[order.id] is order and order.price == price
+                order = order.prev
+            assert tree.price_tree[price] == len(ids)
+            assert level.size == sum(tree.order_ids[i].size for i in ids)
+        assert (tree.min_price, tree.max_price) == (min(tree.limit_levels, default=None),
+                                                  max(tree.limit_levels, default=None))
+        owned = {}
+        for order in tree.order_ids.values():
+            if order.owner is not None:
+                owned.setdefault(order.owner, {})[order.id] = order
+        assert tree.owners == owned
+        if tree.level_stats is not None:
+            for price, level in tree.limit_levels.items():
+                assert tree.range_volume(price, price)[0::2] == (level.size, tree.price_tree[price])
+
+
+def quoted_book(limit, **kwargs):
+    lob = LimitOrderBook(**kwargs)
+    for i in range(5):
+        lob.process_order(limit(i, 'bid', 95 + i, 2, owner=7))
+        lob.process_order(limit(10 + i, 'ask', 101 + i, 2, owner=7))
+    lob.process_order(limit(20, 'bid', 99, 3, owner=8))
+    lob.process_order(limit(21, 'ask', 101, 3))
+    return lob
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'backend': 'ladder', 'level_stats': True, 'queue_positions': True,
+                                         'pool': OrderPool()}])
+def test_cancel_by_owner(kwargs, limit):
+    lob = quoted_book(limit, **kwargs)
+    assert lob.cancel_side_range(7, 'bid', 97, 98) == 2
+    assert sorted(lob.bid.owners[7]) == [0, 1, 4]
+    # a fill takes the order out of the owner index
+    lob.process_order(Order(price=None, id=30, order_type='market', timestamp=0.0, size=2, side='bid'))
+    assert 10 not in lob.ask.owners[7]
+    assert lob.cancel_all(7) == 3 + 4
+    assert 7 not in lob.bid.owners and 7 not in lob.ask.owners
+    assert list(lob.bid.limit_levels) == [99] and list(lob.ask.limit_levels) == [101]
+    assert lob.cancel_all(7) == 0
+    assert_consistent(lob)
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'backend': 'ladder', 'level_stats': True, 'queue_positions': True,
+                                         'pool': OrderPool()}])
+def test_mass_quote(kwargs, limit):
+    lob = quoted_book(limit, **kwargs)
+    level = lob.bid.limit_levels[99]
+    cancelled, added = lob.mass_quote(7, bids=[(40, 99, 1), (41, 98, 1), (42, 90, 1)],
+                                      asks=[(50, 100, 1), (51, 102, 5)])
+    assert (cancelled, added) == (10, 5)
+    assert sorted(lob.bid.owners[7]) == [40, 41, 42] and sorted(lob.ask.owners[7]) == [50, 51]
+    # the shared level at 99 was kept, the other owner's order is still first in line
+    assert lob.bid.limit_levels[99] is level and level._tail.id == 20
+    assert sorted(lob.bid.limit_levels) == [90, 98, 99]
+    assert (lob.bid.max_price, lob.ask.min_price) == (99, 100)
+    assert_consistent(lob)
+
+    # one side only, the other quotes stay
+    lob.mass_quote(7, asks=[(52, 103, 1)])
+    assert sorted(lob.ask.owners[7]) == [52] and sorted(lob.bid.owners[7]) == [40, 41, 42]
+    lob.mass_quote(7, bids=[])
+    assert 7 not in lob.bid.owners
+    assert_consistent(lob)
+
+
+def test_mass_quote_is_atomic(limit):
+    lob = quoted_book(limit)
+    before = (dict(lob.bid.owners[7]), dict(lob.ask.owners[7]))
+    with pytest.raises(ValueError):
+        # crosses the other participant's ask at 101
+        lob.mass_quote(7, bids=[(40, 101, 1)], asks=[(50, 102, 1)])
+    with pytest.raises(ValueError):
+        # crosses its own quotes
+        lob.mass_quote(7, bids=[(40, 100, 1), (41, 99, 1)], asks=[(50, 100, 1)])
+    with pytest.raises(ValueError):
+        lob.mass_quote(7, bids=[(20, 94, 1)])
+    with pytest.raises(ValueError):
+        lob.mass_quote(7, bids=[(40, 94, 1), (40, 93, 1)])
+    assert (lob.bid.owners[7], lob.ask.owners[7]) == before
+    # its own resting asks don't count once they are replaced, and ids being replaced can be reused
+    lob.mass_quote(8, bids=[(20, 98, 1)])
+    lob.mass_quote(7, bids=[(0, 100, 1)], asks=[(10, 103, 1), (11, 104, 1)])
+    assert lob.bid.max_price == 100 and lob.ask.min_price == 101
+    assert_consistent(lob)
+
+
+def test_owner_checkpoint(tmp_path, limit):
+    lob = quoted_book(limit)
+    path = str(tmp_path / 'book.ckpt')
+    lob.save_checkpoint(path)
+    restored = LimitOrderBook()
+    restored.load_checkpoint(path)
+    assert sorted(restored.bid.owners) == [7, 8]
+    assert restored.cancel_all(7) == 10
+    assert_consistent(restored)
@@ -0,0 +1,38 @@
+import pytest
+from ..lob import LimitOrderBook
+from ..ob_tree.order import Order, OrderType, Side
+from ..ob_tree.orderlinkedlist import OrderLinkedlist
+from ..ob_tree.pool import OrderPool
+
+
+def test_slotted_order():
+    order = Order(price=100, id=1, order_type='limit', timestamp=0, size=2, side='ask')
+    assert order.side is Side.ASK
+    assert order.order_type is OrderType.LIMIT
+    assert not order.is_bid()
+    assert Order(100, 2, OrderType.MARKET, 0, 2, Side.BID).is_bid()
+    with pytest.raises(AttributeError):
+        order.foo = 1
+    with pytest.raises(AttributeError):
+        OrderLinkedlist().foo = 1
+
+
+def test_pool_recycles_orders_and_levels():
+    pool = OrderPool()
+    lob = LimitOrderBook(pool=pool)
+    lob.process_order(pool.order(101, 1, 'limit', 0, 5, 'ask'))
+    lob.process_order(pool.order(102, 2, 'limit', 0, 5, 'ask'))
+    assert lob.cancel_order(2, 'ask') is None
+    assert len(pool._orders) == 1
+    assert len(pool._levels) == 1
+    # the level freed by the cancel is reused
+    lob.process_order(pool.order(103, 3, 'limit', 0, 5, 'ask'))
+    assert len(pool._orders) == 0
+    assert len(pool._levels) == 0
+    assert lob.ask.limit_levels[103]._head.id == 3
+    lob.process_order(pool.order(None, 4, 'market', 0, 5, 'bid'))
+    assert 1 not in lob.ask.order_ids
+    assert len(pool._orders) == 1
+    assert len(pool._levels) == 1
+    recycled = pool.order(104, 5, 'limit', 1, 1, 'bid')
+    assert recycled.id == 5 and recycled.side is Side.BID and recycled.prev is None and recycled.next is None
@@ -0,0 +1,48 @@
+import random
+import pytest
+from ..lob import LimitOrderBook
+from ..ob_tree.order import Order
+
+
+@pytest.mark.parametrize('queue_positions', [False, True])
+def test_queue_position(queue_positions):
+    lob = LimitOrderBook(queue_positions=queue_positions)
+    for order_id, size in [(1, 5), (2, 3), (3, 4), (4, 1)]:
+        lob.process_order(Order(price=100, id=order_id, order_type='limit', timestamp=0, size=size, side='bid'))
+    assert lob.queue_position(1) == (0, 0)
+    assert lob.queue_position(4) == (3, 12)
+    lob.cancel_order(2, 'bid')
+    assert lob.queue_position(4) == (2, 9)
+    # partial fill of the first order in line
+    lob.process_order(Order(price=None, id=9, order_type='market', timestamp=0, size=2, side='ask'))
+    assert lob.queue_position(3) == (1, 3)
+    # a size change sends the order to the back of the queue
+    lob.update_order(1, 'bid', 10, change_price=False)
+    assert lob.queue_position(1) == (2, 5)
+    assert lob.queue_position(3) == (0, 0)
+
+
+def test_queue_index_matches_walk():
+    '''
+    Random adds, cancels and fills on a handful of deep levels; the index must agree with walking the list
+    '''
+    rng = random.Random(11)
+    indexed, walked = LimitOrderBook(queue_positions=True), LimitOrderBook()
+    live = []
+    for order_id in range(3000):
+        price = rng.randint(100, 103)
+        size = rng.randint(1, 9)
+        for book in (indexed, walked):
+            book.process_order(Order(price=price, id=order_id, order_type='limit', timestamp=0, size=size, side='ask'))
+        live.append(order_id)
+        if rng.random() < 0.45:
+            cancelled = live.pop(rng.randrange(len(live)))
+            for book in (indexed, walked):
+                book.cancel_order(cancelled, 'ask')
+        if rng.random() < 0.05:
+            for book in (indexed, walked):
+                book.process_order(Order(price=None, id=-1, order_type='market', timestamp=0, size=15, side='bid'))
+            live = [order_id for order_id in live if order_id in indexed.ask.order_ids]
+    assert len(live) > 100
+    for order_id in live:
+        assert indexed.queue_position(order_id) == walked.queue_position(order_id)
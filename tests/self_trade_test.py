@@ -0,0 +1,99 @@
+import pytest
+from ..lob import LimitOrderBook
+from ..ob_tree.fills import FillBuffer
+from ..ob_tree.order import Order
+
+
+def make_book(limit, mode, **kwargs):
+    '''
+    Ask level 101: order 1 (owner 7, oldest), order 2 (owner 8), order 3 (owner 7); level 102: order 4 (owner 8)
+    '''
+    fills = FillBuffer()
+    lob = LimitOrderBook(fill_sink=fills.append, self_trade_prevention=mode, **kwargs)
+    lob.process_order(limit(1, 'ask', 101, 5, owner=7))
+    lob.process_order(limit(2, 'ask', 101, 5, owner=8))
+    lob.process_order(limit(3, 'ask', 101, 5, owner=7))
+    lob.process_order(limit(4, 'ask', 102, 5, owner=8))
+    return lob, fills
+
+
+def test_no_prevention_trades_with_itself(limit):
+    lob, fills = make_book(limit, None)
+    lob.process_order(limit(10, 'bid', 101, 3, owner=7))
+    assert fills.drain()['maker_id'].tolist() == [1]
+
+
+def test_cancel_newest(limit):
+    lob, fills = make_book(limit, 'cancel_newest')
+    lob.process_order(limit(10, 'bid', 101, 8, owner=7))
+    assert len(fills) == 0
+    assert 10 not in lob.bid.order_ids
+    assert lob.ask.limit_levels[101].size == 15
+    # an order of another owner trades normally
+    lob.process_order(limit(11, 'bid', 101, 3, owner=9))
+    assert fills.drain()['maker_id'].tolist() == [1]
+
+
+def test_cancel_oldest(limit):
+    lob, fills = make_book(limit, 'cancel_oldest')
+    lob.process_order(limit(10, 'bid', 102, 12, owner=7))
+    batch = fills.drain()
+    assert batch['maker_id'].tolist() == [2, 4]
+    assert batch['size'].tolist() == [5, 5]
+    assert not lob.ask.order_ids
+    assert 7 not in lob.ask.owners
+    # the remainder rests
+    assert lob.bid.limit_levels[102].size == 2
+    assert lob.last_trade_price == 102
+
+
+def test_cancel_both(limit):
+    lob, fills = make_book(limit, 'cancel_both')
+    lob.process_order(limit(10, 'bid', 101, 8, owner=7))
+    assert len(fills) == 0
+    assert 1 not in lob.ask.order_ids and 10 not in lob.bid.order_ids
+    assert lob.ask.limit_levels[101].size == 10
+    assert lob.ask.price_tree[101] == 2
+    assert lob.last_trade_price is None
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'backend': 'ladder', 'level_stats': True, 'queue_positions': True}])
+def test_decrement(kwargs, limit):
+    lob, fills = make_book(limit, 'decrement', **kwargs)
+    # smaller than the resting order: taken off it, nothing trades
+    lob.process_order(limit(10, 'bid', 101, 2, owner=7))
+    assert lob.ask.order_ids[1].size == 3
+    assert lob.ask.limit_levels[101].size == 13
+    assert lob.queue_position(1) == (0, 0)
+    # larger: the resting order goes, the rest keeps matching
+    lob.process_order(limit(11, 'bid', 101, 6, owner=7))
+    batch = fills.drain()
+    assert batch['maker_id'].tolist() == [2]
+    assert batch['size'].tolist() == [3]
+    assert 1 not in lob.ask.order_ids
+    assert lob.ask.limit_levels[101].size == 7
+    assert lob.ask.price_tree[101] == 2
+    assert lob.range_volume(101, 101) == (7, 707, 2)
+
+
+@pytest.mark.parametrize('mode', ['cancel_oldest', 'cancel_newest', 'cancel_both', 'decrement'])
+@pytest.mark.parametrize('order_type', ['limit', 'market'])
+def test_fill_or_kill_does_not_count_own_liquidity(mode, order_type, limit):
+    fills = FillBuffer()
+    lob = LimitOrderBook(fill_sink=fills.append, self_trade_prevention=mode)
+    lob.process_order(limit(1, 'ask', 100, 5, owner=7))
+    lob.process_order(limit(2, 'ask', 100, 5, owner=8))
+    price = 100 if order_type == 'limit' else None
+    with pytest.raises(ValueError):
+        lob.process_order(Order(price=price, id=3, order_type=order_type, timestamp=0.0, size=10, side='bid',
+                                time_in_force='fok', owner=7))
+    assert len(fills) == 0
+    assert not lob.bid.order_ids
+    assert lob.ask.limit_levels[100].size == 10
+    # what others rest is still there to fill it
+    lob.process_order(limit(4, 'ask', 100, 5, owner=9))
+    if mode == 'cancel_oldest':
+        lob.process_order(Order(price=price, id=3, order_type=order_type, timestamp=0.0, size=10, side='bid',
+                                time_in_force='fok', owner=7))
+        assert fills.drain()['maker_id'].tolist() == [2, 4]
+        assert not lob.bid.order_ids and not lob.ask.order_ids
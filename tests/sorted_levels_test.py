@@ -0,0 +1,54 @@
+import random
+import pytest
+from bintrees import FastRBTree
+from ..lob import LimitOrderBook
+from ..ob_tree import tree
+from ..ob_tree.order import Order
+from ..ob_tree.sorted_levels import SortedLevels
+
+
+def test_sorted_levels_interface():
+    levels = SortedLevels()
+    for price in [100.5, 99, 101, 97]:
+        levels[price] = 1
+    levels[101] += 2
+    assert len(levels) == 4 and 99 in levels and 98 not in levels
+    assert levels[101] == 3
+    assert (levels.min_key(), levels.max_key()) == (97, 101)
+    assert list(levels.keys()) == [97, 99, 100.5, 101]
+    assert list(levels.items(reverse=True))[:2] == [(101, 3), (100.5, 1)]
+    assert levels.nlargest(2) == [(101, 3), (100.5, 1)]
+    assert levels.nsmallest(10) == [(97, 1), (99, 1), (100.5, 1), (101, 3)]
+    assert levels.nlargest(0) == []
+    levels.remove(97)
+    levels.remove(101)
+    assert (levels.min_key(), levels.max_key()) == (99, 100.5)
+    with pytest.raises(KeyError):
+        levels.remove(97)
+    levels.remove(99)
+    levels.remove(100.5)
+    with pytest.raises(ValueError):
+        levels.min_key()
+
+
+def test_auto_backend_switches_with_depth(monkeypatch):
+    monkeypatch.setattr(tree, 'SPARSE_MAX_LEVELS', 40)
+    monkeypatch.setattr(tree, 'SPARSE_MIN_LEVELS', 10)
+    books = [LimitOrderBook(backend='rbtree'), LimitOrderBook(backend='auto')]
+    rng = random.Random(7)
+    flow = [(i, rng.randint(1, 200), rng.randint(1, 5)) for i in range(1, 400)]
+    for book in books:
+        for order_id, price, size in flow:
+            book.process_order(Order(price=price, id=order_id, order_type='limit', timestamp=0.0, size=size,
+                                     side='bid'))
+    rbtree, auto = books
+    assert type(auto.bid.price_tree) is FastRBTree
+    for book in books:
+        for order_id, _, _ in flow[:390]:
+            book.cancel_order(order_id, 'bid')
+        book.process_order(Order(price=None, id=1000, order_type='market', timestamp=0.0, size=20, side='ask'))
+    assert len(auto.bid.price_tree) < 10
+    assert type(auto.bid.price_tree) is SortedLevels
+    assert list(auto.bid.price_tree.items()) == list(rbtree.bid.price_tree.items())
+    assert (auto.bid.max_price, auto.bid.min_price) == (rbtree.bid.max_price, rbtree.bid.min_price)
+    assert auto.depth(5).bid_prices.tolist() == rbtree.depth(5).bid_prices.tolist()
@@ -0,0 +1,75 @@
+import numpy as np
+from ..lob import LimitOrderBook
+from ..batch import ADD, MARKET, make_records
+from ..journal import JournalWriter, replay_journal
+from ..ob_tree.order import Order
+
+
+def market(id, side, size, timestamp=0.0, **kwargs):
+    return Order(price=None, id=id, order_type='market', timestamp=timestamp, size=size, side=side, **kwargs)
+
+
+def test_stop_market_triggers_on_trade(limit):
+    lob = LimitOrderBook()
+    for i, price in enumerate((101, 102, 103, 104)):
+        lob.process_order(limit(i + 1, 'ask', price, 5))
+    lob.process_order(market(10, 'bid', 3, stop_price=102))
+    lob.process_order(market(11, 'bid', 3, stop_price=103))
+    assert len(lob.bid_stops) == 2
+    # trades at 101 only
+    lob.process_order(market(12, 'bid', 5, timestamp=1.0))
+    assert lob.last_trade_price == 101
+    assert len(lob.bid_stops) == 2
+    # trades at 102: stop 10 fires, takes 102 to 103 and sets off stop 11
+    lob.process_order(market(13, 'bid', 4, timestamp=2.0))
+    assert len(lob.bid_stops) == 0
+    assert lob.last_trade_price == 103
+    assert lob.ask.min_price == 104
+    assert lob.clock == 2.0
+
+
+def test_stop_limit_and_cancel(limit):
+    lob = LimitOrderBook()
+    lob.process_order(limit(1, 'bid', 100, 5))
+    lob.process_order(limit(2, 'bid', 99, 5))
+    lob.process_order(limit(3, 'ask', 99, 1, stop_price=100))
+    lob.process_order(limit(4, 'ask', 98, 1, stop_price=99))
+    lob.cancel_order(4, 'ask')
+    assert 4 not in lob.ask_stops and len(lob.ask_stops) == 1
+    lob.process_order(market(5, 'ask', 1))
+    # the stop-limit sells at 100, its limit of 99 is not needed
+    assert lob.bid.limit_levels[100].size == 3
+    assert len(lob.ask_stops) == 0
+    assert lob.ask.max_price is None
+
+
+def test_stop_already_reached_triggers_at_once(limit):
+    lob = LimitOrderBook()
+    lob.process_order(limit(1, 'ask', 101, 5))
+    lob.process_order(market(2, 'bid', 1))
+    lob.process_order(market(3, 'bid', 2, stop_price=100))
+    assert len(lob.bid_stops) == 0
+    assert lob.ask.limit_levels[101].size == 2
+
+
+def test_stops_in_batch_are_journaled_in_order(tmp_path, limit):
+    path = str(tmp_path / 'stops.journal')
+    journal = JournalWriter(path)
+    lob = LimitOrderBook(journal=journal)
+    for i in range(20):
+        lob.process_order(limit(i + 1, 'ask', 100 + i, 5))
+    for i in range(100):
+        lob.process_order(market(1000 + i, 'bid', 1, stop_price=101 + i % 10))
+    records = make_records(3)
+    records[0] = (MARKET, 0, 50, 0, 7, 1.0)
+    records[1] = (ADD, 0, 51, 110, 2, 2.0)
+    records[2] = (MARKET, 0, 52, 0, 1, 3.0)
+    lob.process_records(records)
+    journal.close()
+    assert len(lob.bid_stops) == 0
+    replayed = LimitOrderBook()
+    replay_journal(replayed, path)
+    for book, other in ((lob.bid, replayed.bid), (lob.ask, replayed.ask)):
+        for column, values in book.to_columns().items():
+            np.testing.assert_array_equal(values, other.to_columns()[column])
+
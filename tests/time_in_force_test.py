@@ -0,0 +1,85 @@
+import pytest
+from ..lob import LimitOrderBook
+from ..ob_tree.order import Order, PostOnly, TimeInForce
+
+
+def book_with_asks(limit):
+    lob = LimitOrderBook()
+    lob.process_order(limit(1, 'ask', 101, 5))
+    lob.process_order(limit(2, 'ask', 102, 5, peak=2))
+    lob.process_order(limit(3, 'ask', 103, 5))
+    return lob
+
+
+def test_ioc_drops_remainder(limit):
+    lob = book_with_asks(limit)
+    order = limit(10, 'bid', 101, 8, time_in_force='ioc')
+    lob.process_order(order)
+    assert order.size == 3
+    assert 10 not in lob.bid.order_ids and len(lob.bid.limit_levels) == 0
+    assert 101 not in lob.ask.limit_levels
+
+
+def test_fok_checks_depth_before_matching(limit):
+    lob = book_with_asks(limit)
+    # 5 at 101 plus 5 at 102, 3 of them hidden reserve
+    with pytest.raises(ValueError):
+        lob.process_order(limit(10, 'bid', 102, 11, time_in_force=TimeInForce.FOK))
+    assert lob.ask.limit_levels[101].size == 5 and lob.ask.limit_levels[102].size == 2
+    lob.process_order(limit(11, 'bid', 102, 10, time_in_force='fok'))
+    assert list(lob.ask.limit_levels) == [103]
+    assert len(lob.bid.limit_levels) == 0
+    with pytest.raises(ValueError):
+        lob.process_order(Order(price=None, id=12, order_type='market', timestamp=0, size=6, side='bid',
+                                time_in_force='fok'))
+    with pytest.raises(ValueError):
+        lob.process_order(limit(13, 'bid', 99, 1, time_in_force='fok'))
+    assert lob.ask.limit_levels[103].size == 5 and len(lob.bid.limit_levels) == 0
+
+
+def test_post_only(limit):
+    lob = book_with_asks(limit)
+    with pytest.raises(ValueError):
+        lob.process_order(limit(10, 'bid', 101, 1, post_only='reject'))
+    order = limit(11, 'bid', 102, 1, post_only=PostOnly.REPRICE)
+    lob.process_order(order)
+    assert order.price == 100 and lob.bid.max_price == 100
+    assert lob.ask.limit_levels[101].size == 5
+    lob.process_order(limit(12, 'bid', 99, 1, post_only='reject'))
+    assert lob.bid.limit_levels[99].size == 1
+
+
+def test_gtt_expiry(limit):
+    lob = LimitOrderBook(timer_resolution=0.5)
+    lob.process_order(limit(1, 'bid', 100, 5, timestamp=10.0, time_in_force='gtt', expire_at=20.0))
+    lob.process_order(limit(2, 'bid', 100, 5, timestamp=10.0, time_in_force='gtt', expire_at=30.0))
+    lob.process_order(limit(3, 'bid', 99, 5, timestamp=11.0, time_in_force='gtt', expire_at=15.0))
+    lob.process_order(limit(4, 'bid', 98, 5, timestamp=11.0))
+    lob.cancel_order(2, 'bid')
+    with pytest.raises(ValueError):
+        lob.process_order(limit(5, 'bid', 100, 5, timestamp=11.0, time_in_force='gtt', expire_at=11.0))
+    with pytest.raises(ValueError):
+        limit(6, 'bid', 100, 5, expire_at=11.0)
+
+    # the clock follows the timestamps of incoming orders
+    lob.process_order(limit(7, 'ask', 105, 1, timestamp=16.0))
+    assert set(lob.bid.order_ids) == {1, 4}
+    assert lob.expire_orders(19.9) == 0
+    assert lob.expire_orders(30.0) == 1
+    assert set(lob.bid.order_ids) == {4}
+    assert len(lob.timers) == 0
+
+
+def test_gtt_checkpoint(tmp_path, limit):
+    lob = LimitOrderBook()
+    lob.process_order(limit(1, 'bid', 100, 5, timestamp=10.0, time_in_force='gtt', expire_at=20.0))
+    lob.process_order(limit(2, 'ask', 101, 5, timestamp=10.0))
+    path = str(tmp_path / 'book.ckpt')
+    lob.save_checkpoint(path)
+    restored = LimitOrderBook()
+    restored.load_checkpoint(path)
+    order = restored.bid.order_ids[1]
+    assert (order.time_in_force, order.expire_at) == (TimeInForce.GTT, 20.0)
+    assert restored.ask.order_ids[2].expire_at is None
+    assert restored.expire_orders(20.0) == 1
+    assert len(restored.bid.order_ids) == 0
@@ -0,0 +1,42 @@
+import random
+import pytest
+from ..ob_tree.timer_wheel import TimerWheel
+
+
+@pytest.mark.parametrize('bits, levels', [(2, 1), (3, 2), (6, 4)])
+def test_timer_wheel_matches_scan(bits, levels):
+    '''
+    Random schedules and clock jumps, from one tick to far past the top level; the wheel must
+    return exactly the items a scan of every pending deadline would
+    '''
+    rng = random.Random(bits * 10 + levels)
+    wheel = TimerWheel(resolution=1, bits=bits, levels=levels)
+    now = rng.randint(0, 10 ** 6)
+    wheel.advance(now)
+    pending = {}
+    for step in range(3000):
+        if rng.random() < 0.6:
+            deadline = now + rng.choice([0, 1, rng.randint(1, 50), rng.randint(1, 10 ** 5), rng.randint(1, 10 ** 8)])
+            if wheel.schedule(deadline, step):
+                pending[step] = deadline
+            else:
+                assert deadline <= now
+        else:
+            now += rng.choice([0, 1, rng.randint(1, 100), rng.randint(1, 10 ** 6), rng.randint(1, 10 ** 8)])
+            due = wheel.advance(now)
+            assert sorted(due) == sorted(step for step, deadline in pending.items() if deadline <= now)
+            for step in due:
+                del pending[step]
+            assert len(wheel) == len(pending)
+
+
+def test_timer_wheel_fractional_resolution():
+    wheel = TimerWheel(resolution=0.001)
+    wheel.advance(1000.0)
+    wheel.schedule(1000.0105, 'a')
+    wheel.schedule(1000.5, 'b')
+    # deadlines are rounded up to a whole tick, never fired early
+    assert wheel.advance(1000.010) == []
+    assert wheel.advance(1000.011) == ['a']
+    assert wheel.advance(1001.0) == ['b']
+    assert len(wheel) == 0